@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import NoReverseMatch, resolve, reverse
+from api.schema import read_schema_artifact, schema_fingerprint, schema_path
+
+
+class Command(BaseCommand):
+    help = ("Generates the OpenAPI schema served by /swagger.json, /swagger.yaml, /swagger/ and /redoc/ into "
+            "its artifact file (OPENAPI_SCHEMA_PATH). Run it at deploy; servers regenerate a missing or stale "
+            "artifact themselves on the first schema request.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Artifact path (default: OPENAPI_SCHEMA_PATH)")
+        parser.add_argument('--check', action='store_true',
+                            help="Only report whether the artifact matches the current source; fails if stale")
+
+    def handle(self, *args, **options):
+        path = options['output'] or schema_path()
+
+        if options['check']:
+            artifact = read_schema_artifact(path)
+            if artifact is None:
+                raise CommandError(f"No OpenAPI schema artifact at {path}")
+            if artifact['fingerprint'] != schema_fingerprint():
+                raise CommandError(f"The OpenAPI schema artifact at {path} is stale, regenerate it")
+            self.stdout.write(self.style.SUCCESS(f"{path} is up to date ({artifact['fingerprint'][:12]})"))
+            return
+
+        try:
+            view_class = resolve(reverse('schema-json', kwargs={'format': '.json'})).func.cls
+        except NoReverseMatch:
+            raise CommandError("The URL conf has no 'schema-json' view")
+        if not hasattr(view_class, 'schema_artifact'):
+            raise CommandError("The 'schema-json' view does not serve a cached schema (see api.schema)")
+
+        artifact = view_class.schema_artifact.write(path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote the OpenAPI schema with {len(artifact['schema'].get('paths', {}))} paths to {path} "
+            f"({artifact['fingerprint'][:12]})"
+        ))
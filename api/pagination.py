@@ -0,0 +1,137 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in keyset (cursor) pagination.
+
+    Clients opt in by sending the ``cursor`` query parameter (empty for the
+    first page, then the value of ``next``); without it the viewset keeps the
+    default page-number pagination. Each page is read with a WHERE on the
+    ordering key rather than an OFFSET, and no COUNT query is run, so walking
+    deep into a large history costs the same per page as the first one.
+
+    ``ordering`` must end with a unique field; prefix a field with '-' to walk
+    it in descending order.
+    """
+    ordering = ('date', 'id')
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+    fallback_class = PageNumberPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            self.fallback = self.fallback_class()
+            return self.fallback.paginate_queryset(queryset, request, view)
+
+        self.fallback = None
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        self.next_position = None
+        if self.has_next:
+            self.next_position = [self.get_key_value(results[-1], field) for field in self.ordering]
+
+        return results
+
+    def get_page_size(self, request):
+        # A missing, non-numeric or non-positive page_size falls back to the default
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size < 1:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_key_value(self, obj, field):
+        name = field.lstrip('-')
+        return obj._meta.get_field(name).value_to_string(obj)
+
+    def get_position_filter(self, position):
+        """
+        Returns the filter selecting the rows after ``position`` in ``ordering``.
+        The leading field is also bounded on its own so the database can seek an index on it.
+        """
+        fields = [(field.lstrip('-'), field.startswith('-')) for field in self.ordering]
+
+        after = Q()
+        for index, (name, descending) in enumerate(fields):
+            clause = Q(**{f"{name}__{'lt' if descending else 'gt'}": position[index]})
+            for prefix_index in range(index):
+                clause &= Q(**{fields[prefix_index][0]: position[prefix_index]})
+            after |= clause
+
+        leading_name, leading_descending = fields[0]
+        return Q(**{f"{leading_name}__{'lte' if leading_descending else 'gte'}": position[0]}) & after
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            values = json.loads(urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        encoded = urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+
+        return Response({
+            'next': self.encode_cursor(self.next_position) if self.has_next else None,
+            'results': data
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return self.fallback_class().get_paginated_response_schema(schema)
+
+    def to_html(self):
+        if self.fallback is not None:
+            return self.fallback.to_html()
+        return ''
+
+
+class DateKeysetPagination(KeysetPagination):
+    """
+    Keyset pagination walking (date, id) forwards
+    """
+    ordering = ('date', 'id')
+
+
+class StartDateKeysetPagination(KeysetPagination):
+    """
+    Keyset pagination walking start dates backwards, newest first
+    """
+    ordering = ('-start_date', 'id')
@@ -0,0 +1,190 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from importlib import import_module
+import drf_yasg
+import rest_framework
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from drf_yasg.codecs import yaml_dump
+from drf_yasg.renderers import _SpecRenderer
+from drf_yasg.views import get_schema_view
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+logger = logging.getLogger(__name__)
+
+# Source directories that cannot change the schema
+FINGERPRINT_SKIP_DIRS = {'migrations', 'management', 'templates', 'static', '__pycache__'}
+
+
+def schema_path():
+    return str(getattr(settings, 'OPENAPI_SCHEMA_PATH', os.path.join(settings.BASE_DIR, 'openapi-schema.json')))
+
+
+def _source_files():
+    """
+    The Python files the schema is generated from: the project's apps (views,
+    serializers, URL confs...) and the package of the root URL conf, which
+    holds the settings
+    """
+    base_dir = str(settings.BASE_DIR)
+    roots = {app_config.path for app_config in apps.get_app_configs() if app_config.path.startswith(base_dir)}
+    roots.add(os.path.dirname(import_module(settings.ROOT_URLCONF).__file__))
+
+    for root in sorted(roots):
+        for directory, subdirectories, files in os.walk(root):
+            subdirectories[:] = sorted(name for name in subdirectories if name not in FINGERPRINT_SKIP_DIRS)
+            for name in sorted(files):
+                if name.endswith('.py') and name != 'tests.py':
+                    yield os.path.join(directory, name)
+
+
+def schema_fingerprint():
+    """
+    Digest of everything the generated schema depends on: the source of the
+    project's apps and URL conf and the drf-yasg and DRF versions
+    """
+    digest = hashlib.sha256(f'{drf_yasg.__version__} {rest_framework.VERSION}'.encode())
+    base_dir = str(settings.BASE_DIR)
+    for path in _source_files():
+        digest.update(os.path.relpath(path, base_dir).encode())
+        with open(path, 'rb') as source:
+            digest.update(hashlib.sha256(source.read()).digest())
+    return digest.hexdigest()
+
+
+def read_schema_artifact(path=None):
+    """
+    Returns the artifact written by generate_openapi_schema, or None if there is no readable one
+    """
+    try:
+        with open(path or schema_path(), encoding='utf-8') as artifact_file:
+            artifact = json.load(artifact_file)
+    except (OSError, ValueError):
+        return None
+    return artifact if isinstance(artifact, dict) and 'fingerprint' in artifact and 'schema' in artifact else None
+
+
+class SchemaArtifact:
+    """
+    The OpenAPI schema of a schema view, generated once per process (or read
+    from the artifact file when its fingerprint still matches the source) and
+    kept in memory with each of its encodings.
+    """
+
+    def __init__(self, info, generator_class):
+        self.info = info
+        self.generator_class = generator_class
+        self.fingerprint = None
+        self._spec = None
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def generate(self):
+        # Public: every endpoint, whoever asks. The views still get an anonymous
+        # request to introspect, but the schema leaves the host to the client.
+        request = Request(APIRequestFactory().get('/swagger.json'))
+        spec = self.generator_class(self.info).get_schema(request=request, public=True).as_dict()
+        spec.pop('host', None)
+        spec.pop('schemes', None)
+        return spec
+
+    def write(self, path=None):
+        """
+        Generates the schema into the artifact file. Returns the artifact.
+        """
+        path = path or schema_path()
+        artifact = {
+            'fingerprint': schema_fingerprint(),
+            'generated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'schema': self.generate(),
+        }
+        # Written aside under a name of its own and renamed, so a server never reads half
+        # a file, even with several processes regenerating the artifact at once
+        directory, name = os.path.split(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile(
+            'w', encoding='utf-8', dir=directory, prefix=f'{name}.', suffix='.tmp', delete=False
+        ) as artifact_file:
+            try:
+                json.dump(artifact, artifact_file, ensure_ascii=False)
+            except BaseException:
+                artifact_file.close()
+                os.unlink(artifact_file.name)
+                raise
+        # Temporary files are created private; the artifact is read by the other server processes
+        os.chmod(artifact_file.name, 0o644)
+        os.replace(artifact_file.name, path)
+        return artifact
+
+    def load(self):
+        if self._spec is not None:
+            return
+        with self._lock:
+            if self._spec is not None:
+                return
+            fingerprint = schema_fingerprint()
+            artifact = read_schema_artifact()
+            if artifact is not None and artifact['fingerprint'] == fingerprint:
+                spec = artifact['schema']
+            else:
+                logger.info("OpenAPI schema artifact %s is missing or stale, regenerating it", schema_path())
+                try:
+                    spec = self.write()['schema']
+                except OSError as e:
+                    logger.warning("Cannot write the OpenAPI schema artifact: %s", e)
+                    spec = self.generate()
+            self._encoded = {}
+            self.fingerprint = fingerprint
+            self._spec = spec
+
+    def encoded(self, renderer):
+        """
+        Returns the schema encoded for a drf-yasg spec renderer, encoding it on first use
+        """
+        self.load()
+        encoding = renderer.format.lstrip('.')
+        body = self._encoded.get(encoding)
+        if body is None:
+            if encoding == 'yaml':
+                body = yaml_dump(self._spec, binary=True)
+            else:
+                body = json.dumps(self._spec, ensure_ascii=False).encode()
+            self._encoded[encoding] = body
+        return body
+
+
+def get_cached_schema_view(info, **kwargs):
+    """
+    get_schema_view whose spec formats (.json, .yaml, ?format=openapi) are
+    served from a SchemaArtifact with an ETag and Cache-Control
+    (OPENAPI_SCHEMA_MAX_AGE seconds) instead of introspecting every view on
+    each hit. Use it with cache_timeout=0: the view sets its own headers.
+    The Swagger UI and ReDoc pages load the schema from ?format=openapi.
+    """
+    schema_view = get_schema_view(info, **kwargs)
+
+    class CachedSchemaView(schema_view):
+        schema_artifact = SchemaArtifact(info, schema_view.generator_class)
+
+        def get(self, request, version='', format=None):
+            renderer = request.accepted_renderer
+            if not isinstance(renderer, _SpecRenderer):
+                return super().get(request, version, format)
+
+            body = self.schema_artifact.encoded(renderer)
+            etag = f'"{self.schema_artifact.fingerprint[:32]}-{renderer.format.lstrip(".")}"'
+            if etag in request.headers.get('If-None-Match', ''):
+                response = HttpResponseNotModified()
+            else:
+                response = HttpResponse(body, content_type=f'{renderer.media_type}; charset=utf-8')
+            response['ETag'] = etag
+            response['Cache-Control'] = f"public, max-age={getattr(settings, 'OPENAPI_SCHEMA_MAX_AGE', 300)}"
+            return response
+
+    return CachedSchemaView
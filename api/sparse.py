@@ -0,0 +1,194 @@
+import re
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_field_paths(value):
+    """
+    Turns 'id,shift_details.start_time,staff_member_details.user.first_name'
+    into {'id': {}, 'shift_details': {'start_time': {}}, 'staff_member_details': {'user': {'first_name': {}}}}
+    """
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in path.strip().split('.'):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+def _nested(field):
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+def _collapse(serializer, name, field):
+    """
+    Replaces an unexpanded nested serializer by the primary key(s) it renders,
+    or drops it when a sibling field already renders them
+    """
+    if any(other is not field and _nested(other) is None and other.source == field.source
+           for other in serializer.fields.values()):
+        serializer.fields.pop(name)
+    else:
+        serializer.fields[name] = serializers.PrimaryKeyRelatedField(
+            source=field.source, read_only=True, many=isinstance(field, serializers.ListSerializer)
+        )
+
+
+def prune_fields(serializer, fields=None, expand=None):
+    """
+    Keeps the fields named in the ``fields`` tree (every field when None) and
+    renders nested serializers in full only if they are named in the
+    ``expand`` tree (or selected into with a dotted field); the others are
+    collapsed to primary keys. ``expand=None`` expands everything.
+    """
+    for name, field in list(serializer.fields.items()):
+        if fields is not None and name not in fields:
+            serializer.fields.pop(name)
+            continue
+
+        nested = _nested(field)
+        if nested is None:
+            continue
+
+        selected = fields.get(name) if fields is not None else None
+        if expand is not None and name not in expand and not selected:
+            _collapse(serializer, name, field)
+            continue
+
+        prune_fields(nested, selected or None, expand.get(name, {}) if expand is not None else None)
+
+
+class _QueryPlan:
+    def __init__(self):
+        self.only = set()
+        self.select_related = set()
+        self.complete = True
+
+    def load_all(self, model, prefix):
+        self.only.update(prefix + field.name for field in model._meta.concrete_fields)
+
+    def add(self, serializer, model, prefix=''):
+        """
+        Collects the columns and joins the serializer's fields read from ``model``
+        """
+        self.only.add(prefix + model._meta.pk.name)
+        for field in serializer.fields.values():
+            if field.source == '*':
+                # Method fields may read anything; leave the queryset alone
+                self.complete = False
+                return
+            self._add_source(field, model, prefix)
+
+    def _add_source(self, field, model, prefix):
+        current, path = model, prefix
+        attrs = field.source_attrs
+        for index, attr in enumerate(attrs):
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                display = re.fullmatch(r'get_(\w+)_display', attr)
+                if display:
+                    self.only.add(path + display.group(1))
+                else:
+                    # A model method or property: load the whole row it is called on
+                    self.load_all(current, path)
+                return
+
+            if not model_field.is_relation:
+                self.only.add(path + attr)
+                return
+
+            if not (model_field.concrete and (model_field.many_to_one or model_field.one_to_one)):
+                self.complete = False
+                return
+
+            self.only.add(path + attr)
+            last = index == len(attrs) - 1
+            if last and isinstance(field, serializers.PrimaryKeyRelatedField):
+                return
+            if last and isinstance(field, serializers.ManyRelatedField) and isinstance(
+                field.child_relation, serializers.PrimaryKeyRelatedField
+            ):
+                return
+
+            self.select_related.add(path + attr)
+            current, path = model_field.related_model, path + attr + '__'
+
+            if last:
+                nested = _nested(field)
+                if nested is not None:
+                    self.add(nested, current, path)
+                else:
+                    # StringRelatedField and the like render the whole related object
+                    self.load_all(current, path)
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin honouring ``?fields=`` and ``?expand=`` on GET requests.
+
+    ``fields`` is a comma-separated list of the fields to return; dotted names
+    select inside nested serializers (``shift_details.start_time``). ``expand``
+    lists the nested serializers to render in full; when it is given, the
+    others are collapsed to their primary keys. Only the serializer the view
+    builds (the one given the request in its context) is pruned.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = kwargs.get('context', {}).get('request')
+        if request is None or request.method != 'GET':
+            return
+
+        fields = request.query_params.get(FIELDS_PARAM)
+        expand = request.query_params.get(EXPAND_PARAM)
+        if fields is None and expand is None:
+            return
+
+        self.sparse = True
+        prune_fields(
+            self,
+            parse_field_paths(fields) if fields is not None else None,
+            parse_field_paths(expand) if expand is not None else None
+        )
+
+    def sparse_queryset(self, queryset, required=()):
+        """
+        Narrows ``queryset`` to the joins and columns the pruned fields read
+        (plus the ``required`` ones), or returns it unchanged if that cannot be worked out
+        """
+        if not getattr(self, 'sparse', False):
+            return queryset
+
+        plan = _QueryPlan()
+        plan.add(self, queryset.model)
+        if not plan.complete:
+            return queryset
+        return queryset.select_related(None).select_related(*plan.select_related).only(*plan.only, *required)
+
+
+class SparseQuerysetMixin:
+    """
+    ViewSet mixin trimming the queryset of GET requests to what a SparseFieldsMixin serializer renders.
+    It hooks filter_queryset, which list and retrieve run after the viewset's own get_queryset.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method != 'GET':
+            return queryset
+
+        serializer = self.get_serializer()
+        if not isinstance(serializer, SparseFieldsMixin):
+            return queryset
+        # Keyset pagination reads its ordering fields from the last row of the page
+        ordering = getattr(self.paginator, 'ordering', ())
+        return serializer.sparse_queryset(queryset, [field.lstrip('-') for field in ordering])
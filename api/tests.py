@@ -0,0 +1,161 @@
+import re
+from datetime import date, time, timedelta
+from unittest import skipUnless
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from attendance.models import Attendance, LeaveRequest, WorkingHours
+from attendance.views import AttendanceViewSet, LeaveRequestViewSet, WorkingHoursViewSet
+from department.models import Department
+from role.models import Role
+from shift.models import Shift, ShiftAssignment, ShiftSwapRequest
+from shift.views import ShiftAssignmentViewSet, ShiftSwapRequestViewSet
+from staff.models import StaffMember
+
+# (label, viewset, query params) for the filters the list endpoints are actually called with
+HOT_QUERIES = [
+    ('assignments by date range', ShiftAssignmentViewSet, {'start_date': '2025-06-10', 'end_date': '2025-06-16'}),
+    ('active assignments by date range', ShiftAssignmentViewSet,
+     {'start_date': '2025-06-10', 'end_date': '2025-06-16', 'is_active': 'true'}),
+    ('assignments by staff', ShiftAssignmentViewSet, {'staff_id': 'STAFF00042'}),
+    ('assignments by role and date', ShiftAssignmentViewSet, {'role_id': '1', 'start_date': '2025-06-10'}),
+    ('attendance by date range', AttendanceViewSet, {'start_date': '2025-06-10', 'end_date': '2025-06-16'}),
+    ('attendance by status and date', AttendanceViewSet,
+     {'status': 'late', 'start_date': '2025-06-10', 'end_date': '2025-06-16'}),
+    ('attendance by staff', AttendanceViewSet, {'staff_id': 'STAFF00042'}),
+    ('leave requests by staff', LeaveRequestViewSet, {'staff_id': 'STAFF00042'}),
+    ('leave requests by status', LeaveRequestViewSet, {'status': 'pending'}),
+    ('leave requests by date range', LeaveRequestViewSet, {'start_date': '2025-06-10', 'end_date': '2025-06-16'}),
+    ('swap requests by staff', ShiftSwapRequestViewSet, {'staff_id': 'STAFF00042'}),
+    ('swap requests by status', ShiftSwapRequestViewSet, {'status': 'pending'}),
+    ('swap requests by date range', ShiftSwapRequestViewSet, {'start_date': '2025-06-10', 'end_date': '2025-06-16'}),
+    ('working hours by department and month', WorkingHoursViewSet, {'department': '1', 'date': '2025-06-15'}),
+    ('working hours by department and week', WorkingHoursViewSet,
+     {'department': '1', 'period': 'week', 'date': '2025-06-15'}),
+]
+
+# Tables that must never be read with a full scan by the queries above
+HOT_TABLES = {
+    ShiftAssignment._meta.db_table,
+    Attendance._meta.db_table,
+    LeaveRequest._meta.db_table,
+    ShiftSwapRequest._meta.db_table,
+    StaffMember._meta.db_table,
+    WorkingHours._meta.db_table,
+}
+
+# A SQLite plan row reading a whole table, or a whole index of it
+SQLITE_SCAN = re.compile(r'^SCAN (\S+)(?: USING (?:COVERING )?INDEX (\S+))?(?: LEFT-JOIN)?$')
+POSTGRESQL_SCAN = re.compile(r'Seq Scan on (\w+)')
+# Aliases Django gives tables in joins and subqueries ("shift_shiftassignment" U0)
+TABLE_ALIAS = re.compile(r'"(\w+)" ([TU]\d+)\b')
+
+
+def seed_dataset(n_staff=200, n_days=30):
+    """
+    Seeds a throwaway database with a realistic mix of rows for the planner
+    """
+    start = date(2025, 6, 1)
+    departments = Department.objects.bulk_create([Department(name=f'Department {i}') for i in range(8)])
+    roles = Role.objects.bulk_create([Role(name=f'Role {i}') for i in range(4)])
+    shifts = Shift.objects.bulk_create([
+        Shift(name='Morning', start_time=time(7), end_time=time(15)),
+        Shift(name='Evening', start_time=time(15), end_time=time(23)),
+        Shift(name='Night', start_time=time(23), end_time=time(7)),
+    ])
+    users = User.objects.bulk_create([User(username=f'plan-user-{i}') for i in range(n_staff)])
+    staff = StaffMember.objects.bulk_create([
+        StaffMember(user=user, staff_id=f'STAFF{i:05d}', department=departments[i % len(departments)],
+                    role=roles[i % len(roles)], phone_number=f'555{i:07d}')
+        for i, user in enumerate(users)
+    ])
+    assignments = ShiftAssignment.objects.bulk_create([
+        ShiftAssignment(staff_member=member, shift=shifts[(i + day) % len(shifts)],
+                        date=start + timedelta(days=day), is_active=(i + day) % 17 != 0)
+        for day in range(n_days) for i, member in enumerate(staff)
+    ], batch_size=1000)
+    Attendance.objects.bulk_create([
+        Attendance(staff_member_id=assignment.staff_member_id, shift_assignment=assignment, date=assignment.date,
+                   status=('present', 'late', 'absent')[assignment.id % 3])
+        for assignment in assignments
+    ], batch_size=1000)
+    LeaveRequest.objects.bulk_create([
+        LeaveRequest(staff_member=member, leave_type='vacation', start_date=start + timedelta(days=i % n_days),
+                     end_date=start + timedelta(days=i % n_days + 2), status=('pending', 'approved')[i % 2])
+        for i, member in enumerate(staff)
+    ])
+    ShiftSwapRequest.objects.bulk_create([
+        ShiftSwapRequest(requester_assignment=assignments[i], recipient=staff[(i + 1) % n_staff],
+                         status=('pending', 'approved', 'rejected')[i % 3])
+        for i in range(0, len(assignments), 7)
+    ], batch_size=1000)
+    WorkingHours.objects.bulk_create([
+        WorkingHours(staff_member=member, department_id=member.department_id, period=period,
+                     period_start=period_start, worked_minutes=450 * shifts, shift_count=shifts)
+        for member in staff
+        for period, period_start, shifts in (
+            [('month', date(2025, month, 1), 20) for month in range(1, 13)]
+            + [('week', date(2024, 12, 30) + timedelta(weeks=week), 5) for week in range(52)]
+        )
+    ], batch_size=1000)
+
+
+def build_queryset(viewset_class, params):
+    """
+    Builds the list queryset a viewset would run for the given query params
+    """
+    view = viewset_class()
+    view.request = Request(APIRequestFactory().get('/', params))
+    view.format_kwarg = None
+    view.action = 'list'
+    view.kwargs = {}
+    return view.filter_queryset(view.get_queryset())
+
+
+def full_scans(queryset):
+    """
+    Returns the full table and full index scans of hot tables in the queryset's plan
+    """
+    plan = queryset.explain()
+    if connection.vendor == 'postgresql':
+        return [f'full table scan of {table}' for table in POSTGRESQL_SCAN.findall(plan) if table in HOT_TABLES]
+
+    aliases = dict((alias, table) for table, alias in TABLE_ALIAS.findall(str(queryset.query)))
+    scans = []
+    for row in plan.splitlines():
+        # Rows are "id parent notused detail"
+        match = SQLITE_SCAN.match(row.split(' ', 3)[-1])
+        if match is None:
+            continue
+        table, index = match.groups()
+        table = aliases.get(table, table)
+        if table not in HOT_TABLES:
+            continue
+        # Walking a whole index reads as many entries as the table has rows
+        scans.append(f'full index scan of {table} ({index})' if index else f'full table scan of {table}')
+    return scans
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'Query plans are only checked on SQLite and PostgreSQL')
+class QueryPlanTests(TestCase):
+    """
+    The hot list filters read their tables through an index, on a seeded
+    dataset with planner statistics
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            if connection.vendor == 'postgresql':
+                # Small seeded tables make sequential scans cheap; only report them when no index is usable
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def test_hot_queries_use_indexes(self):
+        for label, viewset_class, params in HOT_QUERIES:
+            with self.subTest(label):
+                queryset = build_queryset(viewset_class, params)
+                self.assertEqual(full_scans(queryset), [], queryset.explain())
@@ -1,6 +1,7 @@
-from django.contrib import admin
-from .models import LeaveRequest, Attendance
+from django.contrib import admin, messages
+from .models import LeaveRequest, Attendance, WorkingHours, LeaveLedgerEntry, LeaveBalance
 from unfold.admin import ModelAdmin
+from .leave import decide_leave_requests, post_ledger_entries
 
 
 @admin.register(LeaveRequest)
@@ -26,12 +27,35 @@ class LeaveRequestAdmin(ModelAdmin):
         return obj.get_status_display()
     status_display.short_description = 'Status'
     
+    def _decide_leaves(self, request, queryset, decision):
+        result = decide_leave_requests(list(queryset.values_list('id', flat=True)), decision, request.user)
+        
+        self.message_user(request, f"{len(result['decided'])} leave requests {decision}.", messages.SUCCESS)
+        if result['deactivated_assignments']:
+            self.message_user(request, f"{result['deactivated_assignments']} shift assignments deactivated, "
+                                       f"{len(result['coverage_gaps'])} shifts lost coverage.", messages.WARNING)
+        for error in result['errors']:
+            self.message_user(request, f"Leave request {error['id']}: {error['error']}", messages.ERROR)
+    
+    def has_delete_permission(self, request, obj=None):
+        # Approved leave is cancelled instead, which gives its days back on the ledger
+        if obj is not None and obj.status == 'approved':
+            return False
+        return super().has_delete_permission(request, obj)
+    
+    def delete_queryset(self, request, queryset):
+        approved = queryset.filter(status='approved').count()
+        if approved:
+            self.message_user(request, f"{approved} approved leave requests were kept; cancel them instead.",
+                              messages.WARNING)
+        super().delete_queryset(request, queryset.exclude(status='approved'))
+    
     def approve_leaves(self, request, queryset):
-        queryset.update(status='approved', approved_by=request.user)
+        self._decide_leaves(request, queryset, 'approved')
     approve_leaves.short_description = "Approve selected leave requests"
     
     def reject_leaves(self, request, queryset):
-        queryset.update(status='rejected', approved_by=request.user)
+        self._decide_leaves(request, queryset, 'rejected')
     reject_leaves.short_description = "Reject selected leave requests"
     
     actions = ['approve_leaves', 'reject_leaves']
@@ -63,3 +87,61 @@ class AttendanceAdmin(ModelAdmin):
     mark_as_absent.short_description = "Mark selected records as absent"
     
     actions = ['mark_as_present', 'mark_as_absent']
+
+
+@admin.register(WorkingHours)
+class WorkingHoursAdmin(ModelAdmin):
+    list_display = ('staff_member', 'department', 'period', 'period_start', 'worked_minutes', 'shift_count')
+    list_filter = ('period', 'department', 'period_start')
+    search_fields = ('staff_member__staff_id', 'staff_member__user__first_name', 'staff_member__user__last_name')
+    date_hierarchy = 'period_start'
+    list_select_related = ('staff_member__user', 'department')
+    readonly_fields = ('staff_member', 'department', 'period', 'period_start', 'worked_minutes', 'shift_count', 'updated_at')
+    
+    def has_add_permission(self, request):
+        # Rollups are computed from the attendance records
+        return False
+
+
+@admin.register(LeaveLedgerEntry)
+class LeaveLedgerEntryAdmin(ModelAdmin):
+    list_display = ('staff_member', 'leave_type', 'entry_type', 'days', 'effective_date', 'leave_request')
+    list_filter = ('entry_type', 'leave_type', 'effective_date')
+    search_fields = ('staff_member__staff_id', 'staff_member__user__first_name', 'staff_member__user__last_name', 'note')
+    date_hierarchy = 'effective_date'
+    list_select_related = ('staff_member__user', 'leave_request')
+    raw_id_fields = ('staff_member', 'leave_request')
+    
+    def get_readonly_fields(self, request, obj=None):
+        # Posted entries are immutable; corrections are new adjustment entries
+        if obj is not None:
+            return [field.name for field in self.model._meta.fields]
+        return ('created_at',)
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+    
+    def formfield_for_choice_field(self, db_field, request, **kwargs):
+        # Accruals, usage and reversals are posted by the system; manual entries are adjustments
+        if db_field.name == 'entry_type':
+            kwargs['choices'] = [('adjustment', 'Adjustment')]
+            kwargs['initial'] = 'adjustment'
+        return super().formfield_for_choice_field(db_field, request, **kwargs)
+    
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.entry_type = 'adjustment'
+            post_ledger_entries([obj])
+
+
+@admin.register(LeaveBalance)
+class LeaveBalanceAdmin(ModelAdmin):
+    list_display = ('staff_member', 'leave_type', 'year', 'accrued', 'used', 'remaining')
+    list_filter = ('leave_type', 'year')
+    search_fields = ('staff_member__staff_id', 'staff_member__user__first_name', 'staff_member__user__last_name')
+    list_select_related = ('staff_member__user',)
+    readonly_fields = ('staff_member', 'leave_type', 'year', 'accrued', 'used', 'updated_at')
+    
+    def has_add_permission(self, request):
+        # Balances move only through ledger entries
+        return False
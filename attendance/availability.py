@@ -0,0 +1,59 @@
+from .models import LeaveRequest
+
+
+class LeaveCalendar:
+    """
+    In-memory leave calendar for a date range.
+
+    Loaded with one interval query, it keeps one bitmap per staff member (bit
+    ``n`` set when the staff member is on leave ``n`` days after ``start_date``),
+    so scheduling code can ask whether someone is on leave on a given day
+    without touching the database.
+    """
+    def __init__(self, start_date, end_date, staff_member_ids=None, statuses=('approved',)):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.days = (end_date - start_date).days + 1
+        self.masks = {}
+
+        leaves = LeaveRequest.objects.filter(status__in=statuses).overlapping(start_date, end_date)
+        if staff_member_ids is not None:
+            leaves = leaves.filter(staff_member_id__in=staff_member_ids)
+
+        for staff_member_id, leave_start, leave_end in leaves.values_list('staff_member_id', 'start_date', 'end_date'):
+            first = max((leave_start - start_date).days, 0)
+            last = min((leave_end - start_date).days, self.days - 1)
+            span = ((1 << (last - first + 1)) - 1) << first
+            self.masks[staff_member_id] = self.masks.get(staff_member_id, 0) | span
+
+    def _offset(self, date):
+        offset = (date - self.start_date).days
+        if not 0 <= offset < self.days:
+            raise ValueError(f"{date} is outside the calendar ({self.start_date} to {self.end_date})")
+        return offset
+
+    def on_leave(self, staff_member_id, date):
+        """
+        Returns True if the staff member is on leave on the given date
+        """
+        return bool(self.masks.get(staff_member_id, 0) >> self._offset(date) & 1)
+
+    def is_available(self, staff_member_id, date):
+        return not self.on_leave(staff_member_id, date)
+
+    def leave_offsets(self, staff_member_id):
+        """
+        Yields the day offsets (from start_date) the staff member is on leave
+        """
+        mask = self.masks.get(staff_member_id, 0)
+        while mask:
+            lowest = mask & -mask
+            yield lowest.bit_length() - 1
+            mask ^= lowest
+
+    def staff_on_leave(self, date):
+        """
+        Returns the ids of the staff members on leave on the given date
+        """
+        offset = self._offset(date)
+        return {staff_member_id for staff_member_id, mask in self.masks.items() if mask >> offset & 1}
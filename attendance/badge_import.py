@@ -0,0 +1,202 @@
+import datetime
+import io
+import mmap
+import time
+from django.utils import timezone
+from shift.models import ShiftAssignment
+from staff.models import StaffMember
+from .checkins import upsert_attendance
+from .models import Attendance
+from .no_shows import shift_end
+
+# How far outside a shift a tap is still matched to it
+BADGE_MATCH_MARGIN = datetime.timedelta(hours=2)
+
+BADGE_DIRECTIONS = {
+    b'IN': 'check_in',
+    b'OUT': 'check_out',
+}
+
+
+def _read_lines(source):
+    """
+    Yields the lines of a binary file, memory-mapping it when it is backed by a real file
+    """
+    try:
+        mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        # In-memory uploads have no descriptor and empty files cannot be mapped
+        source.seek(0)
+        yield from source
+        return
+
+    with mapped:
+        yield from iter(mapped.readline, b'')
+
+
+def parse_badge_line(line):
+    """
+    Parses a '<ISO timestamp> <staff ID> <IN|OUT>' log line into (timestamp, staff_id, type).
+    Returns None for blank and comment lines; raises ValueError for malformed ones.
+    """
+    fields = line.split()
+    if not fields or fields[0].startswith(b'#'):
+        return None
+    if len(fields) != 3 or fields[2].upper() not in BADGE_DIRECTIONS:
+        raise ValueError(line)
+
+    timestamp = datetime.datetime.fromisoformat(fields[0].decode('ascii'))
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    return timestamp, fields[1].decode('utf-8'), BADGE_DIRECTIONS[fields[2].upper()]
+
+
+class _DayAssignments:
+    """
+    Lazily loads the active assignments of each day once, indexed by staff member
+    """
+    def __init__(self):
+        self.days = {}
+
+    def get(self, date):
+        if date not in self.days:
+            by_staff = {}
+            assignments = ShiftAssignment.objects.filter(date=date, is_active=True).values_list(
+                'id', 'staff_member_id', 'date', 'shift__start_time', 'shift__end_time'
+            )
+            for assignment_id, staff_member_id, day, start_time, end_time in assignments:
+                start = timezone.make_aware(datetime.datetime.combine(day, start_time))
+                by_staff.setdefault(staff_member_id, []).append(
+                    (assignment_id, day, start_time, start, shift_end(day, start_time, end_time))
+                )
+            self.days[date] = by_staff
+        return self.days[date]
+
+
+def _match(assignments, staff_member_id, timestamp, event_type):
+    """
+    Returns the assignment (of the tap's day or an overnight shift of the day before)
+    whose start (for check-ins) or end (for check-outs) is closest to the tap
+    """
+    date = timezone.localtime(timestamp).date()
+    candidates = (
+        assignments.get(date).get(staff_member_id, [])
+        + assignments.get(date - datetime.timedelta(days=1)).get(staff_member_id, [])
+    )
+
+    best = None
+    for candidate in candidates:
+        start, end = candidate[3], candidate[4]
+        if not start - BADGE_MATCH_MARGIN <= timestamp <= end + BADGE_MATCH_MARGIN:
+            continue
+        distance = abs(timestamp - (start if event_type == 'check_in' else end))
+        if best is None or distance < best[0]:
+            best = (distance, candidate)
+    return best[1] if best else None
+
+
+def import_badge_log(sources, dry_run=False):
+    """
+    Imports badge-reader logs into attendance records.
+
+    ``sources`` are binary files of '<ISO timestamp> <staff ID> <IN|OUT>' lines
+    (naive timestamps are in the server time zone). Files are streamed line by
+    line, memory-mapped where possible. Each tap is matched to the staff
+    member's shift of that day, or the overnight shift of the day before, with
+    the assignments loaded once per day. Repeated taps collapse to the first
+    check-in and the last check-out per shift, existing times are only moved
+    earlier (check-in) or later (check-out) so replaying a log is harmless, and
+    the records are written with one bulk upsert. Nothing is written with ``dry_run``.
+
+    Returns a report of the counts and the throughput.
+    """
+    started = time.perf_counter()
+    report = {
+        'lines': 0, 'events': 0, 'malformed': 0, 'unknown_staff': 0, 'unmatched': 0,
+        'duplicates': 0, 'missing_check_in': 0, 'check_out_before_check_in': 0,
+        'created': 0, 'updated': 0, 'dry_run': dry_run,
+    }
+
+    staff_ids = dict(StaffMember.objects.values_list('staff_id', 'id'))
+    assignments = _DayAssignments()
+    # assignment id -> [staff member id, date, shift start time, first check-in, last check-out]
+    taps = {}
+
+    for source in sources:
+        for line in _read_lines(source):
+            report['lines'] += 1
+            try:
+                event = parse_badge_line(line)
+            except (ValueError, UnicodeError):
+                report['malformed'] += 1
+                continue
+            if event is None:
+                continue
+
+            report['events'] += 1
+            timestamp, staff_id, event_type = event
+            staff_member_id = staff_ids.get(staff_id)
+            if staff_member_id is None:
+                report['unknown_staff'] += 1
+                continue
+
+            assignment = _match(assignments, staff_member_id, timestamp, event_type)
+            if assignment is None:
+                report['unmatched'] += 1
+                continue
+
+            assignment_id, day, start_time = assignment[:3]
+            tap = taps.setdefault(assignment_id, [staff_member_id, day, start_time, None, None])
+            if event_type == 'check_in':
+                if tap[3] is not None:
+                    report['duplicates'] += 1
+                if tap[3] is None or timestamp < tap[3]:
+                    tap[3] = timestamp
+            else:
+                if tap[4] is not None:
+                    report['duplicates'] += 1
+                if tap[4] is None or timestamp > tap[4]:
+                    tap[4] = timestamp
+
+    existing = {
+        record.shift_assignment_id: record
+        for record in Attendance.objects.filter(shift_assignment_id__in=taps)
+    }
+
+    changed = []
+    for assignment_id, (staff_member_id, day, start_time, check_in, check_out) in taps.items():
+        record = existing.get(assignment_id)
+        if record is None:
+            record = Attendance(staff_member_id=staff_member_id, shift_assignment_id=assignment_id, date=day)
+
+        dirty = record.pk is None
+        if check_in and (record.check_in_time is None or check_in < record.check_in_time):
+            record.check_in_time = check_in
+            dirty = True
+        if check_out and (record.check_out_time is None or check_out > record.check_out_time):
+            record.check_out_time = check_out
+            dirty = True
+        if record.check_out_time and (record.check_in_time is None or record.check_out_time < record.check_in_time):
+            # Same rule as the kiosk: a check-out needs an earlier check-in. The bad
+            # check-out is dropped and reported; a check-in is kept
+            record.check_out_time = None
+            if record.check_in_time is not None:
+                report['check_out_before_check_in'] += 1
+            else:
+                report['missing_check_in'] += 1
+                if record.pk is None:
+                    continue
+        if record.check_in_time and record.status != 'leave':
+            record.status = Attendance.check_in_status(day, start_time, record.check_in_time)
+
+        if dirty:
+            report['created' if record.pk is None else 'updated'] += 1
+            changed.append(record)
+
+    if not dry_run:
+        upsert_attendance(changed)
+
+    elapsed = time.perf_counter() - started
+    report['elapsed'] = round(elapsed, 3)
+    report['events_per_second'] = round(report['events'] / elapsed) if elapsed else report['events']
+    return report
@@ -0,0 +1,165 @@
+from django.db import transaction
+from django.utils import timezone
+from shift.models import ShiftAssignment
+from staff.models import StaffMember
+from .models import Attendance
+from .serializers import KioskEventSerializer
+from .working_hours import refresh_working_hours
+
+UPSERT_BATCH_SIZE = 500
+UPSERT_FIELDS = ['status', 'check_in_time', 'check_out_time', 'updated_at']
+
+
+def _merge_stored(new_records):
+    """
+    Points the new records at the rows now stored for their staff member, date
+    and assignment: the ones just inserted, or the ones a single check-in or
+    check-out created concurrently. The rows are locked and the records take
+    over what they leave empty, so a check-in or check-out written in between
+    is kept, as is a 'leave' status. Returns the records differing from their row.
+    """
+    stored = {
+        (row.staff_member_id, row.date, row.shift_assignment_id): row
+        for row in Attendance.objects.select_for_update().filter(
+            shift_assignment_id__in={record.shift_assignment_id for record in new_records}
+        )
+    }
+
+    changed = []
+    for record in new_records:
+        row = stored[(record.staff_member_id, record.date, record.shift_assignment_id)]
+        record.pk = row.pk
+        if row.status == 'leave':
+            record.status = row.status
+        if record.check_in_time is None:
+            record.check_in_time = row.check_in_time
+        if record.check_out_time is None:
+            record.check_out_time = row.check_out_time
+        if any(getattr(record, field) != getattr(row, field) for field in ('status', 'check_in_time', 'check_out_time')):
+            changed.append(record)
+    return changed
+
+
+def upsert_attendance(records, now=None):
+    """
+    Writes new and changed attendance records in bulk and refreshes the
+    working hours rollups they touch
+    """
+    now = now or timezone.now()
+    records = list(records)
+    new_records = [record for record in records if record.pk is None]
+    existing_records = [record for record in records if record.pk is not None]
+
+    with transaction.atomic():
+        # A record created concurrently by a single check-in is merged with rather than duplicated or overwritten
+        Attendance.objects.bulk_create(new_records, batch_size=UPSERT_BATCH_SIZE, ignore_conflicts=True)
+        if new_records:
+            existing_records += _merge_stored(new_records)
+        for record in existing_records:
+            record.updated_at = now
+        Attendance.objects.bulk_update(existing_records, UPSERT_FIELDS, batch_size=UPSERT_BATCH_SIZE)
+        # Bulk writes send no signals, so the working hours rollups are refreshed explicitly
+        refresh_working_hours(
+            (record.staff_member_id, record.date) for record in records if record.check_out_time
+        )
+
+
+def record_check_events(events):
+    """
+    Applies a batch of check-in/check-out events.
+
+    ``events`` is a list of dicts with ``staff_id``, ``shift_assignment_id``,
+    ``type`` ('check_in' or 'check_out') and an optional ``timestamp``
+    (defaults to now). Staff members, assignments and existing attendance
+    records are resolved with one query each, events are applied in order in
+    memory using the same rules as the single check_in/check_out actions, and
+    the touched records are written with one bulk upsert.
+
+    Returns one outcome dict per event, in input order.
+    """
+    now = timezone.now()
+    outcomes = []
+    parsed = {}
+
+    for index, event in enumerate(events):
+        serializer = KioskEventSerializer(data=event)
+        if serializer.is_valid():
+            parsed[index] = serializer.validated_data
+            outcomes.append({'index': index, 'status': 'ok'})
+        else:
+            outcomes.append({'index': index, 'status': 'error', 'errors': serializer.errors})
+
+    staff_ids = dict(StaffMember.objects.filter(
+        staff_id__in={data['staff_id'] for data in parsed.values()}
+    ).values_list('staff_id', 'id'))
+
+    assignments = ShiftAssignment.objects.filter(
+        id__in={data['shift_assignment_id'] for data in parsed.values()}
+    ).select_related('shift').only('id', 'staff_member_id', 'date', 'shift__start_time').in_bulk()
+
+    records = {
+        record.shift_assignment_id: record
+        for record in Attendance.objects.filter(shift_assignment_id__in=assignments)
+        if record.staff_member_id == assignments[record.shift_assignment_id].staff_member_id
+        and record.date == assignments[record.shift_assignment_id].date
+    }
+
+    touched = {}
+
+    for index, data in parsed.items():
+        outcome = outcomes[index]
+        staff_member_id = staff_ids.get(data['staff_id'])
+        assignment = assignments.get(data['shift_assignment_id'])
+        timestamp = data.get('timestamp') or now
+        error = None
+
+        if staff_member_id is None:
+            error = 'Staff member not found'
+        elif assignment is None:
+            error = 'Shift assignment not found'
+        elif assignment.staff_member_id != staff_member_id:
+            error = 'This shift is not assigned to this staff member'
+        else:
+            record = records.get(assignment.id)
+
+            if data['type'] == 'check_in':
+                if record is not None and record.check_in_time:
+                    error = 'You have already checked in for this shift'
+                else:
+                    if record is None:
+                        record = Attendance(
+                            staff_member_id=staff_member_id,
+                            shift_assignment_id=assignment.id,
+                            date=assignment.date
+                        )
+                        records[assignment.id] = record
+                    record.check_in_time = timestamp
+                    if record.status != 'leave':
+                        record.status = Attendance.check_in_status(
+                            assignment.date, assignment.shift.start_time, timestamp
+                        )
+            else:
+                if record is None or not record.check_in_time:
+                    error = 'You need to check in before checking out'
+                elif record.check_out_time:
+                    error = 'You have already checked out for this shift'
+                elif timestamp < record.check_in_time:
+                    error = 'Check-in time must be before check-out time.'
+                else:
+                    record.check_out_time = timestamp
+
+            if error is None:
+                touched[assignment.id] = record
+                outcome['attendance_status'] = record.status
+
+        if error is not None:
+            outcome['status'] = 'error'
+            outcome['error'] = error
+
+    upsert_attendance(touched.values(), now)
+
+    for index, data in parsed.items():
+        if outcomes[index]['status'] == 'ok':
+            outcomes[index]['attendance'] = touched[data['shift_assignment_id']].pk
+
+    return outcomes
@@ -0,0 +1,397 @@
+import datetime
+from collections import Counter
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from shift.models import ShiftAssignment
+from shift.schedule import refresh_schedule_entries
+from staff.models import StaffMember
+from .models import LeaveBalance, LeaveLedgerEntry, LeaveRequest
+
+LEDGER_BATCH_SIZE = 500
+# Leaves matched per covered-assignment query; SQLite caps the depth of the OR'ed expression tree at 1000
+COVERAGE_BATCH_SIZE = 200
+
+
+def leave_days_by_year(start_date, end_date):
+    """
+    Returns [(year, first day, number of days)] for each calendar year a leave spans
+    """
+    spans = []
+    first = start_date
+    while first <= end_date:
+        last = min(end_date, datetime.date(first.year, 12, 31))
+        spans.append((first.year, first, (last - first).days + 1))
+        first = last + datetime.timedelta(days=1)
+    return spans
+
+
+def leave_usage_entries(leave_request, entry_type='usage'):
+    """
+    Builds the ledger entries charging (usage) or giving back (reversal) the days of a leave
+    """
+    sign = -1 if entry_type == 'usage' else 1
+    return [
+        LeaveLedgerEntry(
+            staff_member_id=leave_request.staff_member_id,
+            leave_type=leave_request.leave_type,
+            entry_type=entry_type,
+            days=Decimal(sign * days),
+            effective_date=first,
+            leave_request_id=leave_request.id
+        )
+        for year, first, days in leave_days_by_year(leave_request.start_date, leave_request.end_date)
+    ]
+
+
+def post_ledger_entries(entries):
+    """
+    Appends entries to the leave ledger and applies them to the running balances
+    in the same transaction. Accruals and adjustments move the accrued days;
+    usage and reversals move the used days.
+    """
+    deltas = {}
+    for entry in entries:
+        key = (entry.staff_member_id, entry.leave_type, entry.effective_date.year)
+        delta = deltas.setdefault(key, [Decimal(0), Decimal(0)])
+        if entry.entry_type in ('accrual', 'adjustment'):
+            delta[0] += entry.days
+        else:
+            delta[1] -= entry.days
+
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        LeaveLedgerEntry.objects.bulk_create(entries, batch_size=LEDGER_BATCH_SIZE)
+        LeaveBalance.objects.bulk_create(
+            [LeaveBalance(staff_member_id=staff_member_id, leave_type=leave_type, year=year)
+             for staff_member_id, leave_type, year in deltas],
+            batch_size=LEDGER_BATCH_SIZE,
+            ignore_conflicts=True
+        )
+
+        # Keys moving by the same amounts share one UPDATE; F() increments keep concurrent posts additive
+        groups = {}
+        for (staff_member_id, leave_type, year), (accrued, used) in deltas.items():
+            groups.setdefault((leave_type, year, accrued, used), []).append(staff_member_id)
+
+        now = timezone.now()
+        for (leave_type, year, accrued, used), staff_ids in groups.items():
+            for offset in range(0, len(staff_ids), LEDGER_BATCH_SIZE):
+                LeaveBalance.objects.filter(
+                    staff_member_id__in=staff_ids[offset:offset + LEDGER_BATCH_SIZE],
+                    leave_type=leave_type,
+                    year=year
+                ).update(accrued=F('accrued') + accrued, used=F('used') + used, updated_at=now)
+
+
+def _overdraft(year, remaining, days):
+    if remaining < days:
+        return f"Insufficient leave balance for {year}: {remaining} days left, {days} requested."
+    return None
+
+
+def check_leave_balance(staff_member_id, leave_type, start_date, end_date, leave_request=None):
+    """
+    Returns an error message if a leave would exceed the staff member's balance,
+    None otherwise. Leave types without a balance row are not limited. When an
+    existing ``leave_request`` is being changed, the days it already charged
+    are counted as available again.
+    """
+    spans = leave_days_by_year(start_date, end_date)
+    years = [year for year, first, days in spans]
+    balances = {
+        balance.year: balance for balance in LeaveBalance.objects.filter(
+            staff_member_id=staff_member_id,
+            leave_type=leave_type,
+            year__in=years
+        )
+    }
+
+    charged = {}
+    if leave_request is not None and leave_request.pk is not None:
+        # Net of the request's usage and reversal entries, negative while it is charged
+        charged = dict(LeaveLedgerEntry.objects.filter(
+            leave_request_id=leave_request.pk,
+            staff_member_id=staff_member_id,
+            leave_type=leave_type,
+            entry_type__in=('usage', 'reversal'),
+            effective_date__year__in=years
+        ).values_list('effective_date__year').annotate(days=Sum('days')).order_by())
+
+    for year, first, days in spans:
+        balance = balances.get(year)
+        if balance is not None:
+            error = _overdraft(year, balance.remaining - charged.get(year, 0), days)
+            if error:
+                return error
+    return None
+
+
+def _charge_balances(leave_requests):
+    """
+    Charges the leaves, in order, against their balance rows locked for the
+    rest of the transaction. Returns {leave request id: error} for the leaves
+    that would overdraw a balance; those are not charged.
+    """
+    spans = {
+        leave_request.id: leave_days_by_year(leave_request.start_date, leave_request.end_date)
+        for leave_request in leave_requests
+    }
+    remaining = {
+        (balance.staff_member_id, balance.leave_type, balance.year): balance.remaining
+        for balance in LeaveBalance.objects.select_for_update().filter(
+            staff_member_id__in={leave_request.staff_member_id for leave_request in leave_requests},
+            leave_type__in={leave_request.leave_type for leave_request in leave_requests},
+            year__in={year for leave_spans in spans.values() for year, first, days in leave_spans}
+        )
+    }
+
+    errors = {}
+    for leave_request in leave_requests:
+        keys = [
+            ((leave_request.staff_member_id, leave_request.leave_type, year), year, days)
+            for year, first, days in spans[leave_request.id]
+        ]
+        for key, year, days in keys:
+            error = _overdraft(year, remaining[key], days) if key in remaining else None
+            if error:
+                errors[leave_request.id] = error
+                break
+        else:
+            for key, year, days in keys:
+                if key in remaining:
+                    remaining[key] -= days
+    return errors
+
+
+def update_leave_request(leave_request, changes):
+    """
+    Applies ``changes`` (field values) to a leave request. If it is approved
+    and its staff member, type or dates change, the days it charged are given
+    back and the new ones charged. Returns the saved request.
+    """
+    charged_fields = ('staff_member_id', 'leave_type', 'start_date', 'end_date')
+    with transaction.atomic():
+        charged = tuple(getattr(leave_request, field) for field in charged_fields)
+        reversal = leave_usage_entries(leave_request, 'reversal') if leave_request.status == 'approved' else []
+
+        for field, value in changes.items():
+            setattr(leave_request, field, value)
+        leave_request.save()
+
+        if reversal and charged != tuple(getattr(leave_request, field) for field in charged_fields):
+            post_ledger_entries(reversal + leave_usage_entries(leave_request))
+    return leave_request
+
+
+def cancel_leave_request(leave_request):
+    """
+    Cancels a pending or approved leave request; cancelling an approved leave
+    gives its days back on the ledger. Returns an error message or None.
+    """
+    with transaction.atomic():
+        leave_request = LeaveRequest.objects.select_for_update().get(pk=leave_request.pk)
+        if leave_request.status not in ('pending', 'approved'):
+            return 'This request cannot be cancelled'
+
+        was_approved = leave_request.status == 'approved'
+        leave_request.status = 'cancelled'
+        leave_request.save()
+
+        if was_approved:
+            post_ledger_entries(leave_usage_entries(leave_request, 'reversal'))
+    return None
+
+
+def delete_leave_request(leave_request):
+    """
+    Deletes a leave request that was never approved. Approved leave keeps its
+    usage on the ledger and must be cancelled instead, which gives its days
+    back. Returns an error message or None.
+    """
+    with transaction.atomic():
+        leave_request = LeaveRequest.objects.select_for_update().filter(pk=leave_request.pk).first()
+        if leave_request is None:
+            return None
+        if leave_request.status == 'approved':
+            return 'Approved leave cannot be deleted; cancel it to give its days back'
+        leave_request.delete()
+    return None
+
+
+def accrue_leave(period_start, rates=None):
+    """
+    Posts one accrual entry per staff member and leave type for the month
+    starting on ``period_start``, using ``rates`` (days per month per leave type,
+    LEAVE_ACCRUAL_RATES by default). Staff members already credited for the
+    month are skipped, so the job can be re-run safely.
+
+    Returns the number of entries posted.
+    """
+    rates = {
+        leave_type: Decimal(str(days))
+        for leave_type, days in (rates if rates is not None else getattr(settings, 'LEAVE_ACCRUAL_RATES', {})).items()
+    }
+    if not rates:
+        return 0
+
+    credited = set(LeaveLedgerEntry.objects.filter(
+        entry_type='accrual',
+        effective_date=period_start,
+        leave_type__in=rates
+    ).values_list('staff_member_id', 'leave_type'))
+
+    note = f"Accrual for {period_start:%Y-%m}"
+    entries = [
+        LeaveLedgerEntry(
+            staff_member_id=staff_member_id,
+            leave_type=leave_type,
+            entry_type='accrual',
+            days=days,
+            effective_date=period_start,
+            note=note
+        )
+        for staff_member_id in StaffMember.objects.order_by('id').values_list('id', flat=True)
+        for leave_type, days in rates.items()
+        if (staff_member_id, leave_type) not in credited
+    ]
+
+    post_ledger_entries(entries)
+    return len(entries)
+
+
+def _coverage_gaps(removed):
+    """
+    Reports, per (date, shift, department) that lost staff, how many were removed and how many remain
+    """
+    if not removed:
+        return []
+
+    dates = [date for date, shift_id, department_id in removed]
+    remaining = {
+        (row['date'], row['shift_id'], row['staff_member__department_id']): row['count']
+        for row in ShiftAssignment.objects.filter(
+            is_active=True,
+            date__range=(min(dates), max(dates)),
+            shift_id__in={shift_id for date, shift_id, department_id in removed}
+        ).values('date', 'shift_id', 'staff_member__department_id').annotate(count=Count('id')).order_by()
+    }
+
+    return [
+        {
+            'date': date,
+            'shift': shift_id,
+            'department': department_id,
+            'removed': count,
+            'remaining': remaining.get((date, shift_id, department_id), 0),
+        }
+        for (date, shift_id, department_id), count in sorted(
+            removed.items(), key=lambda item: (item[0][0], item[0][1], item[0][2] or 0)
+        )
+    ]
+
+
+def decide_leave_requests(leave_ids, decision, user):
+    """
+    Approves or rejects a batch of pending leave requests in one transaction.
+
+    Requests that are missing, already processed or (when approving) overlap an
+    approved leave, whether already stored or earlier in the same batch, or
+    would overdraw a leave balance, are reported and skipped. Overlaps are
+    checked against a single range query, balances under their row locks.
+    Approving charges the leave days to the ledger, deactivates every active
+    shift assignment the approved leaves cover with one UPDATE per
+    COVERAGE_BATCH_SIZE leaves, drops their
+    schedule entries and reports the coverage gaps left behind.
+
+    Returns a dict with the decided request ids, the errors per request id,
+    the number of deactivated assignments and the coverage gaps.
+    """
+    if decision not in ('approved', 'rejected'):
+        raise ValueError(f"Unknown leave decision '{decision}'")
+
+    leave_ids = list(dict.fromkeys(leave_ids))
+    errors = {}
+    decided = []
+    deactivated = []
+    removed = Counter()
+
+    with transaction.atomic():
+        requests = LeaveRequest.objects.select_for_update().filter(id__in=leave_ids).in_bulk()
+
+        pending = []
+        for leave_id in leave_ids:
+            leave_request = requests.get(leave_id)
+            if leave_request is None:
+                errors[leave_id] = 'Leave request not found'
+            elif leave_request.status != 'pending':
+                errors[leave_id] = 'This request has already been processed'
+            else:
+                pending.append(leave_request)
+
+        if decision == 'approved' and pending:
+            approved = {}
+            for staff_member_id, start_date, end_date in LeaveRequest.objects.approved().overlapping(
+                min(leave_request.start_date for leave_request in pending),
+                max(leave_request.end_date for leave_request in pending)
+            ).filter(
+                staff_member_id__in={leave_request.staff_member_id for leave_request in pending}
+            ).values_list('staff_member_id', 'start_date', 'end_date'):
+                approved.setdefault(staff_member_id, []).append((start_date, end_date))
+
+            accepted = []
+            for leave_request in pending:
+                ranges = approved.setdefault(leave_request.staff_member_id, [])
+                if any(start <= leave_request.end_date and end >= leave_request.start_date for start, end in ranges):
+                    errors[leave_request.id] = 'There is already an approved leave that overlaps with this period.'
+                    continue
+                ranges.append((leave_request.start_date, leave_request.end_date))
+                accepted.append(leave_request)
+            pending = accepted
+
+            # Validation only checked each request on its own; re-check them together against the locked balances
+            errors.update(_charge_balances(pending))
+            pending = [leave_request for leave_request in pending if leave_request.id not in errors]
+
+        decided = [leave_request.id for leave_request in pending]
+        if decided:
+            LeaveRequest.objects.filter(id__in=decided).update(
+                status=decision, approved_by_id=user.pk, updated_at=timezone.now()
+            )
+
+        if decision == 'approved' and pending:
+            post_ledger_entries([
+                entry for leave_request in pending for entry in leave_usage_entries(leave_request)
+            ])
+
+        if decision == 'approved' and pending:
+            now = timezone.now()
+            for offset in range(0, len(pending), COVERAGE_BATCH_SIZE):
+                covered = ShiftAssignment.objects.filter(is_active=True).filter(reduce(or_, [
+                    Q(staff_member_id=leave_request.staff_member_id,
+                      date__range=(leave_request.start_date, leave_request.end_date))
+                    for leave_request in pending[offset:offset + COVERAGE_BATCH_SIZE]
+                ]))
+                for assignment_id, date, shift_id, department_id in covered.values_list(
+                    'id', 'date', 'shift_id', 'staff_member__department_id'
+                ):
+                    deactivated.append(assignment_id)
+                    removed[(date, shift_id, department_id)] += 1
+
+                covered.update(is_active=False, updated_at=now)
+            refresh_schedule_entries(deactivated)
+
+        gaps = _coverage_gaps(removed)
+
+    return {
+        'decided': decided,
+        'errors': [{'id': leave_id, 'error': error} for leave_id, error in errors.items()],
+        'deactivated_assignments': len(deactivated),
+        'coverage_gaps': gaps,
+    }
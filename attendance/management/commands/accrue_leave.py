@@ -0,0 +1,24 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from attendance.leave import accrue_leave
+
+
+class Command(BaseCommand):
+    help = ("Credit the monthly leave accrual (LEAVE_ACCRUAL_RATES) to every staff member. "
+            "Staff already credited for the month are skipped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help="Month to credit (YYYY-MM), defaults to the current month")
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                period_start = datetime.strptime(options['month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError(f"Invalid month '{options['month']}', expected YYYY-MM")
+        else:
+            period_start = timezone.localdate().replace(day=1)
+
+        posted = accrue_leave(period_start)
+        self.stdout.write(self.style.SUCCESS(f"Posted {posted} accrual entries for {period_start:%Y-%m}"))
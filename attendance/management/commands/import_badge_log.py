@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from attendance.badge_import import import_badge_log
+
+
+class Command(BaseCommand):
+    help = ("Import door controller badge logs ('<ISO timestamp> <staff ID> <IN|OUT>' per line) "
+            "into attendance records")
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help="Badge log files")
+        parser.add_argument('--dry-run', action='store_true', help="Match and count the events without saving")
+
+    def handle(self, *args, **options):
+        sources = []
+        try:
+            for path in options['paths']:
+                sources.append(open(path, 'rb'))
+        except OSError as e:
+            for source in sources:
+                source.close()
+            raise CommandError(f"Cannot read {e.filename}: {e.strerror}")
+
+        try:
+            report = import_badge_log(sources, dry_run=options['dry_run'])
+        finally:
+            for source in sources:
+                source.close()
+
+        for key in ('lines', 'events', 'malformed', 'unknown_staff', 'unmatched', 'duplicates', 'missing_check_in',
+                    'check_out_before_check_in'):
+            self.stdout.write(f"{key.replace('_', ' ').capitalize()}: {report[key]}")
+
+        verb = "Would create" if report['dry_run'] else "Created"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {report['created']} and {'would update' if report['dry_run'] else 'updated'} "
+            f"{report['updated']} attendance records in {report['elapsed']:.2f}s "
+            f"({report['events_per_second']} events/s)"
+        ))
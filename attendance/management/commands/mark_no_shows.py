@@ -0,0 +1,47 @@
+import time
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from attendance.no_shows import NO_SHOW_CHUNK_SIZE, materialize_no_shows
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = ("Record an absent attendance for every active shift assignment that has ended "
+            "without a check-in. Safe to run repeatedly, e.g. from cron.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', help="First day to check (YYYY-MM-DD), defaults to --days ago")
+        parser.add_argument('--end-date', help="Last day to check (YYYY-MM-DD), defaults to today")
+        parser.add_argument('--days', type=int, default=2,
+                            help="Number of past days to check when no start date is given (default 2)")
+        parser.add_argument('--chunk-size', type=int, default=NO_SHOW_CHUNK_SIZE, help="Rows per insert")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the missing records")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("Chunk size must be at least 1.")
+
+        today = timezone.localdate()
+        end_date = _parse_date(options['end_date']) if options['end_date'] else today
+        start_date = (_parse_date(options['start_date']) if options['start_date']
+                      else end_date - timedelta(days=options['days']))
+        if start_date > end_date:
+            raise CommandError("Start date must be before or equal to end date.")
+
+        started = time.perf_counter()
+        count = materialize_no_shows(
+            start_date, end_date, chunk_size=options['chunk_size'], dry_run=options['dry_run']
+        )
+        elapsed = time.perf_counter() - started
+
+        verb = "Found" if options['dry_run'] else "Recorded"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {count} no-shows between {start_date} and {end_date} in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,39 @@
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from attendance.models import Attendance
+from attendance.working_hours import rebuild_working_hours
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = "Rebuild the weekly and monthly working hours rollups from the attendance records"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', help="First day to rebuild (YYYY-MM-DD), defaults to the first attendance")
+        parser.add_argument('--end-date', help="Last day to rebuild (YYYY-MM-DD), defaults to today")
+
+    def handle(self, *args, **options):
+        if options['start_date']:
+            start_date = _parse_date(options['start_date'])
+        else:
+            start_date = Attendance.objects.order_by('date').values_list('date', flat=True).first()
+            if start_date is None:
+                self.stdout.write("No attendance records to aggregate")
+                return
+        end_date = _parse_date(options['end_date']) if options['end_date'] else timezone.localdate()
+        if start_date > end_date:
+            raise CommandError("Start date must be before or equal to end date.")
+
+        started = time.perf_counter()
+        written = rebuild_working_hours(start_date, end_date)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} working hours rollups in {time.perf_counter() - started:.2f}s"
+        ))
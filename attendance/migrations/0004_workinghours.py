@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_attendance_attendance_date_status_idx_and_more'),
+        ('department', '0003_delete_departmentassignment'),
+        ('staff', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkingHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('week', 'ISO Week'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('worked_minutes', models.PositiveIntegerField(default=0)),
+                ('shift_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='department.department')),
+                ('staff_member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='working_hours', to='staff.staffmember')),
+            ],
+            options={
+                'verbose_name_plural': 'Working hours',
+                'ordering': ['-period_start', 'staff_member'],
+                'indexes': [models.Index(fields=['department', 'period', 'period_start'], name='work_hours_dept_period_idx'), models.Index(fields=['period', 'period_start'], name='work_hours_period_idx')],
+                'unique_together': {('staff_member', 'period', 'period_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_workinghours'),
+        ('staff', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leave_type', models.CharField(choices=[('sick', 'Sick Leave'), ('vacation', 'Vacation'), ('personal', 'Personal Leave'), ('maternity', 'Maternity Leave'), ('paternity', 'Paternity Leave'), ('bereavement', 'Bereavement'), ('other', 'Other')], max_length=20)),
+                ('year', models.PositiveSmallIntegerField()),
+                ('accrued', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('used', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('staff_member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_balances', to='staff.staffmember')),
+            ],
+            options={
+                'ordering': ['-year', 'staff_member', 'leave_type'],
+                'unique_together': {('staff_member', 'leave_type', 'year')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaveLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leave_type', models.CharField(choices=[('sick', 'Sick Leave'), ('vacation', 'Vacation'), ('personal', 'Personal Leave'), ('maternity', 'Maternity Leave'), ('paternity', 'Paternity Leave'), ('bereavement', 'Bereavement'), ('other', 'Other')], max_length=20)),
+                ('entry_type', models.CharField(choices=[('accrual', 'Accrual'), ('usage', 'Usage'), ('reversal', 'Reversal'), ('adjustment', 'Adjustment')], max_length=10)),
+                ('days', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('effective_date', models.DateField()),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('leave_request', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='attendance.leaverequest')),
+                ('staff_member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_ledger', to='staff.staffmember')),
+            ],
+            options={
+                'verbose_name_plural': 'Leave ledger entries',
+                'ordering': ['-effective_date', '-id'],
+                'indexes': [models.Index(fields=['staff_member', 'leave_type', 'effective_date'], name='leave_ledger_staff_type_idx'), models.Index(fields=['entry_type', 'effective_date'], name='leave_ledger_entry_type_idx')],
+            },
+        ),
+    ]
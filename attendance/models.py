@@ -1,9 +1,34 @@
+import datetime
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from staff.models import StaffMember
 from shift.models import ShiftAssignment
 
+# Check-ins later than this after the shift start are marked late
+LATE_AFTER = datetime.timedelta(minutes=10)
+
+class LeaveRequestQuerySet(models.QuerySet):
+    """
+    Interval queries on leave requests
+    """
+    def overlapping(self, start_date=None, end_date=None):
+        """
+        Leaves sharing at least one day with the closed range [start_date, end_date];
+        either bound may be omitted to leave that side open
+        """
+        queryset = self
+        if end_date is not None:
+            queryset = queryset.filter(start_date__lte=end_date)
+        if start_date is not None:
+            queryset = queryset.filter(end_date__gte=start_date)
+        return queryset
+    
+    def approved(self):
+        return self.filter(status='approved')
+
+
 class LeaveRequest(models.Model):
     """
     Model for managing staff leave requests
@@ -35,8 +60,15 @@ class LeaveRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = LeaveRequestQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['staff_member', 'start_date', 'end_date'], name='leave_staff_dates_idx'),
+            models.Index(fields=['status', 'start_date'], name='leave_status_start_idx'),
+            models.Index(fields=['start_date', 'end_date'], name='leave_dates_idx'),
+        ]
     
     def __str__(self):
         return f"{self.staff_member.user.get_full_name()} - {self.get_leave_type_display()} ({self.start_date} to {self.end_date})"
@@ -45,11 +77,8 @@ class LeaveRequest(models.Model):
         if self.start_date > self.end_date:
             raise ValidationError("Start date must be before or equal to end date.")
             
-        overlapping_leaves = LeaveRequest.objects.filter(
-            staff_member=self.staff_member,
-            status='approved',
-            start_date__lte=self.end_date,
-            end_date__gte=self.start_date
+        overlapping_leaves = LeaveRequest.objects.approved().overlapping(self.start_date, self.end_date).filter(
+            staff_member=self.staff_member
         ).exclude(pk=self.pk)
         
         if overlapping_leaves.exists():
@@ -93,6 +122,10 @@ class Attendance(models.Model):
     class Meta:
         unique_together = ('staff_member', 'date', 'shift_assignment')
         ordering = ['-date', 'staff_member']
+        indexes = [
+            models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+            models.Index(fields=['status', 'date'], name='attendance_status_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.staff_member.user.get_full_name()} - {self.shift_assignment.shift.name} - {self.date} - {self.get_status_display()}"
@@ -104,23 +137,121 @@ class Attendance(models.Model):
         if self.shift_assignment and self.date != self.shift_assignment.date:
             raise ValidationError("Attendance date must match the shift assignment date.")
     
+    @staticmethod
+    def check_in_status(date, shift_start_time, check_in_time):
+        """
+        Returns 'late' if the check-in is more than LATE_AFTER past the shift start, 'present' otherwise
+        """
+        # Get shift start time as datetime for comparison
+        shift_start = datetime.datetime.combine(date, shift_start_time)
+        if timezone.is_aware(check_in_time):
+            shift_start = timezone.make_aware(shift_start)
+        
+        if check_in_time > shift_start + LATE_AFTER:
+            return 'late'
+        return 'present'
+    
     def save(self, *args, **kwargs):
-        import datetime
         self.full_clean()
         
         # Auto-determine status if check-in exists
         if self.check_in_time and not self.status == 'leave':
-            # Get shift start time as datetime for comparison
-            shift_start = datetime.datetime.combine(
-                self.date,
-                self.shift_assignment.shift.start_time
-            )
-            
-            # If more than 10 minutes late
-            if self.check_in_time > (shift_start + datetime.timedelta(minutes=10)):
-                self.status = 'late'
-            else:
-                self.status = 'present'
+            self.status = self.check_in_status(self.date, self.shift_assignment.shift.start_time, self.check_in_time)
             
         super().save(*args, **kwargs)
 
+
+
+class WorkingHours(models.Model):
+    """
+    Rollup of the minutes worked by a staff member in an ISO week or a calendar month,
+    maintained from the attendance records by attendance.working_hours. Filed under
+    the staff member's department; a transfer only moves the current and later periods.
+    """
+    PERIOD_CHOICES = (
+        ('week', 'ISO Week'),
+        ('month', 'Month'),
+    )
+    
+    staff_member = models.ForeignKey('staff.StaffMember', on_delete=models.CASCADE, related_name='working_hours')
+    department = models.ForeignKey('department.Department', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    worked_minutes = models.PositiveIntegerField(default=0)
+    shift_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('staff_member', 'period', 'period_start')
+        ordering = ['-period_start', 'staff_member']
+        verbose_name_plural = 'Working hours'
+        indexes = [
+            models.Index(fields=['department', 'period', 'period_start'], name='work_hours_dept_period_idx'),
+            models.Index(fields=['period', 'period_start'], name='work_hours_period_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.staff_member} - {self.get_period_display()} of {self.period_start} - {self.worked_minutes} min"
+
+
+class LeaveLedgerEntry(models.Model):
+    """
+    Append-only record of a change to a staff member's leave entitlement: days
+    accrued (positive), used by an approved leave (negative) or given back when
+    an approved leave is cancelled
+    """
+    ENTRY_TYPE_CHOICES = (
+        ('accrual', 'Accrual'),
+        ('usage', 'Usage'),
+        ('reversal', 'Reversal'),
+        ('adjustment', 'Adjustment'),
+    )
+    
+    staff_member = models.ForeignKey('staff.StaffMember', on_delete=models.CASCADE, related_name='leave_ledger')
+    leave_type = models.CharField(max_length=20, choices=LeaveRequest.LEAVE_TYPE_CHOICES)
+    entry_type = models.CharField(max_length=10, choices=ENTRY_TYPE_CHOICES)
+    days = models.DecimalField(max_digits=6, decimal_places=2)
+    effective_date = models.DateField()
+    leave_request = models.ForeignKey(LeaveRequest, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-effective_date', '-id']
+        verbose_name_plural = 'Leave ledger entries'
+        indexes = [
+            models.Index(fields=['staff_member', 'leave_type', 'effective_date'], name='leave_ledger_staff_type_idx'),
+            models.Index(fields=['entry_type', 'effective_date'], name='leave_ledger_entry_type_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.staff_member} - {self.get_leave_type_display()} {self.days:+} ({self.get_entry_type_display()})"
+    
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValidationError("Leave ledger entries cannot be changed once posted.")
+        super().save(*args, **kwargs)
+
+
+class LeaveBalance(models.Model):
+    """
+    Running leave balance per staff member, leave type and calendar year,
+    materialized from the leave ledger
+    """
+    staff_member = models.ForeignKey('staff.StaffMember', on_delete=models.CASCADE, related_name='leave_balances')
+    leave_type = models.CharField(max_length=20, choices=LeaveRequest.LEAVE_TYPE_CHOICES)
+    year = models.PositiveSmallIntegerField()
+    accrued = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    used = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('staff_member', 'leave_type', 'year')
+        ordering = ['-year', 'staff_member', 'leave_type']
+    
+    def __str__(self):
+        return f"{self.staff_member} - {self.get_leave_type_display()} {self.year}: {self.remaining} days left"
+    
+    @property
+    def remaining(self):
+        return self.accrued - self.used
@@ -0,0 +1,145 @@
+import datetime
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from shift.models import ShiftAssignment
+from .models import Attendance
+
+NO_SHOW_CHUNK_SIZE = 1000
+# Number of days read per anti-join query
+NO_SHOW_WINDOW_DAYS = 31
+# Backends supporting the INSERT ... SELECT ... ON CONFLICT DO NOTHING used for ended days
+INSERT_SELECT_VENDORS = {'sqlite', 'postgresql'}
+
+
+def shift_end(date, start_time, end_time):
+    """
+    Returns the aware datetime at which a shift on ``date`` ends; shifts whose end
+    is not after their start run into the next day
+    """
+    end = datetime.datetime.combine(date, end_time)
+    if end_time <= start_time:
+        end += datetime.timedelta(days=1)
+    return timezone.make_aware(end)
+
+
+def _insert_history_no_shows(start_date, end_date, now):
+    """
+    Inserts the absent records of a window of fully ended days with one
+    INSERT ... SELECT anti-join, so the rows never pass through Python
+    """
+    qn = connection.ops.quote_name
+    attendance = Attendance._meta.db_table
+    assignment = ShiftAssignment._meta.db_table
+    timestamp = connection.ops.adapt_datetimefield_value(now)
+
+    sql = (
+        f"INSERT INTO {qn(attendance)} ({qn('staff_member_id')}, {qn('shift_assignment_id')}, {qn('date')}, "
+        f"{qn('status')}, {qn('created_at')}, {qn('updated_at')}) "
+        f"SELECT a.{qn('staff_member_id')}, a.{qn('id')}, a.{qn('date')}, %s, %s, %s "
+        f"FROM {qn(assignment)} a "
+        f"WHERE a.{qn('is_active')} AND a.{qn('date')} BETWEEN %s AND %s "
+        f"AND NOT EXISTS (SELECT 1 FROM {qn(attendance)} t WHERE t.{qn('shift_assignment_id')} = a.{qn('id')}) "
+        f"ON CONFLICT DO NOTHING"
+    )
+    params = [
+        'absent', timestamp, timestamp,
+        connection.ops.adapt_datefield_value(start_date),
+        connection.ops.adapt_datefield_value(end_date),
+    ]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def _missing_no_shows(start_date, end_date):
+    return ShiftAssignment.objects.filter(
+        is_active=True,
+        date__range=(start_date, end_date)
+    ).filter(
+        ~Exists(Attendance.objects.filter(shift_assignment=OuterRef('pk')))
+    ).order_by()
+
+
+def _bulk_insert_no_shows(absent, chunk_size):
+    """
+    Writes absent records with bulk_create in chunks, skipping conflicting rows.
+    Skipped rows are not reported, so the rows inserted are counted as the
+    chunk's absent records before and after; records a check-in created in
+    the meantime are not absent and do not count.
+    """
+    created = 0
+    for offset in range(0, len(absent), chunk_size):
+        chunk = absent[offset:offset + chunk_size]
+        stored = Attendance.objects.filter(
+            shift_assignment_id__in=[record.shift_assignment_id for record in chunk],
+            status='absent'
+        )
+        before = stored.count()
+        Attendance.objects.bulk_create(chunk, ignore_conflicts=True)
+        created += stored.count() - before
+    return created
+
+
+def materialize_no_shows(start_date, end_date, now=None, chunk_size=NO_SHOW_CHUNK_SIZE, dry_run=False):
+    """
+    Records an 'absent' attendance for every active shift assignment between
+    start_date and end_date whose shift has ended without any attendance record.
+
+    Missing records are found with one anti-join per window of days. Days at
+    least two days back have ended entirely, so on SQLite and PostgreSQL their
+    rows are inserted by the database in the same statement (other backends
+    write them like the rest); the last two days are checked against each
+    shift's end time in Python and written with bulk_create in chunks.
+    Conflicting rows are skipped, so running it repeatedly (or concurrently with
+    check-ins) never duplicates records.
+
+    Returns the number of absent records created (or found, with ``dry_run``).
+    """
+    now = now or timezone.now()
+    today = timezone.localtime(now).date()
+    end_date = min(end_date, today)
+    # Shifts of these days may still be running (night shifts end the next day)
+    open_from = today - datetime.timedelta(days=1)
+    created = 0
+
+    window_start = start_date
+    while window_start <= min(end_date, open_from - datetime.timedelta(days=1)):
+        window_end = min(window_start + datetime.timedelta(days=NO_SHOW_WINDOW_DAYS - 1),
+                         end_date, open_from - datetime.timedelta(days=1))
+
+        if dry_run:
+            created += _missing_no_shows(window_start, window_end).count()
+        elif connection.vendor in INSERT_SELECT_VENDORS:
+            with transaction.atomic():
+                created += _insert_history_no_shows(window_start, window_end, now)
+        else:
+            absent = [
+                Attendance(staff_member_id=staff_member_id, shift_assignment_id=assignment_id, date=date, status='absent')
+                for assignment_id, staff_member_id, date in _missing_no_shows(window_start, window_end).values_list(
+                    'id', 'staff_member_id', 'date'
+                )
+            ]
+            with transaction.atomic():
+                created += _bulk_insert_no_shows(absent, chunk_size)
+
+        window_start = window_end + datetime.timedelta(days=1)
+
+    if window_start <= end_date:
+        missing = _missing_no_shows(window_start, end_date).values_list(
+            'id', 'staff_member_id', 'date', 'shift__start_time', 'shift__end_time'
+        )
+        absent = [
+            Attendance(staff_member_id=staff_member_id, shift_assignment_id=assignment_id, date=date, status='absent')
+            for assignment_id, staff_member_id, date, start_time, end_time in missing
+            if shift_end(date, start_time, end_time) <= now
+        ]
+
+        if dry_run:
+            created += len(absent)
+        else:
+            with transaction.atomic():
+                created += _bulk_insert_no_shows(absent, chunk_size)
+
+    return created
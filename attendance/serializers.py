@@ -1,9 +1,11 @@
 from rest_framework import serializers
-from .models import LeaveRequest, Attendance
+from .models import LeaveRequest, Attendance, WorkingHours, LeaveLedgerEntry, LeaveBalance
+from .leave import check_leave_balance, update_leave_request
 from staff.serializers import StaffMemberSerializer
 from shift.serializers import ShiftAssignmentSerializer
+from api.sparse import SparseFieldsMixin
 
-class LeaveRequestSerializer(serializers.ModelSerializer):
+class LeaveRequestSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     staff_member_details = StaffMemberSerializer(source='staff_member', read_only=True)
     approved_by_name = serializers.SerializerMethodField()
     leave_type_display = serializers.CharField(source='get_leave_type_display', read_only=True)
@@ -20,8 +22,24 @@ class LeaveRequestSerializer(serializers.ModelSerializer):
         if obj.approved_by:
             return obj.approved_by.get_full_name()
         return None
+    
+    def validate(self, data):
+        staff_member = data.get('staff_member', getattr(self.instance, 'staff_member', None))
+        leave_type = data.get('leave_type', getattr(self.instance, 'leave_type', None))
+        start_date = data.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = data.get('end_date', getattr(self.instance, 'end_date', None))
+        
+        if staff_member and leave_type and start_date and end_date and start_date <= end_date:
+            error = check_leave_balance(staff_member.id, leave_type, start_date, end_date, self.instance)
+            if error:
+                raise serializers.ValidationError(error)
+        return data
+    
+    def update(self, instance, validated_data):
+        # Moves the ledger usage of an approved leave along with its dates
+        return update_leave_request(instance, validated_data)
 
-class AttendanceSerializer(serializers.ModelSerializer):
+class AttendanceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     staff_member_details = StaffMemberSerializer(source='staff_member', read_only=True)
     shift_assignment_details = ShiftAssignmentSerializer(source='shift_assignment', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
@@ -31,3 +49,51 @@ class AttendanceSerializer(serializers.ModelSerializer):
         fields = ['id', 'staff_member', 'staff_member_details', 'shift_assignment', 'shift_assignment_details',
                   'date', 'status', 'status_display', 'check_in_time', 'check_out_time', 
                   'notes', 'created_at', 'updated_at']
+
+class KioskEventSerializer(serializers.Serializer):
+    """
+    Serializer for a single badge tap sent by a door kiosk
+    """
+    EVENT_TYPE_CHOICES = (
+        ('check_in', 'Check In'),
+        ('check_out', 'Check Out'),
+    )
+    
+    staff_id = serializers.CharField(max_length=50)
+    shift_assignment_id = serializers.IntegerField(min_value=1)
+    timestamp = serializers.DateTimeField(required=False)
+    type = serializers.ChoiceField(choices=EVENT_TYPE_CHOICES, default='check_in')
+
+class WorkingHoursSerializer(serializers.ModelSerializer):
+    staff_id = serializers.CharField(source='staff_member.staff_id', read_only=True)
+    staff_name = serializers.CharField(source='staff_member.user.get_full_name', read_only=True)
+    period_display = serializers.CharField(source='get_period_display', read_only=True)
+    worked_hours = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = WorkingHours
+        fields = ['id', 'staff_member', 'staff_id', 'staff_name', 'department', 'period', 'period_display',
+                  'period_start', 'worked_minutes', 'worked_hours', 'shift_count', 'updated_at']
+        
+    def get_worked_hours(self, obj):
+        return round(obj.worked_minutes / 60, 2)
+
+class LeaveLedgerEntrySerializer(serializers.ModelSerializer):
+    staff_id = serializers.CharField(source='staff_member.staff_id', read_only=True)
+    leave_type_display = serializers.CharField(source='get_leave_type_display', read_only=True)
+    entry_type_display = serializers.CharField(source='get_entry_type_display', read_only=True)
+    
+    class Meta:
+        model = LeaveLedgerEntry
+        fields = ['id', 'staff_member', 'staff_id', 'leave_type', 'leave_type_display', 'entry_type',
+                  'entry_type_display', 'days', 'effective_date', 'leave_request', 'note', 'created_at']
+
+class LeaveBalanceSerializer(serializers.ModelSerializer):
+    staff_id = serializers.CharField(source='staff_member.staff_id', read_only=True)
+    leave_type_display = serializers.CharField(source='get_leave_type_display', read_only=True)
+    remaining = serializers.DecimalField(max_digits=6, decimal_places=2, read_only=True)
+    
+    class Meta:
+        model = LeaveBalance
+        fields = ['id', 'staff_member', 'staff_id', 'leave_type', 'leave_type_display', 'year',
+                  'accrued', 'used', 'remaining', 'updated_at']
@@ -0,0 +1,35 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from shift.models import Shift
+from staff.models import StaffMember
+from .models import Attendance, WorkingHours
+from .working_hours import PERIOD_TRUNCATIONS, defer_working_hours_refresh, period_start, refresh_working_hours_for
+
+
+# Keep the working hours rollups in sync with the attendance records (and shift breaks) they sum
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def refresh_attendance_working_hours(sender, instance, raw=False, **kwargs):
+    if not raw:
+        defer_working_hours_refresh([(instance.staff_member_id, instance.date)])
+
+
+@receiver(post_save, sender=Shift)
+def refresh_shift_working_hours(sender, instance, raw=False, created=False, **kwargs):
+    if not raw and not created:
+        refresh_working_hours_for(shift_assignment__shift=instance, check_out_time__isnull=False)
+
+
+@receiver(post_save, sender=StaffMember)
+def move_staff_working_hours(sender, instance, raw=False, **kwargs):
+    # A transfer moves the current and later periods; past ones stay with the department worked for
+    if not raw:
+        today = timezone.localdate()
+        for period in PERIOD_TRUNCATIONS:
+            WorkingHours.objects.filter(
+                staff_member=instance,
+                period=period,
+                period_start__gte=period_start(period, today)
+            ).exclude(department_id=instance.department_id).update(department_id=instance.department_id)
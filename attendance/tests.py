@@ -1,3 +1,323 @@
-from django.test import TestCase
+import datetime
+import io
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from django.utils import timezone
+from department.models import Department
+from role.models import Role
+from shift.models import Shift, ShiftAssignment
+from staff.models import StaffMember
+from . import checkins, no_shows
+from .badge_import import import_badge_log
+from .checkins import record_check_events
+from .leave import decide_leave_requests, post_ledger_entries
+from .no_shows import materialize_no_shows
+from .models import Attendance, LeaveBalance, LeaveLedgerEntry, LeaveRequest, WorkingHours
+from .serializers import LeaveRequestSerializer
 
-# Create your tests here.
+
+def create_staff_member():
+    department = Department.objects.create(name='Cardiology')
+    role = Role.objects.create(name='Nurse')
+    user = User.objects.create_user('nurse', first_name='Ann', last_name='Lee')
+    return StaffMember.objects.create(
+        user=user, staff_id='STAFF0001', department=department, role=role, phone_number='5550001'
+    )
+
+
+class RecordCheckEventsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        shift = Shift.objects.bulk_create([
+            Shift(name='Morning', start_time=datetime.time(7), end_time=datetime.time(15))
+        ])[0]
+        cls.staff_member = create_staff_member()
+        cls.date = datetime.date(2025, 6, 2)
+        cls.assignment = ShiftAssignment.objects.create(staff_member=cls.staff_member, shift=shift, date=cls.date)
+        cls.shift_start = timezone.make_aware(datetime.datetime.combine(cls.date, datetime.time(7)))
+
+    def event(self, event_type, minutes):
+        return {
+            'staff_id': 'STAFF0001',
+            'shift_assignment_id': self.assignment.id,
+            'type': event_type,
+            'timestamp': self.shift_start + datetime.timedelta(minutes=minutes),
+        }
+
+    def test_check_in_and_out(self):
+        outcomes = record_check_events([self.event('check_in', 5), self.event('check_out', 480)])
+
+        self.assertEqual([outcome['status'] for outcome in outcomes], ['ok', 'ok'])
+        record = Attendance.objects.get()
+        self.assertEqual(record.status, 'present')
+        self.assertEqual(record.check_in_time, self.shift_start + datetime.timedelta(minutes=5))
+        self.assertEqual(record.check_out_time, self.shift_start + datetime.timedelta(minutes=480))
+
+    def test_batch_keeps_concurrent_check_out(self):
+        """
+        A single check-in and check-out landing between the batch's read and
+        its write must not be erased by the batch's check-in
+        """
+        check_out_time = self.shift_start + datetime.timedelta(minutes=470)
+        upsert_attendance = checkins.upsert_attendance
+
+        def concurrent_upsert(records, now=None):
+            Attendance.objects.create(
+                staff_member=self.staff_member,
+                shift_assignment=self.assignment,
+                date=self.date,
+                status='present',
+                check_in_time=self.shift_start,
+                check_out_time=check_out_time
+            )
+            upsert_attendance(records, now)
+
+        with mock.patch.object(checkins, 'upsert_attendance', concurrent_upsert):
+            outcomes = record_check_events([self.event('check_in', 10)])
+
+        record = Attendance.objects.get()
+        self.assertEqual(outcomes[0]['attendance'], record.pk)
+        self.assertEqual(record.check_in_time, self.shift_start + datetime.timedelta(minutes=10))
+        self.assertEqual(record.check_out_time, check_out_time)
+
+    def test_batch_keeps_concurrent_leave_status(self):
+        upsert_attendance = checkins.upsert_attendance
+
+        def concurrent_upsert(records, now=None):
+            Attendance.objects.create(
+                staff_member=self.staff_member, shift_assignment=self.assignment, date=self.date, status='leave'
+            )
+            upsert_attendance(records, now)
+
+        with mock.patch.object(checkins, 'upsert_attendance', concurrent_upsert):
+            record_check_events([self.event('check_in', 30)])
+
+        record = Attendance.objects.get()
+        self.assertEqual(record.status, 'leave')
+        self.assertEqual(record.check_in_time, self.shift_start + datetime.timedelta(minutes=30))
+
+
+class LeaveBalanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff_member = create_staff_member()
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        post_ledger_entries([LeaveLedgerEntry(
+            staff_member=cls.staff_member, leave_type='vacation', entry_type='accrual',
+            days=Decimal(5), effective_date=datetime.date(2025, 1, 1)
+        )])
+
+    def leave_request(self, start_day, end_day):
+        return LeaveRequest.objects.create(
+            staff_member=self.staff_member, leave_type='vacation',
+            start_date=datetime.date(2025, 6, start_day), end_date=datetime.date(2025, 6, end_day)
+        )
+
+    def balance(self):
+        return LeaveBalance.objects.get(staff_member=self.staff_member, leave_type='vacation', year=2025)
+
+    def test_approval_rechecks_pending_requests_together(self):
+        first = self.leave_request(2, 4)
+        second = self.leave_request(10, 12)
+
+        result = decide_leave_requests([first.id, second.id], 'approved', self.admin)
+
+        self.assertEqual(result['decided'], [first.id])
+        self.assertEqual([error['id'] for error in result['errors']], [second.id])
+        self.assertEqual(self.balance().remaining, 2)
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'pending')
+
+    def test_update_of_approved_request_counts_its_own_days(self):
+        leave_request = self.leave_request(2, 4)
+        decide_leave_requests([leave_request.id], 'approved', self.admin)
+        leave_request.refresh_from_db()
+
+        serializer = LeaveRequestSerializer(leave_request, data={'end_date': '2025-06-06'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        self.assertEqual(self.balance().remaining, 0)
+        serializer = LeaveRequestSerializer(leave_request, data={'end_date': '2025-06-07'}, partial=True)
+        self.assertFalse(serializer.is_valid())
+
+    def test_approved_leave_cannot_be_deleted(self):
+        approved = self.leave_request(2, 4)
+        pending = self.leave_request(10, 10)
+        decide_leave_requests([approved.id], 'approved', self.admin)
+        client = APIClient()
+        client.force_authenticate(self.admin)
+
+        response = client.delete(f'/api/v1/attendance/leave-requests/{approved.id}/')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(LeaveRequest.objects.filter(pk=approved.id).exists())
+        self.assertEqual(self.balance().remaining, 2)
+
+        response = client.delete(f'/api/v1/attendance/leave-requests/{pending.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(LeaveRequest.objects.filter(pk=pending.id).exists())
+
+
+class MaterializeNoShowsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        shift = Shift.objects.bulk_create([
+            Shift(name='Morning', start_time=datetime.time(7), end_time=datetime.time(15))
+        ])[0]
+        cls.staff_member = create_staff_member()
+        cls.assignments = [
+            ShiftAssignment.objects.create(staff_member=cls.staff_member, shift=shift, date=datetime.date(2025, 6, day))
+            for day in range(2, 6)
+        ]
+        cls.now = timezone.make_aware(datetime.datetime(2025, 6, 5, 20))
+
+    def test_ended_days_without_insert_select(self):
+        with mock.patch.object(no_shows, 'INSERT_SELECT_VENDORS', set()):
+            self.assertEqual(materialize_no_shows(datetime.date(2025, 6, 1), datetime.date(2025, 6, 5), self.now), 4)
+            self.assertEqual(materialize_no_shows(datetime.date(2025, 6, 1), datetime.date(2025, 6, 5), self.now), 0)
+        self.assertEqual(Attendance.objects.filter(status='absent').count(), 4)
+
+    def test_rows_created_concurrently_are_not_counted(self):
+        bulk_create = Attendance.objects.bulk_create
+
+        def concurrent_bulk_create(records, **kwargs):
+            Attendance.objects.create(
+                staff_member=self.staff_member, shift_assignment=self.assignments[-1],
+                date=self.assignments[-1].date, status='present'
+            )
+            return bulk_create(records, **kwargs)
+
+        with mock.patch.object(Attendance.objects, 'bulk_create', concurrent_bulk_create):
+            created = materialize_no_shows(datetime.date(2025, 6, 4), datetime.date(2025, 6, 5), self.now)
+
+        self.assertEqual(created, 1)
+        self.assertEqual(Attendance.objects.filter(status='absent').count(), 1)
+
+    def test_command_rejects_bad_chunk_size(self):
+        for chunk_size in ('0', '-5'):
+            with self.assertRaisesMessage(CommandError, 'Chunk size must be at least 1.'):
+                call_command('mark_no_shows', '--chunk-size', chunk_size)
+
+
+class WorkingHoursDepartmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.shift = Shift.objects.bulk_create([
+            Shift(name='Morning', start_time=datetime.time(7), end_time=datetime.time(15), break_duration=0)
+        ])[0]
+        cls.staff_member = create_staff_member()
+        cls.first_department = cls.staff_member.department
+        cls.second_department = Department.objects.create(name='Neurology')
+
+    def work(self, date):
+        assignment = ShiftAssignment.objects.create(staff_member=self.staff_member, shift=self.shift, date=date)
+        check_in = timezone.make_aware(datetime.datetime.combine(date, datetime.time(7)))
+        return Attendance.objects.create(
+            staff_member=self.staff_member, shift_assignment=assignment, date=date, status='present',
+            check_in_time=check_in, check_out_time=check_in + datetime.timedelta(hours=8)
+        )
+
+    def departments(self):
+        return dict(WorkingHours.objects.filter(period='month').values_list('period_start', 'department_id'))
+
+    def test_transfer_keeps_past_periods(self):
+        past = datetime.date(2025, 6, 2)
+        today = timezone.localdate()
+        with self.captureOnCommitCallbacks(execute=True):
+            past_attendance = self.work(past)
+            self.work(today)
+
+        self.staff_member.department = self.second_department
+        self.staff_member.save()
+        # Recomputing the past month keeps the department it was worked for
+        with self.captureOnCommitCallbacks(execute=True):
+            past_attendance.check_out_time -= datetime.timedelta(hours=1)
+            past_attendance.save()
+
+        self.assertEqual(self.departments(), {
+            past.replace(day=1): self.first_department.id,
+            today.replace(day=1): self.second_department.id,
+        })
+        self.assertEqual(WorkingHours.objects.get(period='month', period_start=past.replace(day=1)).worked_minutes, 420)
+
+
+class BadgeImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        shift = Shift.objects.bulk_create([
+            Shift(name='Morning', start_time=datetime.time(7), end_time=datetime.time(15))
+        ])[0]
+        cls.staff_member = create_staff_member()
+        cls.assignment = ShiftAssignment.objects.create(
+            staff_member=cls.staff_member, shift=shift, date=datetime.date(2025, 6, 2)
+        )
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def at(self, hour, minute=0):
+        return timezone.make_aware(datetime.datetime(2025, 6, 2, hour, minute))
+
+    def import_lines(self, *lines, dry_run=False):
+        return import_badge_log([io.BytesIO('\n'.join(lines).encode())], dry_run=dry_run)
+
+    def test_check_in_and_out(self):
+        report = self.import_lines(
+            '# door 3',
+            '2025-06-02T07:20:00 STAFF0001 IN',
+            '2025-06-02T07:02:00 STAFF0001 in',
+            '2025-06-02T15:05:00 STAFF0001 OUT',
+            '2025-06-02T07:00:00 NOBODY01 IN',
+            'garbage',
+        )
+
+        self.assertEqual(
+            [report[key] for key in ('lines', 'events', 'malformed', 'unknown_staff', 'duplicates', 'created')],
+            [6, 4, 1, 1, 1, 1]
+        )
+        record = Attendance.objects.get()
+        self.assertEqual((record.check_in_time, record.check_out_time), (self.at(7, 2), self.at(15, 5)))
+        self.assertEqual(record.status, 'present')
+
+        # Replaying the log changes nothing
+        report = self.import_lines('2025-06-02T07:20:00 STAFF0001 IN', '2025-06-02T15:05:00 STAFF0001 OUT')
+        self.assertEqual((report['created'], report['updated']), (0, 0))
+
+    def test_check_out_before_check_in_keeps_check_in(self):
+        report = self.import_lines('2025-06-02T08:30:00 STAFF0001 IN', '2025-06-02T08:00:00 STAFF0001 OUT')
+
+        self.assertEqual((report['created'], report['check_out_before_check_in']), (1, 1))
+        record = Attendance.objects.get()
+        self.assertEqual((record.check_in_time, record.check_out_time), (self.at(8, 30), None))
+        self.assertEqual(record.status, 'late')
+
+    def test_check_out_without_check_in(self):
+        report = self.import_lines('2025-06-02T15:00:00 STAFF0001 OUT')
+
+        self.assertEqual((report['created'], report['missing_check_in']), (0, 1))
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_dry_run(self):
+        report = self.import_lines('2025-06-02T07:00:00 STAFF0001 IN', dry_run=True)
+
+        self.assertEqual(report['created'], 1)
+        self.assertFalse(Attendance.objects.exists())
+
+    @override_settings(BADGE_LOG_UPLOAD_MAX_SIZE=400)
+    def test_upload_size_limit(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        url = '/api/v1/attendance/records/import-badge-log/'
+
+        log = SimpleUploadedFile('badge.log', b'2025-06-02T07:00:00 STAFF0001 IN\n' * 20)
+        response = client.post(url, {'file': log}, format='multipart')
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(Attendance.objects.exists())
+
+        log = SimpleUploadedFile('badge.log', b'2025-06-02T07:00:00 STAFF0001 IN\n')
+        response = client.post(url, {'file': log}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1)
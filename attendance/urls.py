@@ -1,9 +1,13 @@
 from django.urls import path
 from rest_framework import routers
-from .views import LeaveRequestViewSet, AttendanceViewSet
+from .views import (LeaveRequestViewSet, AttendanceViewSet, WorkingHoursViewSet, LeaveBalanceViewSet,
+                    LeaveLedgerEntryViewSet)
 
 router = routers.DefaultRouter()
 router.register(r'leave-requests', LeaveRequestViewSet)
 router.register(r'records', AttendanceViewSet)
+router.register(r'working-hours', WorkingHoursViewSet)
+router.register(r'leave-balances', LeaveBalanceViewSet)
+router.register(r'leave-ledger', LeaveLedgerEntryViewSet)
 
 urlpatterns = router.urls
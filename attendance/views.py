@@ -1,17 +1,27 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import LeaveRequest, Attendance
-from .serializers import LeaveRequestSerializer, AttendanceSerializer
+from rest_framework.exceptions import ValidationError
+from .models import LeaveRequest, Attendance, WorkingHours, LeaveLedgerEntry, LeaveBalance
+from .serializers import (LeaveRequestSerializer, AttendanceSerializer, KioskEventSerializer, WorkingHoursSerializer,
+                          LeaveLedgerEntrySerializer, LeaveBalanceSerializer)
+from .checkins import record_check_events
+from .badge_import import import_badge_log
+from .leave import decide_leave_requests, cancel_leave_request, delete_leave_request
+from .working_hours import period_start
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.contrib.auth.models import User
 from datetime import datetime, timedelta
-from django.db.models import Q
+from django.db.models import Count, Sum
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from api.pagination import DateKeysetPagination, StartDateKeysetPagination
+from api.export import EXPORT_FORMATS, stream_export
+from api.sparse import SparseQuerysetMixin
 
-class LeaveRequestViewSet(viewsets.ModelViewSet):
+class LeaveRequestViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing leave requests
     
@@ -31,11 +41,13 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
     Update part of an existing leave request.
 
     delete:
-    Delete a leave request.
+    Delete a leave request that is not approved; approved leave is cancelled instead.
     """
     queryset = LeaveRequest.objects.all().select_related('staff_member', 'approved_by')
     serializer_class = LeaveRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = StartDateKeysetPagination
+    bulk_max_requests = 1000
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -54,60 +66,94 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
         start_date = self.request.query_params.get('start_date')
         end_date = self.request.query_params.get('end_date')
         
-        if start_date:
-            queryset = queryset.filter(
-                Q(start_date__gte=start_date) | Q(end_date__gte=start_date)
-            )
-        if end_date:
-            queryset = queryset.filter(
-                Q(start_date__lte=end_date) | Q(end_date__lte=end_date)
-            )
+        if start_date or end_date:
+            # Leaves sharing at least one day with the requested range
+            queryset = queryset.overlapping(start_date or None, end_date or None)
             
         return queryset
     
-    @action(detail=True, methods=['post'])
-    def approve(self, request, pk=None):
-        """
-        Approve a leave request
-        """
+    def destroy(self, request, *args, **kwargs):
         leave_request = self.get_object()
         
-        if leave_request.status != 'pending':
-            return Response({'error': 'This request has already been processed'}, 
+        error = delete_leave_request(leave_request)
+        if error:
+            return Response({'error': error}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
-        leave_request.status = 'approved'
-        leave_request.approved_by = request.user
-        leave_request.save()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    def _decide(self, request, decision):
+        leave_request = self.get_object()
+        result = decide_leave_requests([leave_request.id], decision, request.user)
         
-        # Update conflicting shift assignments
-        from shift.models import ShiftAssignment
-        ShiftAssignment.objects.filter(
-            staff_member=leave_request.staff_member,
-            date__range=(leave_request.start_date, leave_request.end_date),
-            is_active=True
-        ).update(is_active=False)
+        if result['errors']:
+            return Response({'error': result['errors'][0]['error']}, 
+                           status=status.HTTP_400_BAD_REQUEST)
         
+        leave_request.refresh_from_db()
         serializer = self.get_serializer(leave_request)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['post'])
+    def approve(self, request, pk=None):
+        """
+        Approve a leave request
+        """
+        return self._decide(request, 'approved')
+    
     @action(detail=True, methods=['post'])
     def reject(self, request, pk=None):
         """
         Reject a leave request
         """
-        leave_request = self.get_object()
+        return self._decide(request, 'rejected')
+    
+    def _bulk_decide(self, request, decision):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else request.data
         
-        if leave_request.status != 'pending':
-            return Response({'error': 'This request has already been processed'}, 
+        if not isinstance(ids, list) or not ids or not all(isinstance(leave_id, int) for leave_id in ids):
+            return Response({'error': 'A non-empty list of leave request ids is required'}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
-        leave_request.status = 'rejected'
-        leave_request.approved_by = request.user
-        leave_request.save()
+        if len(ids) > self.bulk_max_requests:
+            return Response({'error': f'At most {self.bulk_max_requests} leave requests can be processed per request'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = self.get_serializer(leave_request)
-        return Response(serializer.data)
+        return Response(decide_leave_requests(ids, decision, request.user))
+    
+    @swagger_auto_schema(
+        method='post',
+        operation_description="Approve many pending leave requests in one transaction. Overlapping or already "
+                              "processed requests are reported and skipped; the shift assignments covered by the "
+                              "approved leaves are deactivated and the resulting coverage gaps returned.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['ids'],
+            properties={'ids': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER))}
+        )
+    )
+    @action(detail=False, methods=['post'], url_path='bulk-approve')
+    def bulk_approve(self, request):
+        """
+        Approve a batch of leave requests
+        """
+        return self._bulk_decide(request, 'approved')
+    
+    @swagger_auto_schema(
+        method='post',
+        operation_description="Reject many pending leave requests in one transaction",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['ids'],
+            properties={'ids': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER))}
+        )
+    )
+    @action(detail=False, methods=['post'], url_path='bulk-reject')
+    def bulk_reject(self, request):
+        """
+        Reject a batch of leave requests
+        """
+        return self._bulk_decide(request, 'rejected')
     
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
@@ -116,23 +162,24 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
         """
         leave_request = self.get_object()
         
-        if leave_request.status not in ['pending', 'approved']:
-            return Response({'error': 'This request cannot be cancelled'}, 
+        error = cancel_leave_request(leave_request)
+        if error:
+            return Response({'error': error}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
-        leave_request.status = 'cancelled'
-        leave_request.save()
-        
+        leave_request.refresh_from_db()
         serializer = self.get_serializer(leave_request)
         return Response(serializer.data)
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing attendance
     """
     queryset = Attendance.objects.all().select_related('staff_member', 'shift_assignment')
     serializer_class = AttendanceSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = DateKeysetPagination
+    batch_max_events = 2000
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -244,3 +291,276 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         
         serializer = self.get_serializer(attendance)
         return Response(serializer.data)
+    
+    export_columns = [
+        ('id', 'id'),
+        ('date', 'date'),
+        ('staff_id', 'staff_member__staff_id'),
+        ('first_name', 'staff_member__user__first_name'),
+        ('last_name', 'staff_member__user__last_name'),
+        ('department', 'staff_member__department__name'),
+        ('role', 'staff_member__role__name'),
+        ('shift_assignment', 'shift_assignment_id'),
+        ('shift', 'shift_assignment__shift__name'),
+        ('shift_start_time', 'shift_assignment__shift__start_time'),
+        ('shift_end_time', 'shift_assignment__shift__end_time'),
+        ('status', 'status'),
+        ('check_in_time', 'check_in_time'),
+        ('check_out_time', 'check_out_time'),
+        ('notes', 'notes'),
+    ]
+    
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Stream attendance records as CSV or NDJSON, one flat row per record. "
+                              "Accepts the same filters as the list endpoint.",
+        manual_parameters=[
+            openapi.Parameter('file_format', openapi.IN_QUERY, description="csv (default) or ndjson", type=openapi.TYPE_STRING),
+            openapi.Parameter('start_date', openapi.IN_QUERY, description="Start date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+            openapi.Parameter('end_date', openapi.IN_QUERY, description="End date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+            openapi.Parameter('staff_id', openapi.IN_QUERY, description="Staff ID", type=openapi.TYPE_STRING),
+            openapi.Parameter('status', openapi.IN_QUERY, description="Attendance status", type=openapi.TYPE_STRING),
+        ]
+    )
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Export attendance records, e.g. a month for payroll
+        """
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response({'error': f"Unsupported format, use one of: {', '.join(EXPORT_FORMATS)}"}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = self.get_queryset().order_by('date', 'id')
+        return stream_export(queryset, self.export_columns, file_format, 'attendance')
+    
+    @swagger_auto_schema(
+        method='post',
+        operation_description="Import a door controller badge log with one '<ISO timestamp> <staff ID> <IN|OUT>' "
+                              "event per line, up to BADGE_LOG_UPLOAD_MAX_SIZE bytes (larger logs go through the "
+                              "import_badge_log command). Returns the import report; nothing is saved with dry_run.",
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, description="Badge log file", type=openapi.TYPE_FILE, required=True),
+            openapi.Parameter('dry_run', openapi.IN_FORM, description="true to only match and count the events", type=openapi.TYPE_BOOLEAN),
+        ],
+        consumes=['multipart/form-data']
+    )
+    @action(detail=False, methods=['post'], url_path='import-badge-log')
+    def import_badge_log(self, request):
+        """
+        Import the check-ins and check-outs of a badge reader log
+        """
+        # Checked before the upload is read, and again for uploads sent without a length
+        max_size = getattr(settings, 'BADGE_LOG_UPLOAD_MAX_SIZE', 10 * 1024 * 1024)
+        too_large = Response({'error': f'Badge logs over {max_size} bytes must be imported with the '
+                                       f'import_badge_log command'}, 
+                             status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        if content_length > max_size:
+            return too_large
+        
+        log_file = request.FILES.get('file')
+        if log_file is None:
+            return Response({'error': 'A badge log file is required'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        if log_file.size > max_size:
+            return too_large
+        
+        dry_run = str(request.data.get('dry_run', '')).lower() == 'true'
+        return Response(import_badge_log([log_file], dry_run=dry_run))
+    
+    @swagger_auto_schema(
+        method='post',
+        operation_description="Record a batch of kiosk check-in/check-out events. Each event gives staff_id, "
+                              "shift_assignment_id, type (check_in or check_out) and an optional timestamp; "
+                              "the response holds one outcome per event, in order.",
+        request_body=KioskEventSerializer(many=True),
+        responses={200: 'Per-event outcomes', 400: 'Malformed batch'}
+    )
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Record many check-ins and check-outs at once, e.g. from door kiosks at shift change
+        """
+        events = request.data
+        if isinstance(events, dict):
+            events = events.get('events')
+        
+        if not isinstance(events, list) or not events:
+            return Response({'error': 'A non-empty list of events is required'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(events) > self.batch_max_events:
+            return Response({'error': f'At most {self.batch_max_events} events can be sent per request'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({'results': record_check_events(events)})
+
+
+class WorkingHoursViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for worked minutes per staff member and ISO week or month
+
+    list:
+    Return the working hours rollups, optionally filtered by staff ID, department, period and date.
+    A date selects the week or month containing it.
+
+    retrieve:
+    Return a working hours rollup.
+    """
+    queryset = WorkingHours.objects.all().select_related('staff_member__user')
+    serializer_class = WorkingHoursSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_period(self):
+        period = self.request.query_params.get('period', 'month')
+        if period not in dict(WorkingHours.PERIOD_CHOICES):
+            raise ValidationError({'error': "Period must be 'week' or 'month'"})
+        return period
+    
+    def get_period_start(self, period):
+        date_param = self.request.query_params.get('date')
+        if not date_param:
+            return None
+        try:
+            date = datetime.strptime(date_param, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValidationError({'error': 'Invalid date format'})
+        return period_start(period, date)
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        period = self.get_period()
+        queryset = queryset.filter(period=period)
+        
+        start = self.get_period_start(period)
+        if start:
+            queryset = queryset.filter(period_start=start)
+        
+        # Filter by staff member
+        staff_id = self.request.query_params.get('staff_id')
+        if staff_id:
+            queryset = queryset.filter(staff_member__staff_id=staff_id)
+        
+        # Filter by department
+        department = self.request.query_params.get('department')
+        if department:
+            queryset = queryset.filter(department_id=department)
+            
+        return queryset
+    
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Get worked time totals per department for one week or month",
+        manual_parameters=[
+            openapi.Parameter('period', openapi.IN_QUERY, description="week or month (default month)", type=openapi.TYPE_STRING),
+            openapi.Parameter('date', openapi.IN_QUERY, description="Any day of the period (YYYY-MM-DD), defaults to today", type=openapi.TYPE_STRING),
+            openapi.Parameter('department', openapi.IN_QUERY, description="Department ID", type=openapi.TYPE_INTEGER),
+        ]
+    )
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Get the worked minutes, shifts and staff counted per department for a period
+        """
+        period = self.get_period()
+        start = self.get_period_start(period) or period_start(period, timezone.localdate())
+        
+        queryset = WorkingHours.objects.filter(period=period, period_start=start)
+        department = request.query_params.get('department')
+        if department:
+            queryset = queryset.filter(department_id=department)
+        
+        totals = queryset.values('department_id', 'department__name').annotate(
+            worked_minutes=Sum('worked_minutes'),
+            shift_count=Sum('shift_count'),
+            staff_count=Count('staff_member_id')
+        ).order_by('department__name')
+        
+        return Response({
+            'period': period,
+            'period_start': start,
+            'departments': [
+                {
+                    'department': row['department_id'],
+                    'department_name': row['department__name'],
+                    'staff_count': row['staff_count'],
+                    'shift_count': row['shift_count'],
+                    'worked_minutes': row['worked_minutes'],
+                    'worked_hours': round(row['worked_minutes'] / 60, 2),
+                }
+                for row in totals
+            ]
+        })
+
+
+class LeaveBalanceViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for leave balances per staff member, leave type and year
+
+    list:
+    Return the leave balances, optionally filtered by staff ID, leave type and year.
+
+    retrieve:
+    Return a leave balance.
+    """
+    queryset = LeaveBalance.objects.all().select_related('staff_member')
+    serializer_class = LeaveBalanceSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        staff_id = self.request.query_params.get('staff_id')
+        if staff_id:
+            queryset = queryset.filter(staff_member__staff_id=staff_id)
+        
+        leave_type = self.request.query_params.get('leave_type')
+        if leave_type:
+            queryset = queryset.filter(leave_type=leave_type)
+        
+        year = self.request.query_params.get('year')
+        if year:
+            queryset = queryset.filter(year=year)
+            
+        return queryset
+
+
+class LeaveLedgerEntryViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for the leave ledger
+
+    list:
+    Return the ledger entries, optionally filtered by staff ID, leave type, entry type and year.
+
+    retrieve:
+    Return a ledger entry.
+    """
+    queryset = LeaveLedgerEntry.objects.all().select_related('staff_member')
+    serializer_class = LeaveLedgerEntrySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        staff_id = self.request.query_params.get('staff_id')
+        if staff_id:
+            queryset = queryset.filter(staff_member__staff_id=staff_id)
+        
+        leave_type = self.request.query_params.get('leave_type')
+        if leave_type:
+            queryset = queryset.filter(leave_type=leave_type)
+        
+        entry_type = self.request.query_params.get('entry_type')
+        if entry_type:
+            queryset = queryset.filter(entry_type=entry_type)
+        
+        year = self.request.query_params.get('year')
+        if year:
+            queryset = queryset.filter(effective_date__year=year)
+            
+        return queryset
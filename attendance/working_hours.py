@@ -0,0 +1,166 @@
+import datetime
+import threading
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+from .models import Attendance, WorkingHours
+
+WORKING_HOURS_CHUNK_SIZE = 500
+
+# (staff_member_id, date) pairs waiting for the current transaction to commit
+_pending = threading.local()
+
+PERIOD_TRUNCATIONS = {
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def period_start(period, date):
+    """
+    Returns the first day of the ISO week or month containing ``date``
+    """
+    if period == 'week':
+        return date - datetime.timedelta(days=date.weekday())
+    return date.replace(day=1)
+
+
+def period_end(period, start):
+    """
+    Returns the last day of the period starting on ``start``
+    """
+    if period == 'week':
+        return start + datetime.timedelta(days=6)
+    next_month = (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return next_month - datetime.timedelta(days=1)
+
+
+def _aggregate(period, attendance):
+    """
+    Sums the worked time of the given attendance records per staff member and period in the database.
+    Only records with both a check-in and a check-out count; each one is charged its shift's break.
+    """
+    return attendance.filter(
+        check_in_time__isnull=False,
+        check_out_time__isnull=False
+    ).annotate(
+        bucket=PERIOD_TRUNCATIONS[period]('date')
+    ).values(
+        'staff_member_id', 'staff_member__department_id', 'bucket'
+    ).annotate(
+        worked=Sum(ExpressionWrapper(F('check_out_time') - F('check_in_time'), output_field=DurationField())),
+        breaks=Sum('shift_assignment__shift__break_duration'),
+        shifts=Count('id')
+    ).order_by()
+
+
+def _kept_departments(period, rollups):
+    """
+    Returns {(staff_member_id, period_start): department_id} of the given stored
+    rollups of periods before the current one, whose department is kept when
+    they are recomputed
+    """
+    return {
+        (staff_member_id, start): department_id
+        for staff_member_id, start, department_id in rollups.filter(
+            period=period,
+            period_start__lt=period_start(period, timezone.localdate())
+        ).values_list('staff_member_id', 'period_start', 'department_id')
+    }
+
+
+def _rollups(period, rows, departments):
+    rollups = []
+    for row in rows:
+        bucket = row['bucket']
+        if isinstance(bucket, datetime.datetime):
+            bucket = bucket.date()
+        worked_minutes = int((row['worked'] or datetime.timedelta()).total_seconds() // 60) - (row['breaks'] or 0)
+        rollups.append(WorkingHours(
+            staff_member_id=row['staff_member_id'],
+            department_id=departments.get((row['staff_member_id'], bucket), row['staff_member__department_id']),
+            period=period,
+            period_start=bucket,
+            worked_minutes=max(worked_minutes, 0),
+            shift_count=row['shifts']
+        ))
+    return rollups
+
+
+def refresh_working_hours(pairs):
+    """
+    Recomputes the weekly and monthly rollups touched by the given
+    (staff_member_id, date) pairs. Rollups left without worked shifts are dropped.
+
+    A rollup is filed under the staff member's department when it is first
+    computed, and a past period keeps that department when recomputed, so
+    department reports of closed periods do not move with later transfers.
+    """
+    staff_by_period = {}
+    for staff_member_id, date in set(pairs):
+        for period in PERIOD_TRUNCATIONS:
+            staff_by_period.setdefault((period, period_start(period, date)), set()).add(staff_member_id)
+
+    with transaction.atomic():
+        for (period, start), staff_ids in staff_by_period.items():
+            staff_ids = sorted(staff_ids)
+            for offset in range(0, len(staff_ids), WORKING_HOURS_CHUNK_SIZE):
+                chunk = staff_ids[offset:offset + WORKING_HOURS_CHUNK_SIZE]
+                stored = WorkingHours.objects.filter(staff_member_id__in=chunk, period=period, period_start=start)
+                departments = _kept_departments(period, stored)
+                stored.delete()
+                rows = _aggregate(period, Attendance.objects.filter(
+                    staff_member_id__in=chunk,
+                    date__range=(start, period_end(period, start))
+                ))
+                WorkingHours.objects.bulk_create(_rollups(period, rows, departments))
+
+
+def _flush_pending():
+    pairs = getattr(_pending, 'pairs', None)
+    if pairs:
+        _pending.pairs = set()
+        refresh_working_hours(pairs)
+
+
+def defer_working_hours_refresh(pairs):
+    """
+    Refreshes the rollups touched by the given (staff_member_id, date) pairs once
+    the current transaction commits (immediately outside a transaction), so a
+    queryset delete or a cascade recomputes each bucket once rather than once per row
+    """
+    if not hasattr(_pending, 'pairs'):
+        _pending.pairs = set()
+    _pending.pairs.update(pairs)
+    transaction.on_commit(_flush_pending)
+
+
+def refresh_working_hours_for(**filters):
+    """
+    Recomputes the rollups of every attendance record matching the given filters
+    """
+    refresh_working_hours(Attendance.objects.filter(**filters).values_list('staff_member_id', 'date').distinct())
+
+
+def rebuild_working_hours(start_date, end_date):
+    """
+    Rebuilds every rollup of the weeks and months overlapping the given date range.
+    Past periods keep the departments of their stored rollups, as in refresh_working_hours.
+    Returns the number of rollups written.
+    """
+    written = 0
+    with transaction.atomic():
+        for period in PERIOD_TRUNCATIONS:
+            first = period_start(period, start_date)
+            last = period_start(period, end_date)
+            stored = WorkingHours.objects.filter(period=period, period_start__range=(first, last))
+            departments = _kept_departments(period, stored)
+            stored.delete()
+
+            rows = _aggregate(period, Attendance.objects.filter(date__range=(first, period_end(period, last))))
+            written += len(WorkingHours.objects.bulk_create(
+                _rollups(period, rows, departments), batch_size=WORKING_HOURS_CHUNK_SIZE
+            ))
+
+    return written
@@ -0,0 +1,231 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+# Versioned with the format of the entries, so entries of an older format are never read
+CACHE_KEY_PREFIX = 'auth_token:v2:'
+REVOKED_KEY_PREFIX = 'auth_token_revoked:'
+# The token and user fields an entry holds. Never the token key itself or the
+# password hash: the shared cache may live on disk (FileBasedCache)
+TOKEN_FIELDS = ('user_id', 'created')
+USER_FIELDS = ('id', 'username', 'first_name', 'last_name', 'email', 'is_active', 'is_staff', 'is_superuser')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _cache_key(key):
+    # Keyed by a digest of the token, which is all the shared cache learns of it
+    return CACHE_KEY_PREFIX + _digest(key)
+
+
+def _revoked_key(key):
+    return REVOKED_KEY_PREFIX + _digest(key)
+
+
+class TokenCache:
+    """
+    Per-process LRU of authenticated tokens with a time to live, in front of
+    the shared Django cache. Thread-safe; counts hits, misses and invalidations.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            max_size = _setting('AUTH_TOKEN_LOCAL_CACHE_SIZE', 1024)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def discard(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.local_hits + self.shared_hits + self.misses
+            return {
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.local_hits + self.shared_hits) / lookups, 4) if lookups else None,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+                'max_size': _setting('AUTH_TOKEN_LOCAL_CACHE_SIZE', 1024),
+                'local_ttl': _setting('AUTH_TOKEN_LOCAL_CACHE_TTL', 30),
+                'shared_ttl': _setting('AUTH_TOKEN_CACHE_TTL', 300),
+            }
+
+
+token_cache = TokenCache()
+
+
+def _shared_cache():
+    """
+    Returns the cache shared by the worker processes, or None when the alias is
+    process-local: invalidating it would only reach the process making the change
+    """
+    cache = caches[_setting('AUTH_TOKEN_CACHE_ALIAS', 'default')]
+    return None if isinstance(cache, LocMemCache) else cache
+
+
+def _revoked(revoked_at, entry):
+    # Entries loaded before the token was last invalidated are stale
+    return revoked_at is not None and revoked_at >= entry['loaded_at']
+
+
+def invalidate_tokens(keys):
+    """
+    Drops the given token keys from this process's LRU and from the shared cache,
+    and records when they were invalidated in the shared cache. Every process
+    checks that record on its LRU hits, so none keeps using an entry loaded before.
+    """
+    keys = list(keys)
+    for key in keys:
+        token_cache.discard(key)
+    shared = _shared_cache()
+    if keys and shared is not None:
+        # Outlives every entry loaded before now, in the LRUs and the shared cache
+        timeout = max(_setting('AUTH_TOKEN_CACHE_TTL', 300), _setting('AUTH_TOKEN_LOCAL_CACHE_TTL', 30))
+        shared.set_many({_revoked_key(key): time.time() for key in keys}, timeout)
+        shared.delete_many([_cache_key(key) for key in keys])
+
+
+def _instance(model, values):
+    """
+    Builds a model instance from cached field values, deferring every other field
+    """
+    fields = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(model.objects.db, fields, [values[field] for field in fields])
+
+
+def invalidate_user_tokens(user_id):
+    """
+    Drops the cached tokens of a user, e.g. after deactivation or a password change
+    """
+    invalidate_tokens(Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+
+
+def token_cache_stats():
+    return token_cache.stats()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that remembers the token and its user, so the hot path
+    runs no queries.
+
+    A token is looked up in the per-process LRU first, then in the shared
+    Django cache (AUTH_TOKEN_CACHE_ALIAS) and only then in the database with the
+    user joined in; each level fills the ones above it. Unknown keys are
+    remembered in the LRU only. Entries hold the user's id, name, email and
+    flags (USER_FIELDS), never the token key or the password hash; the user is
+    rebuilt with the other fields deferred, so reading one loads it and saving
+    the user only writes the fields it has.
+
+    Logging out, deleting a token and saving or deleting a user invalidate the
+    entries (see auth_api.signals) and record the time in the shared cache. An
+    LRU hit is checked against that record, one shared cache read, so every
+    process stops accepting the token at once; the shared TTL bounds how long
+    any other change can go unnoticed. A LocMemCache alias is not shared
+    between processes and is skipped, leaving the LRU in front of the database
+    and other processes noticing a logout within the LRU TTL.
+    """
+
+    def authenticate_credentials(self, key):
+        shared = _shared_cache()
+        entry = token_cache.get(key)
+        if entry is not None and shared is not None and _revoked(shared.get(_revoked_key(key)), entry):
+            token_cache.discard(key)
+            entry = None
+        if entry is None:
+            entry = self._load(key, shared)
+        else:
+            token_cache.count('local_hits')
+        if entry['user'] is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        # Every request gets its own instances, rebuilt from the cached values
+        user = _instance(get_user_model(), entry['user'])
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        token = _instance(self.get_model(), dict(entry['token'], key=key))
+        token.user = user
+        return user, token
+
+    def _load(self, key, shared):
+        local_ttl = _setting('AUTH_TOKEN_LOCAL_CACHE_TTL', 30)
+        # Taken before reading, so an entry read before a concurrent invalidation counts as stale
+        loaded_at = time.time()
+        if shared is not None:
+            found = shared.get_many([_cache_key(key), _revoked_key(key)])
+            entry = found.get(_cache_key(key))
+            if entry is not None and not _revoked(found.get(_revoked_key(key)), entry):
+                token_cache.count('shared_hits')
+                token_cache.set(key, entry, local_ttl)
+                return entry
+
+        token_cache.count('misses')
+        try:
+            token = self.get_model().objects.select_related('user').get(key=key)
+        except self.get_model().DoesNotExist:
+            entry = {'loaded_at': loaded_at, 'token': None, 'user': None}
+            token_cache.set(key, entry, local_ttl)
+            return entry
+
+        entry = {
+            'loaded_at': loaded_at,
+            'token': {field: getattr(token, field) for field in TOKEN_FIELDS},
+            'user': {field: getattr(token.user, field) for field in USER_FIELDS},
+        }
+        if shared is not None:
+            shared.set(_cache_key(key), entry, _setting('AUTH_TOKEN_CACHE_TTL', 300))
+        token_cache.set(key, entry, local_ttl)
+        return entry
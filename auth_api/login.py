@@ -0,0 +1,220 @@
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from django.conf import settings
+from django.contrib.auth import get_user_model, user_login_failed
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+from django.core.exceptions import ObjectDoesNotExist
+from rest_framework.authtoken.models import Token
+
+
+class LoginPoolBusy(Exception):
+    """
+    Raised when a password check cannot finish within LOGIN_HASH_TIMEOUT.
+    ``retry_after`` is the number of seconds after which to try again.
+    """
+
+    def __init__(self, retry_after=1):
+        super().__init__()
+        self.retry_after = retry_after
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class PasswordCheckPool:
+    """
+    Bounded thread pool for password hash checks.
+
+    PBKDF2 and the other hashers run in C and release the GIL, so checks in the
+    pool run in parallel; at most ``workers`` hash at once. The request thread
+    still waits for its check, so admission is what protects the workers: the
+    cost of one hash is measured (once up front, then as a moving average),
+    and a check is only admitted if it is expected to finish within
+    LOGIN_HASH_TIMEOUT given the checks ahead of it, and ``queue_size`` are
+    not already waiting. Other logins get LoginPoolBusy at once; its
+    ``retry_after`` is the time the backlog needs to drain, plus a random
+    share of LOGIN_HASH_TIMEOUT so the retries spread out.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self.hash_seconds = None
+        self.in_flight = 0
+        self.peak = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def workers(self):
+        return _setting('LOGIN_HASH_WORKERS', None) or os.cpu_count() or 1
+
+    @property
+    def queue_size(self):
+        return _setting('LOGIN_HASH_QUEUE_SIZE', 256)
+
+    @property
+    def timeout(self):
+        return _setting('LOGIN_HASH_TIMEOUT', 25)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='login-hash')
+        return self._executor
+
+    def _calibrate(self):
+        # Hashing with the preferred hasher costs what checking a current hash does
+        started = time.perf_counter()
+        make_password('login-pool-calibration')
+        self.hash_seconds = time.perf_counter() - started
+
+    def expected_wait(self, in_flight):
+        """
+        Seconds until a check admitted behind ``in_flight`` others has finished
+        """
+        return (in_flight // self.workers + 1) * (self.hash_seconds or 0)
+
+    def _timed_check(self, password, encoded):
+        started = time.perf_counter()
+        try:
+            return check_password(password, encoded)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.hash_seconds = 0.8 * self.hash_seconds + 0.2 * elapsed if self.hash_seconds else elapsed
+
+    def check(self, password, encoded):
+        """
+        Returns whether ``password`` matches the ``encoded`` hash
+        """
+        if self.hash_seconds is None:
+            with self._lock:
+                if self.hash_seconds is None:
+                    self._calibrate()
+
+        with self._lock:
+            expected = self.expected_wait(self.in_flight)
+            if self.in_flight >= self.workers + self.queue_size or expected > self.timeout:
+                self.rejected += 1
+                # Spread over one admission window, so the clients turned away together do not come back together
+                backlog = self.expected_wait(self.in_flight) - self.hash_seconds
+                raise LoginPoolBusy(max(math.ceil(backlog + random.uniform(0, self.timeout)), 1))
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            executor = self._get_executor()
+
+        future = executor.submit(self._timed_check, password, encoded)
+        # A check the request stopped waiting for still holds its slot until it finishes
+        future.add_done_callback(self._done)
+        try:
+            # Admitted checks are expected to finish well before; this only trips if hashing slows down sharply
+            return future.result(timeout=max(2 * expected, self.timeout))
+        except TimeoutError:
+            # Still queued: drop it rather than hash for a client that got its 503
+            future.cancel()
+            with self._lock:
+                self.timed_out += 1
+            raise LoginPoolBusy(max(math.ceil(expected), 1))
+
+    def _done(self, future):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'timeout': self.timeout,
+                'hash_seconds': round(self.hash_seconds, 4) if self.hash_seconds else None,
+                'in_flight': self.in_flight,
+                'queue_depth': max(self.in_flight - self.workers, 0),
+                'expected_wait': round(self.expected_wait(self.in_flight), 3),
+                'peak_in_flight': self.peak,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+            }
+
+
+password_pool = PasswordCheckPool()
+
+# Hashed by the pool when the username is unknown, so a miss costs as much as a wrong password
+_dummy_password = None
+
+
+def _dummy_hash():
+    global _dummy_password
+    if _dummy_password is None:
+        _dummy_password = make_password('login-timing-dummy')
+    return _dummy_password
+
+
+def login_pool_stats():
+    return password_pool.stats()
+
+
+def authenticate_login(username, password, request=None):
+    """
+    Checks a username and password like ModelBackend, which is the configured
+    backend, but with the hash check run in the password pool.
+
+    The user is loaded with its token and staff profile in one query. Hashes
+    the hasher wants upgraded are rewritten. Returns the active user or None;
+    raises LoginPoolBusy when the pool is full.
+    """
+    User = get_user_model()
+    user = User._default_manager.select_related('auth_token', 'staff_profile').filter(
+        **{User.USERNAME_FIELD: username}
+    ).first()
+
+    if user is None:
+        password_pool.check(password, _dummy_hash())
+    elif password_pool.check(password, user.password) and user.is_active:
+        _upgrade_password(user, password)
+        return user
+
+    user_login_failed.send(sender=__name__, credentials={'username': username}, request=request)
+    return None
+
+
+def _upgrade_password(user, password):
+    """
+    Rehashes the password when the preferred hasher or its work factor changed, as check_password's setter would
+    """
+    try:
+        hasher = identify_hasher(user.password)
+    except ValueError:
+        return
+    preferred = get_hasher('default')
+    if hasher.algorithm != preferred.algorithm or preferred.must_update(user.password):
+        user.set_password(password)
+        user.save(update_fields=['password'])
+
+
+def login_token(user):
+    """
+    Returns the user's API token, created on first login
+    """
+    try:
+        return user.auth_token
+    except ObjectDoesNotExist:
+        token, created = Token.objects.get_or_create(user=user)
+        return token
+
+
+def staff_profile_id(user):
+    """
+    Returns the id of the user's staff member or None, from the select_related row when loaded
+    """
+    try:
+        return user.staff_profile.id
+    except ObjectDoesNotExist:
+        return None
@@ -0,0 +1,76 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from auth_api.authentication import CachedTokenAuthentication
+from auth_api.tokens import StaffRefreshToken
+from staff.views import StaffMemberViewSet
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = ("Compares the per-request cost of database token, cached token and stateless JWT authentication "
+            "on GET /api/v1/staff/me/. Creates a token (and an outstanding JWT) for the user if needed.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help="User to authenticate as")
+        parser.add_argument('--requests', type=int, default=1000, help="Requests per mode (default: 1000)")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named '{options['username']}'")
+
+        token, created = Token.objects.get_or_create(user=user)
+        access = str(StaffRefreshToken.for_user(user).access_token)
+        modes = [
+            ('token', TokenAuthentication, f'Token {token.key}'),
+            ('cached token', CachedTokenAuthentication, f'Token {token.key}'),
+            ('jwt', JWTStatelessUserAuthentication, f'Bearer {access}'),
+        ]
+
+        factory = APIRequestFactory()
+        count = options['requests']
+        for label, authentication_class, header in modes:
+            view = StaffMemberViewSet.as_view({'get': 'me'}, authentication_classes=[authentication_class])
+            # One warm-up request fills the caches and checks the mode works
+            response = view(factory.get('/api/v1/staff/me/', HTTP_AUTHORIZATION=header))
+            if response.status_code not in (200, 404):
+                raise CommandError(f"{label}: unexpected status {response.status_code}")
+
+            queries = QueryCounter()
+            with connection.execute_wrapper(queries):
+                started = time.perf_counter()
+                for _ in range(count):
+                    view(factory.get('/api/v1/staff/me/', HTTP_AUTHORIZATION=header)).render()
+                elapsed = time.perf_counter() - started
+
+            # The authentication step alone, on a prepared request
+            request = Request(factory.get('/api/v1/staff/me/', HTTP_AUTHORIZATION=header))
+            authentication = authentication_class()
+            auth_queries = QueryCounter()
+            with connection.execute_wrapper(auth_queries):
+                started = time.perf_counter()
+                for _ in range(count):
+                    authentication.authenticate(request)
+                auth_elapsed = time.perf_counter() - started
+
+            self.stdout.write(
+                f"{label:<14} {elapsed / count * 1000:8.3f} ms/request "
+                f"{queries.count / count:5.1f} queries/request {count / elapsed:8.0f} requests/s | "
+                f"authentication {auth_elapsed / count * 1000000:7.1f} us, {auth_queries.count / count:4.1f} queries"
+            )
@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import Counter
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+from auth_api.login import login_pool_stats
+from auth_api.views import LoginAPIView
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = ("Fires concurrent logins at POST /api/v1/auth/login/ and reports the latency percentiles and "
+            "the password pool queue. Creates throwaway users (and their tokens) and deletes them afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200, help="Concurrent logins (default: 200)")
+        parser.add_argument('--prefix', default='loadtest-', help="Username prefix of the throwaway users")
+        parser.add_argument('--keep', action='store_true', help="Keep the users for another run")
+        parser.add_argument('--retry', action='store_true',
+                            help="Retry logins answered 503 after their Retry-After, as a client would")
+
+    def handle(self, *args, **options):
+        count = options['logins']
+        usernames = [f"{options['prefix']}{index:05d}" for index in range(count)]
+
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        # One hash shared by every user; each login still verifies it in full
+        password = make_password(BENCHMARK_PASSWORD)
+        User.objects.bulk_create([
+            User(username=username, password=password) for username in usernames if username not in existing
+        ], batch_size=500)
+        users = User.objects.filter(username__in=usernames)
+        # Tokens exist beforehand, so the run measures the usual login of a returning user
+        Token.objects.bulk_create([
+            Token(user=user, key=Token.generate_key()) for user in users.filter(auth_token__isnull=True)
+        ], batch_size=500)
+
+        factory = APIRequestFactory()
+        view = LoginAPIView.as_view()
+        barrier = threading.Barrier(count)
+        latencies = []
+        statuses = Counter()
+        lock = threading.Lock()
+
+        retries = Counter()
+
+        def request_for(index, username):
+            return factory.post(
+                '/api/v1/auth/login/',
+                {'username': username, 'password': BENCHMARK_PASSWORD},
+                format='json',
+                # Distinct addresses, as the per-address throttle would otherwise cut in
+                REMOTE_ADDR=f'10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}'
+            )
+
+        def login(index, username):
+            request = request_for(index, username)
+            barrier.wait()
+            started = time.perf_counter()
+            try:
+                response = view(request)
+                while response.status_code == 503 and options['retry']:
+                    with lock:
+                        retries[index] += 1
+                    time.sleep(int(response['Retry-After']))
+                    response = view(request_for(index, username))
+            finally:
+                elapsed = time.perf_counter() - started
+                connection.close()
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status_code] += 1
+
+        before = login_pool_stats()
+        threads = [threading.Thread(target=login, args=(index, username)) for index, username in enumerate(usernames)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+        after = login_pool_stats()
+
+        if not options['keep']:
+            users.delete()
+
+        self.stdout.write(f"{count} concurrent logins in {wall:.2f}s ({count / wall:.1f} logins/s)")
+        self.stdout.write(f"status codes: {dict(sorted(statuses.items()))}")
+        if options['retry']:
+            self.stdout.write(f"{len(retries)} logins retried, {sum(retries.values())} retries in all")
+        self.stdout.write(
+            f"latency p50 {percentile(latencies, 0.5) * 1000:.0f} ms, p95 {percentile(latencies, 0.95) * 1000:.0f} ms, "
+            f"p99 {percentile(latencies, 0.99) * 1000:.0f} ms, max {max(latencies) * 1000:.0f} ms"
+        )
+        self.stdout.write(
+            f"password pool: {after['workers']} workers, {after['hash_seconds']}s per hash, "
+            f"peak {after['peak_in_flight']} in flight (queue limit {after['queue_size']}), "
+            f"{after['rejected'] - before['rejected']} rejected, {after['timed_out'] - before['timed_out']} timed out"
+        )
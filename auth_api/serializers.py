@@ -1,6 +1,9 @@
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from django.contrib.auth.models import User
 from staff.models import StaffMember
+from .tokens import StaffRefreshToken
 
 class UserLoginSerializer(serializers.Serializer):
     """
@@ -30,3 +33,42 @@ class TokenResponseSerializer(serializers.Serializer):
     email = serializers.CharField()
     first_name = serializers.CharField()
     last_name = serializers.CharField()
+
+class JWTResponseSerializer(serializers.Serializer):
+    """
+    Serializer for JWT login response
+    """
+    access = serializers.CharField()
+    refresh = serializers.CharField()
+    user_id = serializers.IntegerField()
+    staff_id = serializers.IntegerField(required=False)
+    is_staff = serializers.BooleanField()
+    username = serializers.CharField()
+    email = serializers.CharField()
+    first_name = serializers.CharField()
+    last_name = serializers.CharField()
+
+class JWTRefreshSerializer(serializers.Serializer):
+    """
+    Serializer for rotating a refresh token.
+
+    The refresh token is checked (signature, expiry, blacklist) and, with
+    BLACKLIST_AFTER_ROTATION, blacklisted. The new pair is issued from the
+    current user row, so the claims pick up role or staff changes at every refresh.
+    """
+    refresh = serializers.CharField()
+    access = serializers.CharField(read_only=True)
+
+    def validate(self, attrs):
+        refresh = StaffRefreshToken(attrs['refresh'])
+
+        user = User.objects.select_related('staff_profile').filter(pk=refresh.get(jwt_settings.USER_ID_CLAIM)).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed('No active account found for the given token.', 'no_active_account')
+
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            if jwt_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh = StaffRefreshToken.for_user(user)
+            return {'access': str(refresh.access_token), 'refresh': str(refresh)}
+        return {'access': str(refresh.access_token)}
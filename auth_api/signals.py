@@ -0,0 +1,23 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import invalidate_tokens, invalidate_user_tokens
+
+
+# Drop cached tokens once the change they reflect is committed, so a
+# concurrent request cannot cache the old row again in between
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    key = instance.key
+    transaction.on_commit(lambda: invalidate_tokens([key]))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_token(sender, instance, raw=False, created=False, **kwargs):
+    if not raw and not created:
+        user_id = instance.pk
+        transaction.on_commit(lambda: invalidate_user_tokens(user_id))
@@ -1,3 +1,183 @@
-from django.test import TestCase
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from . import authentication
+from .authentication import CachedTokenAuthentication, TokenCache, _cache_key, token_cache
+from .login import LoginPoolBusy, PasswordCheckPool
 
-# Create your tests here.
+HASH_SECONDS = 0.1
+
+
+def slow_check_password(password, encoded):
+    time.sleep(HASH_SECONDS)
+    return password == encoded
+
+
+@override_settings(LOGIN_HASH_WORKERS=1, LOGIN_HASH_QUEUE_SIZE=256, LOGIN_HASH_TIMEOUT=1)
+class PasswordCheckPoolTests(SimpleTestCase):
+    """
+    A burst of logins larger than the pool can hash within LOGIN_HASH_TIMEOUT.
+
+    The pool admits the logins it can finish within the timeout and answers
+    the others 503 at once, with a Retry-After. benchmark_login results for
+    the real hasher are in the README (Login Capacity).
+    """
+
+    def setUp(self):
+        self.pool = PasswordCheckPool()
+        self.pool.hash_seconds = HASH_SECONDS
+
+    def burst(self, logins):
+        barrier = threading.Barrier(logins)
+        outcomes = []
+        lock = threading.Lock()
+
+        def login():
+            barrier.wait()
+            started = time.perf_counter()
+            try:
+                outcome = self.pool.check('password', 'password')
+            except LoginPoolBusy as busy:
+                outcome = busy
+            with lock:
+                outcomes.append((outcome, time.perf_counter() - started))
+
+        threads = [threading.Thread(target=login) for index in range(logins)]
+        with mock.patch('auth_api.login.check_password', slow_check_password):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return outcomes
+
+    def test_burst_admits_what_fits_the_timeout(self):
+        outcomes = self.burst(40)
+
+        admitted = [elapsed for outcome, elapsed in outcomes if outcome is True]
+        rejected = [(outcome, elapsed) for outcome, elapsed in outcomes if isinstance(outcome, LoginPoolBusy)]
+        self.assertEqual(len(admitted) + len(rejected), 40)
+        # About timeout / hash cost fit; the rest must not wait for nothing
+        self.assertLessEqual(len(admitted), 15)
+        self.assertGreaterEqual(len(admitted), 5)
+        self.assertEqual(self.pool.timed_out, 0)
+        self.assertTrue(all(busy.retry_after >= 1 and elapsed < 0.5 for busy, elapsed in rejected))
+
+    def test_retry_after_reflects_backlog(self):
+        with self.settings(LOGIN_HASH_TIMEOUT=0.25):
+            outcomes = self.burst(10)
+
+        retry_after = {outcome.retry_after for outcome, elapsed in outcomes if isinstance(outcome, LoginPoolBusy)}
+        self.assertEqual(retry_after, {1})
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """
+    The token cache levels, and invalidations reaching workers that still hold the token in their LRU
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.cache_dir)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('nurse', email='nurse@example.com', password='secret-password')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        settings = self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': self.cache_dir,
+        }})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        caches['default'].clear()
+        token_cache.clear()
+        token_cache.reset_stats()
+
+    def authenticate(self, key=None):
+        return CachedTokenAuthentication().authenticate_credentials(key or self.token.key)
+
+    def in_another_worker(self):
+        # Changes made there only reach this process's LRU through the shared cache
+        return mock.patch.object(authentication, 'token_cache', TokenCache())
+
+    def test_hits_and_misses(self):
+        with self.assertNumQueries(1):
+            user, token = self.authenticate()
+        self.assertEqual((user, token.key), (self.user, self.token.key))
+
+        with self.assertNumQueries(0):
+            self.authenticate()
+        token_cache.clear()
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+        self.assertEqual((user.username, user.email, token.user_id), ('nurse', 'nurse@example.com', self.user.id))
+
+        stats = token_cache.stats()
+        self.assertEqual((stats['misses'], stats['local_hits'], stats['shared_hits']), (1, 1, 1))
+
+    def test_unknown_token(self):
+        for queries in (1, 0):
+            with self.assertNumQueries(queries), self.assertRaisesMessage(AuthenticationFailed, 'Invalid token.'):
+                self.authenticate('0' * 40)
+
+    def test_shared_entry_holds_no_secrets(self):
+        self.authenticate()
+
+        entry = pickle.dumps(caches['default'].get(_cache_key(self.token.key)))
+        self.assertNotIn(self.token.key.encode(), entry)
+        self.assertNotIn(self.user.password.encode(), entry)
+
+    def test_saving_cached_user_keeps_password(self):
+        self.authenticate()
+        token_cache.clear()
+        user, token = self.authenticate()
+
+        user.first_name = 'Ann'
+        user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Ann')
+        self.assertTrue(self.user.check_password('secret-password'))
+
+    def test_logout_in_another_worker(self):
+        self.authenticate()
+
+        with self.in_another_worker(), self.captureOnCommitCallbacks(execute=True):
+            Token.objects.get(key=self.token.key).delete()
+
+        with self.assertRaisesMessage(AuthenticationFailed, 'Invalid token.'):
+            self.authenticate()
+
+    def test_deactivation_in_another_worker(self):
+        self.authenticate()
+
+        with self.in_another_worker(), self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        with self.assertRaisesMessage(AuthenticationFailed, 'User inactive or deleted.'):
+            self.authenticate()
+
+    def test_reloaded_after_invalidation(self):
+        self.authenticate()
+        with self.in_another_worker(), self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Ann'
+            self.user.save()
+
+        with self.assertNumQueries(1):
+            user, token = self.authenticate()
+        self.assertEqual(user.first_name, 'Ann')
+        with self.assertNumQueries(0):
+            self.authenticate()
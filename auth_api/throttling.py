@@ -0,0 +1,28 @@
+import hashlib
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginIPThrottle(SimpleRateThrottle):
+    """
+    Limits login attempts per client address. The rate is generous since a
+    whole ward may log in from behind the same NAT at shift change.
+    """
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginUsernameThrottle(SimpleRateThrottle):
+    """
+    Limits login attempts per username, whatever address they come from
+    """
+    scope = 'login_username'
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username')
+        if not isinstance(username, str) or not username:
+            return None
+        # Hashed so any username makes a valid cache key
+        ident = hashlib.sha256(username.lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -0,0 +1,30 @@
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import RefreshToken
+from .login import staff_profile_id
+
+
+class StaffRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the staff_id and is_staff claims next to user_id.
+    Access tokens made from it copy the claims, so requests authenticated with
+    them need no user or staff member lookup.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['staff_id'] = staff_profile_id(user)
+        # Only the real flag: is_staff grants admin access to whoever holds the token
+        token['is_staff'] = user.is_staff
+        return token
+
+
+class StaffTokenUser(TokenUser):
+    """
+    Stateless request.user built from the claims of a StaffRefreshToken access token
+    """
+
+    @cached_property
+    def staff_id(self):
+        return self.token.get('staff_id')
@@ -1,7 +1,16 @@
 from django.urls import path
-from .views import LoginAPIView, LogoutAPIView
+from rest_framework_simplejwt.views import TokenVerifyView
+from .views import (
+    LoginAPIView, LogoutAPIView, TokenCacheStatsAPIView, JWTLoginAPIView, JWTRefreshAPIView,
+    LoginPoolStatsAPIView
+)
 
 urlpatterns = [
     path('login/', LoginAPIView.as_view(), name='api_login'),
     path('logout/', LogoutAPIView.as_view(), name='api_logout'),
+    path('jwt/', JWTLoginAPIView.as_view(), name='api_jwt_login'),
+    path('jwt/refresh/', JWTRefreshAPIView.as_view(), name='api_jwt_refresh'),
+    path('jwt/verify/', TokenVerifyView.as_view(), name='api_jwt_verify'),
+    path('token-cache/', TokenCacheStatsAPIView.as_view(), name='api_token_cache'),
+    path('login-pool/', LoginPoolStatsAPIView.as_view(), name='api_login_pool'),
 ]
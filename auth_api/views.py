@@ -3,64 +3,146 @@ from rest_framework import status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
-from django.contrib.auth import authenticate
-from .serializers import UserLoginSerializer, TokenResponseSerializer
-from staff.models import StaffMember
+from rest_framework_simplejwt.exceptions import TokenError
+from .serializers import (
+    UserLoginSerializer, TokenResponseSerializer, JWTResponseSerializer, JWTRefreshSerializer
+)
+from .tokens import StaffRefreshToken
+from .authentication import invalidate_tokens, token_cache_stats
+from .login import LoginPoolBusy, authenticate_login, login_pool_stats, login_token, staff_profile_id
+from .throttling import LoginIPThrottle, LoginUsernameThrottle
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
+def _login_profile(user):
+    """
+    User fields returned by the login endpoints next to the tokens
+    """
+    # Check if user is a staff member
+    staff_id = staff_profile_id(user)
+    
+    return {
+        'user_id': user.id,
+        'staff_id': staff_id,
+        'is_staff': user.is_staff or staff_id is not None,
+        'username': user.username,
+        'email': user.email or '',
+        'first_name': user.first_name or '',
+        'last_name': user.last_name or ''
+    }
+
+def _login_busy(busy):
+    response = Response({"error": "Too many logins in progress, please retry shortly"}, 
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    # Past the backlog already admitted, spread out so rejected clients do not all come back at once
+    response['Retry-After'] = str(busy.retry_after)
+    return response
+
 class LoginAPIView(APIView):
     """
     API view for user login
     """
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [LoginIPThrottle, LoginUsernameThrottle]
     
     @swagger_auto_schema(
         request_body=UserLoginSerializer,
         responses={
             200: openapi.Response('Login successful', TokenResponseSerializer),
-            401: 'Authentication failed'
+            401: 'Authentication failed',
+            429: 'Too many login attempts for this username or address',
+            503: 'Too many logins in progress'
         }
     )
     def post(self, request):
         """
-        Login endpoint that returns an authentication token
+        Login endpoint that returns an authentication token. The password is
+        checked in the bounded password pool; when it is full the login is
+        refused with 503 rather than queued without limit.
         """
         serializer = UserLoginSerializer(data=request.data)
         if serializer.is_valid():
             username = serializer.validated_data['username']
             password = serializer.validated_data['password']
             
-            user = authenticate(username=username, password=password)
+            try:
+                user = authenticate_login(username, password, request)
+            except LoginPoolBusy as busy:
+                return _login_busy(busy)
             if user:
-                token, created = Token.objects.get_or_create(user=user)
-                
-                # Check if user is a staff member
-                is_staff_member = False
-                staff_id = None
-                
-                try:
-                    staff_member = StaffMember.objects.get(user=user)
-                    is_staff_member = True
-                    staff_id = staff_member.id
-                except StaffMember.DoesNotExist:
-                    pass
-                    
-                return Response({
-                    'token': token.key,
-                    'user_id': user.id,
-                    'staff_id': staff_id,
-                    'is_staff': user.is_staff or is_staff_member,
-                    'username': user.username,
-                    'email': user.email or '',
-                    'first_name': user.first_name or '',
-                    'last_name': user.last_name or ''
-                }, status=status.HTTP_200_OK)
+                return Response({'token': login_token(user).key, **_login_profile(user)}, status=status.HTTP_200_OK)
             
             return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class JWTLoginAPIView(APIView):
+    """
+    API view for user login with JSON web tokens
+    """
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [LoginIPThrottle, LoginUsernameThrottle]
+    
+    @swagger_auto_schema(
+        request_body=UserLoginSerializer,
+        responses={
+            200: openapi.Response('Login successful', JWTResponseSerializer),
+            401: 'Authentication failed',
+            429: 'Too many login attempts for this username or address',
+            503: 'Too many logins in progress'
+        }
+    )
+    def post(self, request):
+        """
+        Login endpoint that returns a short-lived access token and a refresh token.
+        The access token carries the user_id, staff_id and is_staff claims and is
+        sent as 'Authorization: Bearer <access>'; requests using it need no user
+        or token lookup.
+        """
+        serializer = UserLoginSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            user = authenticate_login(
+                serializer.validated_data['username'],
+                serializer.validated_data['password'],
+                request
+            )
+        except LoginPoolBusy as busy:
+            return _login_busy(busy)
+        if not user:
+            return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+        
+        refresh = StaffRefreshToken.for_user(user)
+        return Response({
+            'access': str(refresh.access_token),
+            'refresh': str(refresh),
+            **_login_profile(user)
+        }, status=status.HTTP_200_OK)
+
+class JWTRefreshAPIView(APIView):
+    """
+    API view for rotating a JSON web token refresh token
+    """
+    permission_classes = [permissions.AllowAny]
+    
+    @swagger_auto_schema(
+        request_body=JWTRefreshSerializer,
+        responses={200: JWTRefreshSerializer, 401: 'Invalid, expired or blacklisted refresh token'}
+    )
+    def post(self, request):
+        """
+        Returns a new access token and, with rotation on, a new refresh token;
+        the old refresh token is blacklisted
+        """
+        serializer = JWTRefreshSerializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            return Response({'error': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+        return Response(serializer.validated_data, status=status.HTTP_200_OK)
+
 class LogoutAPIView(APIView):
     """
     API view for user logout
@@ -68,14 +150,67 @@ class LogoutAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     @swagger_auto_schema(
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'refresh': openapi.Schema(type=openapi.TYPE_STRING, description="Refresh token to blacklist (JWT logins only)")
+            }
+        ),
         responses={200: 'Logged out successfully'}
     )
     def post(self, request):
         """
-        Logout endpoint that invalidates the current token
+        Logout endpoint that invalidates the current token. JWT logins pass their
+        refresh token, which is blacklisted; the access token itself stays valid
+        until it expires.
         """
+        if request.auth is not None and not isinstance(request.auth, Token):
+            if not request.data.get('refresh'):
+                return Response({"error": "The refresh token is required to log out of a JWT session."}, 
+                               status=status.HTTP_400_BAD_REQUEST)
+            try:
+                StaffRefreshToken(request.data['refresh']).blacklist()
+            except TokenError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({"detail": "Successfully logged out."}, status=status.HTTP_200_OK)
+        
         if request.auth:
+            key = request.auth.key
             request.auth.delete()
+            # The token must stop working right away, not when its cache entry expires
+            invalidate_tokens([key])
             return Response({"detail": "Successfully logged out."}, status=status.HTTP_200_OK)
         
         return Response({"detail": "No authentication token found."}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class TokenCacheStatsAPIView(APIView):
+    """
+    API view for the token authentication cache counters of this process
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    @swagger_auto_schema(
+        responses={200: 'Hits, misses, invalidations and size of the token cache'}
+    )
+    def get(self, request):
+        """
+        Token cache statistics of the worker process answering the request
+        """
+        return Response(token_cache_stats(), status=status.HTTP_200_OK)
+
+
+class LoginPoolStatsAPIView(APIView):
+    """
+    API view for the login password pool counters of this process
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    @swagger_auto_schema(
+        responses={200: 'Workers, queue depth, peak and rejected logins of the password pool'}
+    )
+    def get(self, request):
+        """
+        Password pool statistics of the worker process answering the request
+        """
+        return Response(login_pool_stats(), status=status.HTTP_200_OK)
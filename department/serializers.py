@@ -14,6 +14,8 @@ class DepartmentSerializer(serializers.ModelSerializer):
     
     def get_staff_count(self, obj):
         """
-        Get the number of staff members in this department
+        Get the number of staff members in this department, annotated by the viewset's queryset
         """
-        return obj.staffmember_set.count() if hasattr(obj, 'staffmember_set') else 0
+        if hasattr(obj, 'staff_count'):
+            return obj.staff_count
+        return obj.staffmember_set.count() if obj.pk else 0
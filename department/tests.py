@@ -1,3 +1,54 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
+from role.models import Role
+from staff.models import StaffMember
+from .models import Department
 
-# Create your tests here.
+
+class DepartmentQueryCountTests(TestCase):
+    """
+    The department endpoints run a fixed number of queries, however many departments and staff there are
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        roles = [Role.objects.create(name=name) for name in ('Doctor', 'Nurse')]
+        cls.departments = [Department.objects.create(name=f'Department {index}') for index in range(5)]
+        for index in range(30):
+            user = User.objects.create_user(f'staff{index}')
+            StaffMember.objects.create(
+                user=user, staff_id=f'STAFF{index:04d}', department=cls.departments[index % 5],
+                role=roles[index % 2], phone_number=f'555{index:04d}'
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin'))
+
+    def test_list(self):
+        # COUNT for the page, then the page with its staff counts
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/departments/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([department['staff_count'] for department in response.data['results']], [6] * 5)
+
+    def test_staff_summary(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/departments/staff-summary/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(
+            [(role['role_name'], role['count']) for role in response.data[0]['roles']], [('Doctor', 3), ('Nurse', 3)]
+        )
+
+    def test_staff_members_page(self):
+        # The department, COUNT for the page, then the page with its users, roles and departments
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/v1/departments/{self.departments[0].id}/staff_members/?page=1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 6)
+        self.assertEqual(len(response.data['results']), 6)
@@ -1,8 +1,10 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db.models import Count
 from .models import Department
 from .serializers import DepartmentSerializer
+from staff.models import StaffMember
 from staff.serializers import StaffMemberSerializer
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -33,10 +35,46 @@ class DepartmentViewSet(viewsets.ModelViewSet):
     serializer_class = DepartmentSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    def get_queryset(self):
+        """
+        Counts each department's staff in the same query (one GROUP BY) instead of once per department
+        """
+        return super().get_queryset().annotate(staff_count=Count('staffmember'))
+    
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Returns every department with its staff count and a breakdown by role",
+        responses={200: 'Departments with staff counts per role'}
+    )
+    @action(detail=False, methods=['get'], url_path='staff-summary')
+    def staff_summary(self, request):
+        """
+        Returns the staff count of every department broken down by role, from a single GROUP BY query
+        """
+        departments = {
+            department_id: {'id': department_id, 'name': name, 'staff_count': 0, 'roles': []}
+            for department_id, name in Department.objects.order_by('name').values_list('id', 'name')
+        }
+        
+        for row in StaffMember.objects.filter(department__isnull=False).values(
+            'department_id', 'role_id', 'role__name'
+        ).annotate(count=Count('id')).order_by('department_id', 'role__name'):
+            department = departments.get(row['department_id'])
+            if department is None:
+                continue
+            department['staff_count'] += row['count']
+            department['roles'].append({
+                'role': row['role_id'],
+                'role_name': row['role__name'],
+                'count': row['count'],
+            })
+        
+        return Response(list(departments.values()))
+    
     @swagger_auto_schema(
         method='get',
-        operation_description="Returns all staff members in a specific department",
-        responses={200: 'List of staff members in this department'}
+        operation_description="Returns the staff members in a specific department, paginated",
+        responses={200: 'Page of staff members in this department'}
     )
     @action(detail=True, methods=['get'])
     def staff_members(self, request, pk=None):
@@ -44,6 +82,12 @@ class DepartmentViewSet(viewsets.ModelViewSet):
         Returns all staff members in a specific department
         """
         department = self.get_object()
-        staff_members = department.staffmember_set.all()
+        staff_members = department.staffmember_set.select_related('user', 'role', 'department').order_by('staff_id')
+        
+        page = self.paginate_queryset(staff_members)
+        if page is not None:
+            serializer = StaffMemberSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
         serializer = StaffMemberSerializer(staff_members, many=True)
         return Response(serializer.data)
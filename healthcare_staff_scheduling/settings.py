@@ -1,4 +1,5 @@
 from pathlib import Path
+from datetime import timedelta
 import os
 from django.templatetags.static import static
 from django.urls import reverse_lazy
@@ -59,6 +60,7 @@ INSTALLED_APPS = [
     'crispy_bootstrap5',
     'rest_framework',
     'rest_framework.authtoken',
+    'rest_framework_simplejwt.token_blacklist',
     'drf_yasg',
 
     
@@ -70,12 +72,66 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'auth_api.authentication.CachedTokenAuthentication',
+        'rest_framework_simplejwt.authentication.JWTStatelessUserAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    'DEFAULT_THROTTLE_RATES': {
+        # Login attempts per client address and per username
+        'login_ip': '300/minute',
+        'login_username': '10/minute',
+    },
+}
+
+# Login password checks: threads hashing at once (default: one per CPU), checks
+# allowed to wait for one, and seconds a login may wait for its check. Logins
+# expected to wait longer, given the measured hash cost, get a 503 at once; keep
+# it below the proxy or worker request timeout
+LOGIN_HASH_WORKERS = None
+LOGIN_HASH_QUEUE_SIZE = 256
+LOGIN_HASH_TIMEOUT = 25
+
+# JSON web tokens issued by /api/v1/auth/jwt/ and sent as 'Authorization: Bearer <access>'.
+# Requests are authenticated from the claims alone, so a deactivated user keeps
+# access until the access token expires
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'ROTATE_REFRESH_TOKENS': True,
+    'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_USER_CLASS': 'auth_api.tokens.StaffTokenUser',
+}
+
+# Token authentication cache: seconds a token stays in the shared cache and in
+# each process's LRU, the LRU size and the cache alias used. LRU hits are checked
+# against the invalidations recorded in the shared cache. A process-local alias
+# (LocMemCache) is not used as the shared level, so other processes notice a
+# logout within the LRU TTL
+AUTH_TOKEN_CACHE_TTL = 300
+AUTH_TOKEN_LOCAL_CACHE_TTL = 30
+AUTH_TOKEN_LOCAL_CACHE_SIZE = 1024
+AUTH_TOKEN_CACHE_ALIAS = 'default'
+
+# Seconds the current user's staff profile (request.staff_profile) stays in the cache
+STAFF_PROFILE_CACHE_TTL = 300
+
+# OpenAPI schema artifact written by generate_openapi_schema and served from
+# memory, and the seconds clients may cache it
+OPENAPI_SCHEMA_PATH = BASE_DIR / 'openapi-schema.json'
+OPENAPI_SCHEMA_MAX_AGE = 300
+
+# Largest badge log (bytes) imported through the API; bigger logs are rejected
+# with 413 and go through the import_badge_log management command instead
+BADGE_LOG_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+
+# Leave days credited per month by the accrue_leave command, per leave type
+LEAVE_ACCRUAL_RATES = {
+    'vacation': '2.00',
+    'sick': '1.00',
+    'personal': '0.25',
 }
 
 # Crispy forms configuration
@@ -89,6 +145,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'staff.middleware.StaffProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -120,6 +177,28 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # On disk rather than in memory, so threaded tests (concurrent swap
+        # approvals) wait on SQLite's write lock as the app does
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Shared by every worker process on the host, which the token authentication
+# and staff profile caches and the login throttles rely on. SQLite already keeps
+# the app on one host; point this at Redis or Memcached to run on several.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', BASE_DIR / '.cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        },
     }
 }
 
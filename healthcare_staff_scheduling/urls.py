@@ -20,13 +20,13 @@ from django.contrib.auth import views as auth_views
 
 # Swagger/OpenAPI imports
 from rest_framework import permissions
-from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from api.schema import get_cached_schema_view
 from django.conf import settings
 from django.conf.urls.static import static
 
-# Swagger/OpenAPI Schema Configuration
-schema_view = get_schema_view(
+# Swagger/OpenAPI Schema Configuration, generated once (see the generate_openapi_schema command)
+schema_view = get_cached_schema_view(
    openapi.Info(
       title="Healthcare Staff Scheduling API",
       default_version='v1',
@@ -46,7 +46,7 @@ urlpatterns = [
     # API URLs
     path('api/v1/', include('api.urls')),
     
-    # Swagger/OpenAPI URLs
+    # Swagger/OpenAPI URLs; no page cache, the schema view sets ETag and Cache-Control itself
     re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
     re_path(r'^swagger/$', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     re_path(r'^redoc/$', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
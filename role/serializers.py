@@ -2,6 +2,16 @@ from rest_framework import serializers
 from .models import Role
 
 class RoleSerializer(serializers.ModelSerializer):
+    staff_count = serializers.SerializerMethodField()
+    
     class Meta:
         model = Role
-        fields = ['id', 'name', 'description', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'description', 'staff_count', 'created_at', 'updated_at']
+    
+    def get_staff_count(self, obj):
+        """
+        Get the number of staff members with this role, annotated by the viewset's queryset
+        """
+        if hasattr(obj, 'staff_count'):
+            return obj.staff_count
+        return obj.staffmember_set.count() if obj.pk else 0
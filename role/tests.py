@@ -1,3 +1,44 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
+from department.models import Department
+from staff.models import StaffMember
+from .models import Role
 
-# Create your tests here.
+
+class RoleQueryCountTests(TestCase):
+    """
+    The role endpoints run a fixed number of queries, however many roles and staff there are
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Cardiology')
+        cls.roles = [Role.objects.create(name=f'Role {index}') for index in range(3)]
+        for index in range(24):
+            user = User.objects.create_user(f'staff{index}')
+            StaffMember.objects.create(
+                user=user, staff_id=f'STAFF{index:04d}', department=department,
+                role=cls.roles[index % 3], phone_number=f'555{index:04d}'
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin'))
+
+    def test_list(self):
+        # COUNT for the page, then the page with its staff counts
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/roles/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([role['staff_count'] for role in response.data['results']], [8] * 3)
+
+    def test_staff_members_page(self):
+        # The role, COUNT for the page, then the page with its users, roles and departments
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/v1/roles/{self.roles[0].id}/staff_members/?page=1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 8)
+        self.assertEqual(len(response.data['results']), 8)
@@ -1,6 +1,7 @@
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db.models import Count
 from .models import Role
 from .serializers import RoleSerializer
 from staff.models import StaffMember
@@ -34,10 +35,16 @@ class RoleViewSet(viewsets.ModelViewSet):
     serializer_class = RoleSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    def get_queryset(self):
+        """
+        Counts each role's staff in the same query (one GROUP BY) instead of once per role
+        """
+        return super().get_queryset().annotate(staff_count=Count('staffmember'))
+    
     @swagger_auto_schema(
         method='get',
-        operation_description="Returns all staff members with the specified role",
-        responses={200: 'List of staff members with this role'}
+        operation_description="Returns the staff members with the specified role, paginated",
+        responses={200: 'Page of staff members with this role'}
     )
     @action(detail=True, methods=['get'])
     def staff_members(self, request, pk=None):
@@ -45,6 +52,14 @@ class RoleViewSet(viewsets.ModelViewSet):
         Returns all staff members with the specified role
         """
         role = self.get_object()
-        staff_members = StaffMember.objects.filter(role=role)
+        staff_members = StaffMember.objects.filter(role=role).select_related(
+            'user', 'role', 'department'
+        ).order_by('staff_id')
+        
+        page = self.paginate_queryset(staff_members)
+        if page is not None:
+            serializer = StaffMemberSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
         serializer = StaffMemberSerializer(staff_members, many=True)
         return Response(serializer.data)
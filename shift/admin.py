@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Shift, ShiftAssignment, ShiftSwapRequest
+from .models import Shift, ShiftAssignment, ShiftSwapRequest, StaffAvailability
 from unfold.admin import ModelAdmin
 
 # Register your models here.
@@ -28,6 +28,16 @@ class ShiftAssignmentAdmin(ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('staff_member__user', 'shift')
 
+@admin.register(StaffAvailability)
+class StaffAvailabilityAdmin(ModelAdmin):
+    list_display = ('staff_member', 'day_of_week', 'start_time', 'end_time')
+    list_filter = ('day_of_week',)
+    search_fields = ('staff_member__user__first_name', 'staff_member__user__last_name', 'staff_member__staff_id')
+    autocomplete_fields = ['staff_member']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('staff_member__user')
+
 @admin.register(ShiftSwapRequest)
 class ShiftSwapRequestAdmin(ModelAdmin):
     list_display = ('requester_info', 'recipient', 'status', 'created_at')
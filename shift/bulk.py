@@ -0,0 +1,108 @@
+from django.db import transaction
+from django.utils import timezone
+from staff.models import StaffMember
+from .models import Shift, ShiftAssignment
+from .serializers import ShiftAssignmentBulkItemSerializer
+from .schedule import refresh_schedule_entries
+
+BULK_BATCH_SIZE = 500
+
+
+def bulk_upsert_assignments(rows, upsert=False):
+    """
+    Validates and writes many shift assignments at once.
+
+    Instead of running ShiftAssignment.clean() per row, conflicts are checked
+    with a single query against the (staff_member, date) keys of the batch.
+    Invalid rows are reported by index and skipped; the valid rows are written
+    with bulk_create (and bulk_update when ``upsert`` is set) in one transaction.
+    Bulk writes send no signals, so the schedule entries are refreshed explicitly.
+
+    Returns a dict with the created and updated assignments and the row errors.
+    Raises IntegrityError, with nothing written, if another request created one
+    of the assignments in the meantime.
+    """
+    errors = {}
+    valid = {}
+    seen_keys = {}
+
+    for index, row in enumerate(rows):
+        serializer = ShiftAssignmentBulkItemSerializer(data=row)
+        if not serializer.is_valid():
+            errors[index] = serializer.errors
+            continue
+
+        data = serializer.validated_data
+        key = (data['staff_member'], data['date'])
+        if key in seen_keys:
+            errors[index] = {'non_field_errors': [
+                f"Duplicate of row {seen_keys[key]}: a staff member can only have one shift per date."
+            ]}
+            continue
+
+        seen_keys[key] = index
+        valid[index] = data
+
+    if valid:
+        staff_ids = {data['staff_member'] for data in valid.values()}
+        shift_ids = {data['shift'] for data in valid.values()}
+        known_staff = set(StaffMember.objects.filter(id__in=staff_ids).values_list('id', flat=True))
+        known_shifts = set(Shift.objects.filter(id__in=shift_ids).values_list('id', flat=True))
+
+        for index, data in list(valid.items()):
+            row_errors = {}
+            if data['staff_member'] not in known_staff:
+                row_errors['staff_member'] = [f"Staff member {data['staff_member']} does not exist."]
+            if data['shift'] not in known_shifts:
+                row_errors['shift'] = [f"Shift {data['shift']} does not exist."]
+            if row_errors:
+                errors[index] = row_errors
+                del valid[index]
+
+    to_create = []
+    to_update = []
+    now = timezone.now()
+
+    # Read and written in one transaction, the existing rows locked for the upsert. A row
+    # inserted concurrently for one of the keys still fails bulk_create with an IntegrityError,
+    # which rolls everything back and is left to the caller to report
+    with transaction.atomic():
+        existing = {}
+        if valid:
+            dates = [data['date'] for data in valid.values()]
+            existing_rows = ShiftAssignment.objects.select_for_update().filter(
+                staff_member_id__in={data['staff_member'] for data in valid.values()},
+                date__range=(min(dates), max(dates))
+            )
+            existing = {(row.staff_member_id, row.date): row for row in existing_rows}
+
+        for index, data in valid.items():
+            current = existing.get((data['staff_member'], data['date']))
+
+            if current is None:
+                to_create.append(ShiftAssignment(
+                    staff_member_id=data['staff_member'],
+                    shift_id=data['shift'],
+                    date=data['date'],
+                    is_active=data['is_active']
+                ))
+            elif upsert:
+                current.shift_id = data['shift']
+                current.is_active = data['is_active']
+                current.updated_at = now
+                to_update.append(current)
+            else:
+                errors[index] = {'non_field_errors': ["Staff member already has a shift assignment on this date."]}
+
+        created = ShiftAssignment.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+        if to_update:
+            ShiftAssignment.objects.bulk_update(
+                to_update, ['shift', 'is_active', 'updated_at'], batch_size=BULK_BATCH_SIZE
+            )
+        refresh_schedule_entries([assignment.id for assignment in created + to_update])
+
+    return {
+        'created': created,
+        'updated': to_update,
+        'errors': [{'index': index, 'errors': errors[index]} for index in sorted(errors)],
+    }
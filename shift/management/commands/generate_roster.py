@@ -0,0 +1,63 @@
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from shift.roster import generate_roster
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+def _parse_target(value):
+    try:
+        shift_id, role_id, required = (int(part) for part in value.split(':'))
+    except ValueError:
+        raise CommandError(f"Invalid target '{value}', expected SHIFT_ID:ROLE_ID:COUNT")
+    return {'shift': shift_id, 'role': role_id, 'required': required}
+
+
+class Command(BaseCommand):
+    help = "Generate a roster for a date range from per-shift/per-role coverage targets"
+
+    def add_arguments(self, parser):
+        parser.add_argument('start_date', help="First day of the roster (YYYY-MM-DD)")
+        parser.add_argument('end_date', help="Last day of the roster (YYYY-MM-DD)")
+        parser.add_argument(
+            '--target', action='append', required=True, dest='targets',
+            help="Coverage target as SHIFT_ID:ROLE_ID:COUNT; repeat for each shift and role"
+        )
+        parser.add_argument('--department', type=int, help="Only roster staff of this department")
+        parser.add_argument('--commit', action='store_true', help="Write the roster instead of only reporting it")
+
+    def handle(self, *args, **options):
+        start_date = _parse_date(options['start_date'])
+        end_date = _parse_date(options['end_date'])
+        if start_date > end_date:
+            raise CommandError("Start date must be before or equal to end date.")
+
+        targets = [_parse_target(value) for value in options['targets']]
+
+        started = time.perf_counter()
+        try:
+            result = generate_roster(
+                start_date, end_date, targets,
+                department_id=options['department'],
+                commit=options['commit']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"Proposed {len(result['assignments'])} assignments in {elapsed:.2f}s"
+            + (f", wrote {len(result['created'])}" if options['commit'] else " (dry run, use --commit to write)")
+        )
+
+        for gap in result['unmet']:
+            self.stdout.write(self.style.WARNING(
+                f"{gap['date']:%Y-%m-%d} shift {gap['shift']} role {gap['role']}: "
+                f"{gap['assigned']}/{gap['required']} covered, {gap['missing']} missing"
+            ))
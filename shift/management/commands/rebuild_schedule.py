@@ -0,0 +1,29 @@
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from shift.schedule import rebuild_schedule
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized schedule entries used by the schedule endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', help="Only rebuild from this day on (YYYY-MM-DD)")
+        parser.add_argument('--end-date', help="Only rebuild up to this day (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        start_date = _parse_date(options['start_date']) if options['start_date'] else None
+        end_date = _parse_date(options['end_date']) if options['end_date'] else None
+
+        started = time.perf_counter()
+        written = rebuild_schedule(start_date, end_date)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} schedule entries in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,40 @@
+import time
+from datetime import datetime
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from shift.swaps import resolve_swap_cycles
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = "Find cycles of pending shift swap requests (A->B->C->A) in a date range and execute them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('start_date', help="First day of the shifts to consider (YYYY-MM-DD)")
+        parser.add_argument('end_date', help="Last day of the shifts to consider (YYYY-MM-DD)")
+        parser.add_argument('--commit', action='store_true', help="Execute the cycles instead of only reporting them")
+
+    def handle(self, *args, **options):
+        start_date = _parse_date(options['start_date'])
+        end_date = _parse_date(options['end_date'])
+        if start_date > end_date:
+            raise CommandError("Start date must be before or equal to end date.")
+
+        started = time.perf_counter()
+        try:
+            result = resolve_swap_cycles(start_date, end_date, commit=options['commit'])
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"Found {len(result['cycles'])} cycles among {result['pending']} pending requests in {elapsed:.2f}s"
+            + (f", approved {result['approved_requests']} requests and moved {result['updated_assignments']} assignments"
+               if options['commit'] else " (dry run, use --commit to execute)")
+        )
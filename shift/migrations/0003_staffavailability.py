@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shift', '0002_remove_shift_shift_type_delete_staffavailability'),
+        ('staff', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaffAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day_of_week', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('staff_member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='staff.staffmember')),
+            ],
+            options={
+                'verbose_name': 'Staff Availability',
+                'verbose_name_plural': 'Staff Availability',
+                'ordering': ['staff_member', 'day_of_week'],
+                'unique_together': {('staff_member', 'day_of_week')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('department', '0003_delete_departmentassignment'),
+        ('shift', '0003_staffavailability'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('shift_start_time', models.TimeField()),
+                ('payload', models.JSONField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('assignment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_entry', to='shift.shiftassignment')),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='department.department')),
+            ],
+            options={
+                'verbose_name': 'Schedule Entry',
+                'verbose_name_plural': 'Schedule Entries',
+                'ordering': ['date', 'shift_start_time', 'assignment'],
+                'indexes': [models.Index(fields=['date', 'shift_start_time'], name='shift_sched_date_idx'), models.Index(fields=['department', 'date'], name='shift_sched_dept_date_idx')],
+            },
+        ),
+    ]
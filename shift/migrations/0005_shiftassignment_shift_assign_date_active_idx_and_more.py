@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shift', '0004_scheduleentry'),
+        ('staff', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shiftassignment',
+            index=models.Index(fields=['date', 'is_active'], name='shift_assign_date_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shiftassignment',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['date'], name='shift_assign_active_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shiftswaprequest',
+            index=models.Index(fields=['status', '-created_at'], name='shift_swap_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shiftswaprequest',
+            index=models.Index(fields=['recipient', 'status'], name='shift_swap_recipient_idx'),
+        ),
+    ]
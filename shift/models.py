@@ -63,6 +63,10 @@ class ShiftAssignment(models.Model):
     class Meta:
         unique_together = ('staff_member', 'date')
         ordering = ['date', 'shift__start_time']
+        indexes = [
+            models.Index(fields=['date', 'is_active'], name='shift_assign_date_active_idx'),
+            models.Index(fields=['date'], condition=models.Q(is_active=True), name='shift_assign_active_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.staff_member.user.get_full_name()} - {self.shift.name} on {self.date}"
@@ -85,6 +89,76 @@ class ShiftAssignment(models.Model):
         self.clean()
         super().save(*args, **kwargs)
 
+class ScheduleEntry(models.Model):
+    """
+    Denormalized read model for the schedule endpoint: one pre-rendered row per
+    active shift assignment, kept up to date by shift.signals
+    """
+    assignment = models.OneToOneField('shift.ShiftAssignment', on_delete=models.CASCADE, related_name='schedule_entry')
+    date = models.DateField()
+    department = models.ForeignKey('department.Department', on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='+')
+    shift_start_time = models.TimeField()
+    payload = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Schedule Entry"
+        verbose_name_plural = "Schedule Entries"
+        ordering = ['date', 'shift_start_time', 'assignment']
+        indexes = [
+            models.Index(fields=['date', 'shift_start_time'], name='shift_sched_date_idx'),
+            models.Index(fields=['department', 'date'], name='shift_sched_dept_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Schedule entry for assignment {self.assignment_id} on {self.date}"
+
+class StaffAvailability(models.Model):
+    """
+    Model for the weekly time window in which a staff member can work
+    """
+    DAY_OF_WEEK_CHOICES = (
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    )
+
+    staff_member = models.ForeignKey('staff.StaffMember', on_delete=models.CASCADE, related_name='availability')
+    day_of_week = models.PositiveSmallIntegerField(choices=DAY_OF_WEEK_CHOICES)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    class Meta:
+        verbose_name = "Staff Availability"
+        verbose_name_plural = "Staff Availability"
+        unique_together = ('staff_member', 'day_of_week')
+        ordering = ['staff_member', 'day_of_week']
+
+    def __str__(self):
+        return f"{self.staff_member.user.get_full_name()} - {self.get_day_of_week_display()} ({self.start_time}-{self.end_time})"
+
+    def covers(self, start_time, end_time):
+        """
+        Returns True if this window contains a shift running from start_time to end_time.
+        Windows and shifts whose end is not after their start run into the next day.
+        """
+        window_start = self.start_time.hour * 60 + self.start_time.minute
+        window_end = self.end_time.hour * 60 + self.end_time.minute
+        shift_start = start_time.hour * 60 + start_time.minute
+        shift_end = end_time.hour * 60 + end_time.minute
+
+        if window_end <= window_start:
+            window_end += 24 * 60
+        if shift_end <= shift_start:
+            shift_end += 24 * 60
+
+        return window_start <= shift_start and shift_end <= window_end
+
 class ShiftSwapRequest(models.Model):
     """
     Model for handling shift swap requests between staff members
@@ -125,6 +199,10 @@ class ShiftSwapRequest(models.Model):
         verbose_name = "Shift Swap Request"
         verbose_name_plural = "Shift Swap Requests"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at'], name='shift_swap_status_idx'),
+            models.Index(fields=['recipient', 'status'], name='shift_swap_recipient_idx'),
+        ]
     
     def __str__(self):
         return f"Swap request from {self.requester_assignment.staff_member} to {self.recipient}"
@@ -0,0 +1,162 @@
+from datetime import timedelta
+from django.db import transaction
+from staff.models import StaffMember
+from .models import Shift, ShiftAssignment, StaffAvailability
+from .bulk import BULK_BATCH_SIZE
+from .schedule import refresh_schedule_entries
+
+
+def _date_range(start_date, end_date):
+    return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+
+def generate_roster(start_date, end_date, targets, department_id=None, commit=False):
+    """
+    Builds a roster for the given date range from per-shift/per-role coverage targets.
+
+    ``targets`` is a list of dicts with ``shift``, ``role`` and ``required`` (staff per day).
+    Staff are only placed on shifts inside their weekly StaffAvailability windows
+    (staff without any windows are treated as always available), never on days
+    covered by an approved leave request and never twice on the same day.
+    Existing assignments count towards coverage. Work is spread by giving each
+    open slot to the eligible candidates with the fewest shifts so far.
+
+    The state is kept in flat arrays indexed by staff, day and shift, so the
+    solver only queries the database while loading its inputs. Coverage that
+    cannot be met is reported rather than treated as an error.
+
+    Returns a dict with the proposed assignments, the unmet coverage and, when
+    ``commit`` is set, the assignments written to the database.
+    """
+    from attendance.availability import LeaveCalendar
+
+    days = _date_range(start_date, end_date)
+    day_index = {day: position for position, day in enumerate(days)}
+    n_days = len(days)
+
+    shifts = Shift.objects.in_bulk({target['shift'] for target in targets})
+    missing_shifts = {target['shift'] for target in targets} - set(shifts)
+    if missing_shifts:
+        raise ValueError(f"Unknown shift ids: {sorted(missing_shifts)}")
+
+    shift_ids = sorted(shifts)
+    shift_index = {shift_id: position for position, shift_id in enumerate(shift_ids)}
+    n_shifts = len(shift_ids)
+
+    staff_rows = StaffMember.objects.filter(role_id__in={target['role'] for target in targets})
+    if department_id:
+        staff_rows = staff_rows.filter(department_id=department_id)
+    staff_rows = list(staff_rows.order_by('id').values_list('id', 'role_id'))
+
+    staff_ids = [staff_id for staff_id, role_id in staff_rows]
+    staff_index = {staff_id: position for position, staff_id in enumerate(staff_ids)}
+    n_staff = len(staff_ids)
+
+    staff_by_role = {}
+    for position, (staff_id, role_id) in enumerate(staff_rows):
+        staff_by_role.setdefault(role_id, []).append(position)
+
+    # available[(staff * n_days + day) * n_shifts + shift] is 1 if the staff member can work that shift that day
+    available = bytearray(b'\x01') * (n_staff * n_days * n_shifts)
+    # busy[staff * n_days + day] is 1 once the staff member has a shift (or leave) that day
+    busy = bytearray(n_staff * n_days)
+    load = [0] * n_staff
+
+    windows = {}
+    for window in StaffAvailability.objects.filter(staff_member_id__in=staff_ids):
+        windows.setdefault(window.staff_member_id, {})[window.day_of_week] = window
+
+    for staff_id, staff_windows in windows.items():
+        position = staff_index[staff_id]
+        weekday_mask = [
+            [window is not None and window.covers(shifts[shift_id].start_time, shifts[shift_id].end_time)
+             for shift_id in shift_ids]
+            for window in (staff_windows.get(weekday) for weekday in range(7))
+        ]
+        for day, date in enumerate(days):
+            allowed = weekday_mask[date.weekday()]
+            offset = (position * n_days + day) * n_shifts
+            for shift in range(n_shifts):
+                available[offset + shift] = allowed[shift]
+
+    leave_calendar = LeaveCalendar(start_date, end_date, staff_member_ids=staff_ids)
+    for staff_id in leave_calendar.masks:
+        position = staff_index[staff_id]
+        for day in leave_calendar.leave_offsets(staff_id):
+            busy[position * n_days + day] = 1
+
+    target_keys = [(target['shift'], target['role']) for target in targets]
+    coverage = {(day, key): 0 for day in range(n_days) for key in target_keys}
+
+    existing = ShiftAssignment.objects.filter(
+        staff_member_id__in=staff_ids,
+        date__range=(start_date, end_date)
+    ).values_list('staff_member_id', 'date', 'shift_id', 'is_active')
+
+    for staff_id, date, shift_id, is_active in existing:
+        position = staff_index[staff_id]
+        day = day_index[date]
+        busy[position * n_days + day] = 1
+        if is_active:
+            load[position] += 1
+            key = (day, (shift_id, staff_rows[position][1]))
+            if key in coverage:
+                coverage[key] += 1
+
+    proposed = []
+    unmet = []
+
+    for day, date in enumerate(days):
+        day_targets = []
+        for target in targets:
+            shift = shift_index[target['shift']]
+            candidates = [
+                position for position in staff_by_role.get(target['role'], [])
+                if not busy[position * n_days + day]
+                and available[(position * n_days + day) * n_shifts + shift]
+            ]
+            day_targets.append((len(candidates), target, shift, candidates))
+
+        # Fill the hardest slots of the day first so scarce staff are not used up elsewhere
+        day_targets.sort(key=lambda item: item[0])
+
+        for _, target, shift, candidates in day_targets:
+            key = (day, (target['shift'], target['role']))
+            needed = target['required'] - coverage[key]
+            if needed <= 0:
+                continue
+
+            candidates = [position for position in candidates if not busy[position * n_days + day]]
+            candidates.sort(key=lambda position: (load[position], position))
+
+            for position in candidates[:needed]:
+                busy[position * n_days + day] = 1
+                load[position] += 1
+                proposed.append((staff_ids[position], target['shift'], date))
+
+            coverage[key] += min(needed, len(candidates))
+            if len(candidates) < needed:
+                unmet.append({
+                    'date': date,
+                    'shift': target['shift'],
+                    'role': target['role'],
+                    'required': target['required'],
+                    'assigned': coverage[key],
+                    'missing': needed - len(candidates),
+                })
+
+    created = []
+    if commit and proposed:
+        with transaction.atomic():
+            created = ShiftAssignment.objects.bulk_create(
+                [ShiftAssignment(staff_member_id=staff_id, shift_id=shift_id, date=date)
+                 for staff_id, shift_id, date in proposed],
+                batch_size=BULK_BATCH_SIZE
+            )
+            refresh_schedule_entries([assignment.id for assignment in created])
+
+    return {
+        'assignments': proposed,
+        'unmet': unmet,
+        'created': created,
+    }
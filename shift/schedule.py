@@ -0,0 +1,81 @@
+from django.db import transaction
+from .models import ScheduleEntry, ShiftAssignment
+from .serializers import ShiftAssignmentSerializer
+
+SCHEDULE_CHUNK_SIZE = 500
+
+
+def _schedule_queryset():
+    return ShiftAssignment.objects.filter(is_active=True).select_related(
+        'staff_member__user', 'staff_member__role', 'staff_member__department', 'shift'
+    )
+
+
+def _build_entries(assignments):
+    """
+    Renders schedule entries for a chunk of assignments, using the same
+    serializer the schedule endpoint used to run on every request
+    """
+    payloads = ShiftAssignmentSerializer(assignments, many=True).data
+    return [
+        ScheduleEntry(
+            assignment_id=assignment.id,
+            date=assignment.date,
+            department_id=assignment.staff_member.department_id,
+            shift_start_time=assignment.shift.start_time,
+            payload=payload
+        )
+        for assignment, payload in zip(assignments, payloads)
+    ]
+
+
+def refresh_schedule_entries(assignment_ids):
+    """
+    Re-renders the schedule entries of the given assignments.
+    Entries of inactive or deleted assignments are dropped.
+    """
+    assignment_ids = list(set(assignment_ids))
+
+    with transaction.atomic():
+        for offset in range(0, len(assignment_ids), SCHEDULE_CHUNK_SIZE):
+            chunk = assignment_ids[offset:offset + SCHEDULE_CHUNK_SIZE]
+            ScheduleEntry.objects.filter(assignment_id__in=chunk).delete()
+            ScheduleEntry.objects.bulk_create(_build_entries(list(_schedule_queryset().filter(id__in=chunk))))
+
+
+def refresh_schedule_entries_for(**filters):
+    """
+    Re-renders the schedule entries of every assignment matching the given filters
+    """
+    refresh_schedule_entries(ShiftAssignment.objects.filter(**filters).values_list('id', flat=True))
+
+
+def rebuild_schedule(start_date=None, end_date=None):
+    """
+    Rebuilds the schedule entries from scratch, optionally limited to a date range.
+    Returns the number of entries written.
+    """
+    entries = ScheduleEntry.objects.all()
+    assignments = _schedule_queryset().order_by('id')
+
+    if start_date:
+        entries = entries.filter(date__gte=start_date)
+        assignments = assignments.filter(date__gte=start_date)
+    if end_date:
+        entries = entries.filter(date__lte=end_date)
+        assignments = assignments.filter(date__lte=end_date)
+
+    written = 0
+    with transaction.atomic():
+        entries.delete()
+
+        chunk = []
+        for assignment in assignments.iterator(chunk_size=SCHEDULE_CHUNK_SIZE):
+            chunk.append(assignment)
+            if len(chunk) == SCHEDULE_CHUNK_SIZE:
+                written += len(ScheduleEntry.objects.bulk_create(_build_entries(chunk)))
+                chunk = []
+        if chunk:
+            written += len(ScheduleEntry.objects.bulk_create(_build_entries(chunk)))
+
+    return written
@@ -1,13 +1,14 @@
 from rest_framework import serializers
-from .models import Shift, ShiftAssignment, ShiftSwapRequest
+from .models import Shift, ShiftAssignment, ShiftSwapRequest, StaffAvailability
 from staff.serializers import StaffMemberSerializer
+from api.sparse import SparseFieldsMixin
 
-class ShiftSerializer(serializers.ModelSerializer):
+class ShiftSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Shift
         fields = ['id', 'name', 'start_time', 'end_time', 'break_duration', 'created_at', 'updated_at']
 
-class ShiftAssignmentSerializer(serializers.ModelSerializer):
+class ShiftAssignmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     staff_member_details = StaffMemberSerializer(source='staff_member', read_only=True)
     shift_details = ShiftSerializer(source='shift', read_only=True)
     
@@ -15,6 +16,61 @@ class ShiftAssignmentSerializer(serializers.ModelSerializer):
         model = ShiftAssignment
         fields = ['id', 'staff_member', 'staff_member_details', 'shift', 'shift_details', 
                   'date', 'is_active', 'created_at', 'updated_at']
+
+class ShiftAssignmentBulkItemSerializer(serializers.Serializer):
+    """
+    Serializer for a single row of a bulk shift assignment request.
+    Related objects are given by id and resolved in bulk by the caller.
+    """
+    staff_member = serializers.IntegerField(min_value=1)
+    shift = serializers.IntegerField(min_value=1)
+    date = serializers.DateField()
+    is_active = serializers.BooleanField(required=False, default=True)
+        
+class StaffAvailabilitySerializer(serializers.ModelSerializer):
+    day_of_week_display = serializers.CharField(source='get_day_of_week_display', read_only=True)
+    
+    class Meta:
+        model = StaffAvailability
+        fields = ['id', 'staff_member', 'day_of_week', 'day_of_week_display', 'start_time', 'end_time']
+
+class CoverageTargetSerializer(serializers.Serializer):
+    """
+    Serializer for the number of staff of a role required on a shift each day
+    """
+    shift = serializers.IntegerField(min_value=1)
+    role = serializers.IntegerField(min_value=1)
+    required = serializers.IntegerField(min_value=1)
+
+class RosterRequestSerializer(serializers.Serializer):
+    """
+    Serializer for roster generation requests
+    """
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    department = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    targets = CoverageTargetSerializer(many=True, allow_empty=False)
+    commit = serializers.BooleanField(required=False, default=False)
+    
+    def validate(self, data):
+        if data['start_date'] > data['end_date']:
+            raise serializers.ValidationError("Start date must be before or equal to end date.")
+        if (data['end_date'] - data['start_date']).days >= 62:
+            raise serializers.ValidationError("Rosters can be generated for at most 62 days at a time.")
+        return data
+
+class SwapCycleRequestSerializer(serializers.Serializer):
+    """
+    Serializer for swap cycle resolution requests
+    """
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    commit = serializers.BooleanField(required=False, default=False)
+    
+    def validate(self, data):
+        if data['start_date'] > data['end_date']:
+            raise serializers.ValidationError("Start date must be before or equal to end date.")
+        return data
         
 class ShiftSwapRequestSerializer(serializers.ModelSerializer):
     requester_details = serializers.SerializerMethodField()
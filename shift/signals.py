@@ -0,0 +1,88 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from department.models import Department
+from role.models import Role
+from staff.models import StaffMember
+from .models import ScheduleEntry, Shift, ShiftAssignment
+from .schedule import refresh_schedule_entries, refresh_schedule_entries_for
+
+
+# Keep the materialized schedule (ScheduleEntry) in sync with everything its payload is rendered from.
+# Only today's and later entries follow changes: past days keep the schedule as it was
+# rendered at the time, until rebuild_schedule re-renders them.
+
+# Fields of the user, role and department the payload renders (ShiftAssignmentSerializer)
+SCHEDULE_FIELDS = {
+    User: ('username', 'first_name', 'last_name', 'email'),
+    Role: ('name',),
+    Department: ('name',),
+}
+
+
+def _refresh_upcoming(**filters):
+    refresh_schedule_entries_for(date__gte=timezone.localdate(), is_active=True, **filters)
+
+
+@receiver(post_save, sender=ShiftAssignment)
+def refresh_assignment_schedule(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_schedule_entries([instance.pk])
+
+
+@receiver(post_save, sender=Shift)
+def refresh_shift_schedule(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _refresh_upcoming(shift=instance)
+
+
+@receiver(post_save, sender=StaffMember)
+def refresh_staff_schedule(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _refresh_upcoming(staff_member=instance)
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Role)
+@receiver(pre_save, sender=Department)
+def remember_schedule_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Saves leaving the rendered fields alone (last_login, password upgrades...) are not looked at
+    fields = SCHEDULE_FIELDS[sender]
+    if raw or instance.pk is None or (update_fields is not None and not set(fields) & set(update_fields)):
+        return
+    instance._schedule_values = sender._default_manager.filter(pk=instance.pk).values_list(*fields).first()
+
+
+def _schedule_fields_changed(sender, instance):
+    previous = instance.__dict__.pop('_schedule_values', None)
+    return previous is not None and previous != tuple(getattr(instance, field) for field in SCHEDULE_FIELDS[sender])
+
+
+@receiver(post_save, sender=User)
+def refresh_user_schedule(sender, instance, raw=False, **kwargs):
+    if not raw and _schedule_fields_changed(sender, instance):
+        _refresh_upcoming(staff_member__user=instance)
+
+
+@receiver(post_save, sender=Role)
+def refresh_role_schedule(sender, instance, raw=False, **kwargs):
+    if not raw and _schedule_fields_changed(sender, instance):
+        _refresh_upcoming(staff_member__role=instance)
+
+
+@receiver(post_save, sender=Department)
+def refresh_department_schedule(sender, instance, raw=False, **kwargs):
+    if not raw and _schedule_fields_changed(sender, instance):
+        _refresh_upcoming(staff_member__department=instance)
+
+
+@receiver(post_save, sender='attendance.LeaveRequest')
+def drop_leave_schedule(sender, instance, raw=False, **kwargs):
+    # Approving a leave deactivates the assignments it covers with a queryset update,
+    # which sends no signals, so drop their entries directly
+    if not raw and instance.status == 'approved':
+        ScheduleEntry.objects.filter(
+            assignment__staff_member_id=instance.staff_member_id,
+            date__range=(instance.start_date, instance.end_date)
+        ).delete()
@@ -0,0 +1,150 @@
+import datetime
+from django.db.models import Count
+from staff.models import StaffMember
+from .models import Shift, ShiftAssignment, StaffAvailability
+
+# Minimum time off between two shifts of the same person
+MIN_REST = datetime.timedelta(hours=8)
+# Days either side of the shift counted as a candidate's current load
+LOAD_WINDOW_DAYS = 3
+
+
+def _interval(date, start_time, end_time):
+    start = datetime.datetime.combine(date, start_time)
+    end = datetime.datetime.combine(date, end_time)
+    if end <= start:
+        end += datetime.timedelta(days=1)
+    return start, end
+
+
+def _rested(interval, others):
+    """
+    Returns True if ``interval`` keeps MIN_REST away from every interval in ``others``
+    """
+    start, end = interval
+    return all(other_end + MIN_REST <= start or end + MIN_REST <= other_start for other_start, other_end in others)
+
+
+def _available(windows, weekday, start_time, end_time):
+    """
+    Staff without any availability windows are available at all times, like in the roster generator
+    """
+    if windows is None:
+        return True
+    window = windows.get(weekday)
+    return window is not None and window.covers(start_time, end_time)
+
+
+def find_swap_candidates(assignment, limit=20):
+    """
+    Ranks the staff members who could take over ``assignment``.
+
+    Candidates share the requester's role and department. 'swap' candidates
+    work a different shift that day, are available for the requester's shift
+    and vice versa; 'cover' candidates are free that day, available for the
+    shift and not on leave. Anyone who would end up without MIN_REST between
+    shifts is left out. Swaps rank first (they can be approved as swap requests
+    directly), then candidates with the lightest load around that date.
+
+    Everything is read with a handful of indexed queries: peers by
+    (role, department), their load around the date (counted in the database),
+    their assignments of the day before, of and after, their availability
+    windows and the leave calendar of that day.
+    """
+    from attendance.availability import LeaveCalendar
+
+    requester = assignment.staff_member
+    date = assignment.date
+    shift = assignment.shift
+    target = _interval(date, shift.start_time, shift.end_time)
+
+    peers = {
+        staff_member_id: (staff_id, first_name, last_name)
+        for staff_member_id, staff_id, first_name, last_name in StaffMember.objects.filter(
+            role_id=requester.role_id,
+            department_id=requester.department_id
+        ).exclude(id=requester.id).order_by().values_list('id', 'staff_id', 'user__first_name', 'user__last_name')
+    }
+    if not peers:
+        return []
+
+    staff_ids = list(peers) + [requester.id]
+    # Join on the peers' role and department rather than sending hundreds of ids
+    peer_assignments = ShiftAssignment.objects.filter(
+        staff_member__role_id=requester.role_id,
+        staff_member__department_id=requester.department_id,
+        is_active=True
+    ).exclude(id=assignment.id).order_by()
+
+    load = dict.fromkeys(staff_ids, 0)
+    load.update(peer_assignments.filter(
+        date__range=(date - datetime.timedelta(days=LOAD_WINDOW_DAYS), date + datetime.timedelta(days=LOAD_WINDOW_DAYS))
+    ).values('staff_member_id').annotate(count=Count('id')).values_list('staff_member_id', 'count'))
+
+    shifts = {
+        shift_id: (name, start_time, end_time)
+        for shift_id, name, start_time, end_time in Shift.objects.values_list('id', 'name', 'start_time', 'end_time')
+    }
+
+    same_day = {}
+    neighbours = {}
+    for assignment_id, staff_member_id, day, shift_id in peer_assignments.filter(
+        date__range=(date - datetime.timedelta(days=1), date + datetime.timedelta(days=1))
+    ).values_list('id', 'staff_member_id', 'date', 'shift_id'):
+        shift_name, start_time, end_time = shifts[shift_id]
+        if day == date:
+            same_day[staff_member_id] = (assignment_id, shift_id, shift_name, start_time, end_time)
+        else:
+            neighbours.setdefault(staff_member_id, []).append(_interval(day, start_time, end_time))
+
+    # Staff with windows on other weekdays only are unavailable that day, so every window is read
+    windows = {}
+    weekday = date.weekday()
+    for staff_member_id, day_of_week, start_time, end_time in StaffAvailability.objects.filter(
+        staff_member_id__in=staff_ids
+    ).values_list('staff_member_id', 'day_of_week', 'start_time', 'end_time'):
+        staff_windows = windows.setdefault(staff_member_id, {})
+        if day_of_week == weekday:
+            staff_windows[day_of_week] = StaffAvailability(start_time=start_time, end_time=end_time)
+
+    on_leave = LeaveCalendar(date, date, staff_member_ids=list(peers)).staff_on_leave(date)
+    requester_windows = windows.get(requester.id)
+
+    candidates = []
+    for staff_member_id, (staff_id, first_name, last_name) in peers.items():
+        if staff_member_id in on_leave:
+            continue
+
+        candidate_windows = windows.get(staff_member_id)
+        if not _available(candidate_windows, weekday, shift.start_time, shift.end_time):
+            continue
+        if not _rested(target, neighbours.get(staff_member_id, [])):
+            continue
+
+        current = same_day.get(staff_member_id)
+        if current is None:
+            kind = 'cover'
+        else:
+            assignment_id, shift_id, shift_name, start_time, end_time = current
+            if shift_id == shift.id:
+                continue
+            # The requester takes over the candidate's shift in a swap
+            if not _available(requester_windows, weekday, start_time, end_time):
+                continue
+            if not _rested(_interval(date, start_time, end_time), neighbours.get(requester.id, [])):
+                continue
+            kind = 'swap'
+
+        candidates.append({
+            'staff_member': staff_member_id,
+            'staff_id': staff_id,
+            'name': f"{first_name} {last_name}".strip(),
+            'kind': kind,
+            'assignment': current[0] if current else None,
+            'shift': current[1] if current else None,
+            'shift_name': current[2] if current else None,
+            'load': load[staff_member_id],
+        })
+
+    candidates.sort(key=lambda candidate: (candidate['kind'] != 'swap', candidate['load'], candidate['name']))
+    return candidates[:limit]
@@ -0,0 +1,234 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, OuterRef, Q, Subquery, Value, When
+from django.utils import timezone
+from .models import ShiftAssignment, ShiftSwapRequest
+from .schedule import refresh_schedule_entries
+
+
+def _swap_request_queryset():
+    return ShiftSwapRequest.objects.select_related(
+        'requester_assignment__staff_member', 'requester_assignment__shift',
+        'recipient_assignment__staff_member', 'recipient_assignment__shift',
+        'recipient'
+    )
+
+
+def approve_swap_request(swap_request_id):
+    """
+    Approves a pending swap request by exchanging the shifts of the requester's
+    assignment and the recipient's assignment on the same date.
+
+    Runs in one transaction with a fixed number of queries. The request is
+    claimed with a conditional UPDATE (status='pending'), so of several
+    concurrent approvals exactly one proceeds. Both assignments are then
+    locked with SELECT ... FOR UPDATE and their shifts exchanged with a single
+    UPDATE. SQLite ignores FOR UPDATE, but the claiming UPDATE already holds
+    its database write lock until the transaction ends, so approvals still run
+    one at a time there.
+
+    Raises ValidationError (rolling everything back) if the request is not
+    pending or the swap is no longer possible; returns the updated request.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        claimed = ShiftSwapRequest.objects.filter(pk=swap_request_id, status='pending').update(
+            status='approved', updated_at=now
+        )
+        if not claimed:
+            raise ValidationError('This request has already been processed')
+
+        requester_assignment_id, recipient_id, date = ShiftSwapRequest.objects.filter(pk=swap_request_id).values_list(
+            'requester_assignment_id', 'recipient_id', 'requester_assignment__date'
+        ).get()
+
+        # Locked in id order so two approvals touching the same rows cannot deadlock
+        assignments = list(ShiftAssignment.objects.select_for_update().filter(
+            Q(id=requester_assignment_id) | Q(staff_member_id=recipient_id, date=date)
+        ).order_by('id'))
+
+        requester_assignment = next(
+            (assignment for assignment in assignments if assignment.id == requester_assignment_id), None
+        )
+        recipient_assignment = next(
+            (assignment for assignment in assignments if assignment.staff_member_id == recipient_id), None
+        )
+
+        if requester_assignment is None or not requester_assignment.is_active:
+            raise ValidationError('The requester no longer has an active shift assignment')
+        if recipient_assignment is None or not recipient_assignment.is_active:
+            raise ValidationError('Recipient does not have a shift assignment on this date')
+
+        ShiftAssignment.objects.filter(id__in=[requester_assignment.id, recipient_assignment.id]).update(
+            shift=Case(
+                When(id=requester_assignment.id, then=Value(recipient_assignment.shift_id)),
+                When(id=recipient_assignment.id, then=Value(requester_assignment.shift_id)),
+            ),
+            updated_at=now
+        )
+        ShiftSwapRequest.objects.filter(pk=swap_request_id).update(recipient_assignment=recipient_assignment)
+        refresh_schedule_entries([requester_assignment.id, recipient_assignment.id])
+
+    return _swap_request_queryset().get(pk=swap_request_id)
+
+
+def reject_swap_request(swap_request_id):
+    """
+    Rejects a pending swap request with a conditional UPDATE, so a request
+    approved concurrently is never flipped back. Raises ValidationError if the
+    request is not pending; returns the updated request.
+    """
+    if not ShiftSwapRequest.objects.filter(pk=swap_request_id, status='pending').update(
+        status='rejected', updated_at=timezone.now()
+    ):
+        raise ValidationError('This request has already been processed')
+    return _swap_request_queryset().get(pk=swap_request_id)
+
+
+SWAP_CYCLE_CHUNK_SIZE = 500
+
+
+def find_swap_cycles(edges):
+    """
+    Finds vertex-disjoint cycles in a directed graph given as
+    {node: [(next node, edge label), ...]} and returns each one as a list of
+    (node, label of the edge leaving it).
+
+    A single iterative depth-first search visits every node and edge once, so
+    the search is linear in the size of the graph. A back edge to a node on the
+    current path closes a cycle; its nodes are taken out of the graph and the
+    search carries on from the node the cycle started after. Cycles are picked
+    greedily in that order, which is not guaranteed to be the largest possible set.
+    """
+    done = set()
+    cycles = []
+
+    for root in edges:
+        if root in done:
+            continue
+
+        stack = [(root, iter(edges[root]))]
+        labels = []
+        position = {root: 0}
+        while stack:
+            node, neighbours = stack[-1]
+            for next_node, label in neighbours:
+                if next_node in done:
+                    continue
+                if next_node in position:
+                    start = position[next_node]
+                    cycles.append(
+                        [(stack[index][0], labels[index]) for index in range(start, len(stack) - 1)] + [(node, label)]
+                    )
+                    for cycle_node, _ in stack[start:]:
+                        del position[cycle_node]
+                        done.add(cycle_node)
+                    del stack[start:]
+                    del labels[max(start - 1, 0):]
+                    break
+                position[next_node] = len(stack)
+                labels.append(label)
+                stack.append((next_node, iter(edges.get(next_node, ()))))
+                break
+            else:
+                stack.pop()
+                del position[node]
+                done.add(node)
+                if labels:
+                    labels.pop()
+
+    return cycles
+
+
+def resolve_swap_cycles(start_date, end_date, commit=False):
+    """
+    Finds chains of pending swap requests that close into a cycle (A wants B's
+    shift, B wants C's, C wants A's) for shifts between ``start_date`` and
+    ``end_date`` and, with ``commit``, executes them.
+
+    Each request is an edge from the requester's assignment to the recipient's
+    assignment on the same date; requests whose recipient has no active
+    assignment that day are left out. Executing a cycle hands every requester
+    the shift of the person they asked and approves all of its requests. All
+    cycles are applied in one transaction with chunked bulk updates: the requests
+    are claimed with a conditional UPDATE (status='pending') first, so if any of
+    them was decided meanwhile nothing is applied and ValidationError is raised.
+
+    Returns a dict with the number of pending requests considered, the cycles
+    found (as lists of request ids), the approved requests and the updated
+    assignments.
+    """
+    recipient_assignment = ShiftAssignment.objects.filter(
+        staff_member_id=OuterRef('recipient_id'),
+        date=OuterRef('requester_assignment__date'),
+        is_active=True
+    ).values('id')[:1]
+
+    with transaction.atomic():
+        edges = {}
+        considered = 0
+        for request_id, requester_assignment_id, recipient_assignment_id in ShiftSwapRequest.objects.filter(
+            status='pending',
+            requester_assignment__date__range=(start_date, end_date),
+            requester_assignment__is_active=True
+        ).annotate(
+            recipient_shift_assignment=Subquery(recipient_assignment)
+        ).order_by('id').values_list('id', 'requester_assignment_id', 'recipient_shift_assignment'):
+            considered += 1
+            if recipient_assignment_id is not None:
+                edges.setdefault(requester_assignment_id, []).append((recipient_assignment_id, request_id))
+
+        cycles = find_swap_cycles(edges)
+        result = {
+            'pending': considered,
+            'cycles': [[request_id for assignment_id, request_id in cycle] for cycle in cycles],
+            'approved_requests': 0,
+            'updated_assignments': 0,
+        }
+        if not commit or not cycles:
+            return result
+
+        # Only the assignments taking part in a cycle are locked and read
+        assignment_ids = [assignment_id for cycle in cycles for assignment_id, request_id in cycle]
+        shifts = {}
+        for offset in range(0, len(assignment_ids), SWAP_CYCLE_CHUNK_SIZE):
+            shifts.update(ShiftAssignment.objects.select_for_update().filter(
+                id__in=assignment_ids[offset:offset + SWAP_CYCLE_CHUNK_SIZE],
+                is_active=True
+            ).order_by('id').values_list('id', 'shift_id'))
+        if len(shifts) != len(assignment_ids):
+            raise ValidationError('Some shift assignments changed while resolving cycles, please retry')
+
+        now = timezone.now()
+        request_ids = []
+        moves = {}
+        for cycle in cycles:
+            for index, (assignment_id, request_id) in enumerate(cycle):
+                request_ids.append(request_id)
+                moves.setdefault(shifts[cycle[(index + 1) % len(cycle)][0]], []).append(assignment_id)
+
+        # Claims the requests and records the assignment each one was swapped with
+        recipient_assignment = ShiftAssignment.objects.filter(
+            staff_member_id=OuterRef('recipient_id'),
+            date=Subquery(ShiftAssignment.objects.filter(pk=OuterRef(OuterRef('requester_assignment_id'))).values('date')),
+            is_active=True
+        ).values('id')[:1]
+        for offset in range(0, len(request_ids), SWAP_CYCLE_CHUNK_SIZE):
+            chunk = request_ids[offset:offset + SWAP_CYCLE_CHUNK_SIZE]
+            if ShiftSwapRequest.objects.filter(id__in=chunk, status='pending').update(
+                status='approved', recipient_assignment=Subquery(recipient_assignment), updated_at=now
+            ) != len(chunk):
+                raise ValidationError('Some swap requests were processed while resolving cycles, please retry')
+
+        # One UPDATE per target shift rather than a CASE per row
+        for shift_id, moved in moves.items():
+            for offset in range(0, len(moved), SWAP_CYCLE_CHUNK_SIZE):
+                ShiftAssignment.objects.filter(id__in=moved[offset:offset + SWAP_CYCLE_CHUNK_SIZE]).update(
+                    shift_id=shift_id, updated_at=now
+                )
+        refresh_schedule_entries(assignment_ids)
+
+    result['approved_requests'] = len(request_ids)
+    result['updated_assignments'] = len(assignment_ids)
+    return result
@@ -1,3 +1,281 @@
-from django.test import TestCase
+import datetime
+import threading
+from collections import Counter
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+from department.models import Department
+from role.models import Role
+from staff.models import StaffMember
+from .models import Shift, ShiftAssignment, ShiftSwapRequest
+from .swaps import approve_swap_request, find_swap_cycles, reject_swap_request, resolve_swap_cycles
 
-# Create your tests here.
+
+def create_assignments(count, date):
+    """
+    Creates ``count`` staff members, each with a shift of their own on ``date``;
+    returns the shifts and the assignments
+    """
+    department = Department.objects.create(name='Cardiology')
+    role = Role.objects.create(name='Nurse')
+    shifts = Shift.objects.bulk_create([
+        Shift(name=f'Shift {index}', start_time=datetime.time(index), end_time=datetime.time(index + 1))
+        for index in range(count)
+    ])
+    assignments = []
+    for index in range(count):
+        user = User.objects.create_user(f'nurse{index}')
+        staff_member = StaffMember.objects.create(
+            user=user, staff_id=f'STAFF000{index}', department=department, role=role, phone_number=f'555000{index}'
+        )
+        assignments.append(ShiftAssignment.objects.create(staff_member=staff_member, shift=shifts[index], date=date))
+    return shifts, assignments
+
+
+class SwapApprovalConcurrencyTests(TransactionTestCase):
+    """
+    Approvals and rejections racing in separate threads, each with its own connection
+    """
+
+    def setUp(self):
+        self.date = datetime.date(2025, 6, 2)
+        self.shifts, self.assignments = create_assignments(3, self.date)
+
+    def swap_request(self, requester, recipient):
+        return ShiftSwapRequest.objects.create(
+            requester_assignment=self.assignments[requester],
+            recipient=self.assignments[recipient].staff_member
+        )
+
+    def race(self, *calls):
+        """
+        Runs the (function, swap request id) calls at the same time; returns
+        the outcome of each, 'ok' or the ValidationError message
+        """
+        barrier = threading.Barrier(len(calls))
+        outcomes = [None] * len(calls)
+
+        def run(index, function, swap_request_id):
+            barrier.wait()
+            try:
+                function(swap_request_id)
+                outcomes[index] = 'ok'
+            except ValidationError as e:
+                outcomes[index] = e.messages[0]
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=run, args=(index, function, swap_request_id))
+            for index, (function, swap_request_id) in enumerate(calls)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def shift_ids(self):
+        return list(ShiftAssignment.objects.filter(
+            id__in=[assignment.id for assignment in self.assignments]
+        ).order_by('id').values_list('shift_id', flat=True))
+
+    def test_concurrent_approvals_of_one_request(self):
+        swap_request = self.swap_request(0, 1)
+
+        outcomes = self.race((approve_swap_request, swap_request.id), (approve_swap_request, swap_request.id))
+
+        self.assertEqual(sorted(outcomes), ['This request has already been processed', 'ok'])
+        # Swapped exactly once
+        self.assertEqual(self.shift_ids(), [self.shifts[1].id, self.shifts[0].id, self.shifts[2].id])
+
+    def test_approval_racing_rejection(self):
+        swap_request = self.swap_request(0, 1)
+
+        outcomes = self.race((approve_swap_request, swap_request.id), (reject_swap_request, swap_request.id))
+
+        self.assertEqual(outcomes.count('ok'), 1)
+        swap_request.refresh_from_db()
+        swapped = self.shift_ids() != [shift.id for shift in self.shifts]
+        self.assertEqual(swap_request.status == 'approved', swapped)
+
+    def test_swaps_sharing_an_assignment_keep_every_shift(self):
+        swap_requests = [self.swap_request(0, 1), self.swap_request(1, 2), self.swap_request(2, 0)]
+
+        outcomes = self.race(*[
+            (approve_swap_request, swap_request.id) for swap_request in swap_requests for attempt in range(2)
+        ])
+
+        self.assertEqual(outcomes.count('ok'), len(swap_requests))
+        # Serialized swaps only permute the shifts of the day
+        self.assertEqual(Counter(self.shift_ids()), Counter(shift.id for shift in self.shifts))
+        self.assertEqual(set(ShiftSwapRequest.objects.values_list('status', flat=True)), {'approved'})
+
+
+class FindSwapCyclesTests(SimpleTestCase):
+    def assertDisjointCycles(self, edges, cycles):
+        nodes = [node for cycle in cycles for node, label in cycle]
+        self.assertEqual(len(nodes), len(set(nodes)))
+        for cycle in cycles:
+            for index, (node, label) in enumerate(cycle):
+                self.assertIn((cycle[(index + 1) % len(cycle)][0], label), edges[node])
+
+    def test_two_cycle(self):
+        self.assertEqual(find_swap_cycles({1: [(2, 'a')], 2: [(1, 'b')]}), [[(1, 'a'), (2, 'b')]])
+
+    def test_three_cycle(self):
+        edges = {1: [(2, 'a')], 2: [(3, 'b')], 3: [(1, 'c')]}
+        self.assertEqual(find_swap_cycles(edges), [[(1, 'a'), (2, 'b'), (3, 'c')]])
+
+    def test_no_cycle(self):
+        self.assertEqual(find_swap_cycles({1: [(2, 'a')], 2: [(3, 'b')], 4: [(2, 'c')]}), [])
+        self.assertEqual(find_swap_cycles({}), [])
+
+    def test_overlapping_cycles_share_a_node(self):
+        # 1 <-> 2 and 2 <-> 3: node 2 can only take part in one of them
+        edges = {1: [(2, 'a')], 2: [(1, 'b'), (3, 'c')], 3: [(2, 'd')]}
+        cycles = find_swap_cycles(edges)
+
+        self.assertEqual(len(cycles), 1)
+        self.assertDisjointCycles(edges, cycles)
+
+    def test_cycle_after_dead_ends(self):
+        # The search backs out of 4 and 5 before closing 2 -> 3 -> 2, which does not include the root
+        edges = {1: [(4, 'x'), (2, 'a')], 2: [(5, 'y'), (3, 'b')], 3: [(2, 'c')], 4: [], 5: [(4, 'z')]}
+        self.assertEqual(find_swap_cycles(edges), [[(2, 'b'), (3, 'c')]])
+
+    def test_search_carries_on_after_a_cycle(self):
+        edges = {
+            1: [(2, 'a')], 2: [(3, 'b')], 3: [(2, 'c'), (4, 'd')],
+            4: [(5, 'e')], 5: [(4, 'f'), (1, 'g')],
+        }
+        cycles = find_swap_cycles(edges)
+
+        self.assertEqual(cycles, [[(2, 'b'), (3, 'c')], [(4, 'e'), (5, 'f')]])
+        self.assertDisjointCycles(edges, cycles)
+
+
+class ResolveSwapCyclesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.date = datetime.date(2025, 6, 2)
+        cls.shifts, cls.assignments = create_assignments(4, cls.date)
+        # 0 -> 1 -> 2 -> 0 closes a cycle; 3 asks 0 but nobody asks 3
+        cls.swap_requests = [
+            ShiftSwapRequest.objects.create(
+                requester_assignment=cls.assignments[requester], recipient=cls.assignments[recipient].staff_member
+            )
+            for requester, recipient in ((0, 1), (1, 2), (2, 0), (3, 0))
+        ]
+
+    def resolve(self, commit):
+        return resolve_swap_cycles(self.date, self.date, commit=commit)
+
+    def shift_ids(self):
+        return [
+            ShiftAssignment.objects.get(pk=assignment.pk).shift_id for assignment in self.assignments
+        ]
+
+    def statuses(self):
+        return [ShiftSwapRequest.objects.get(pk=swap_request.pk).status for swap_request in self.swap_requests]
+
+    def test_dry_run_leaves_data_untouched(self):
+        result = self.resolve(commit=False)
+
+        self.assertEqual(result['pending'], 4)
+        self.assertEqual([sorted(cycle) for cycle in result['cycles']],
+                         [sorted(swap_request.id for swap_request in self.swap_requests[:3])])
+        self.assertEqual((result['approved_requests'], result['updated_assignments']), (0, 0))
+        self.assertEqual(self.shift_ids(), [shift.id for shift in self.shifts])
+        self.assertEqual(self.statuses(), ['pending'] * 4)
+
+    def test_commit_swaps_and_approves(self):
+        result = self.resolve(commit=True)
+
+        self.assertEqual((result['approved_requests'], result['updated_assignments']), (3, 3))
+        # Every requester gets the shift of the person they asked
+        self.assertEqual(self.shift_ids(), [self.shifts[1].id, self.shifts[2].id, self.shifts[0].id, self.shifts[3].id])
+        self.assertEqual(self.statuses(), ['approved', 'approved', 'approved', 'pending'])
+        self.assertEqual(
+            [ShiftSwapRequest.objects.get(pk=swap_request.pk).recipient_assignment_id
+             for swap_request in self.swap_requests[:3]],
+            [self.assignments[1].id, self.assignments[2].id, self.assignments[0].id]
+        )
+        self.assertEqual(self.resolve(commit=True)['cycles'], [])
+
+
+class BulkAssignmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.date = datetime.date(2025, 6, 2)
+        cls.shifts, cls.assignments = create_assignments(3, cls.date)
+        cls.staff_members = [assignment.staff_member for assignment in cls.assignments]
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def row(self, staff_index, shift_index, day):
+        return {
+            'staff_member': self.staff_members[staff_index].id,
+            'shift': self.shifts[shift_index].id,
+            'date': f'2025-06-{day:02d}',
+        }
+
+    def bulk(self, rows, upsert=False):
+        return self.client.post('/api/v1/shifts/assignments/bulk/', {'assignments': rows, 'upsert': upsert},
+                                format='json')
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        response = self.bulk([
+            self.row(0, 0, 3),
+            {'staff_member': self.staff_members[1].id, 'shift': self.shifts[0].id},
+            {'staff_member': 99999, 'shift': self.shifts[0].id, 'date': '2025-06-03'},
+            self.row(0, 1, 3),
+            self.row(1, 1, 2),
+        ])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['created']), 1)
+        errors = {error['index']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(sorted(errors), [1, 2, 3, 4])
+        self.assertIn('date', errors[1])
+        self.assertIn('staff_member', errors[2])
+        self.assertIn('Duplicate of row 0', errors[3]['non_field_errors'][0])
+        self.assertIn('already has a shift assignment', errors[4]['non_field_errors'][0])
+
+    def test_conflicts_only(self):
+        response = self.bulk([self.row(0, 1, 2)])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ShiftAssignment.objects.get(pk=self.assignments[0].pk).shift_id, self.shifts[0].id)
+
+    def test_upsert(self):
+        response = self.bulk([self.row(0, 1, 2), self.row(1, 0, 3)], upsert=True)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['updated'], [self.assignments[0].id])
+        self.assertEqual(ShiftAssignment.objects.get(pk=self.assignments[0].pk).shift_id, self.shifts[1].id)
+        self.assertTrue(ShiftAssignment.objects.filter(staff_member=self.staff_members[1], date='2025-06-03').exists())
+
+    def test_concurrent_insert_is_a_conflict(self):
+        bulk_create = ShiftAssignment.objects.bulk_create
+
+        def concurrent_bulk_create(assignments, **kwargs):
+            # Another request creates one of the keys after they were read
+            ShiftAssignment.objects.create(
+                staff_member=self.staff_members[2], shift=self.shifts[0], date=datetime.date(2025, 6, 3)
+            )
+            return bulk_create(assignments, **kwargs)
+
+        with mock.patch.object(ShiftAssignment.objects, 'bulk_create', concurrent_bulk_create):
+            response = self.bulk([self.row(1, 0, 3), self.row(2, 1, 3), self.row(0, 1, 2)], upsert=True)
+
+        self.assertEqual(response.status_code, 409)
+        # Nothing of the request was written
+        self.assertFalse(ShiftAssignment.objects.filter(date='2025-06-03', staff_member=self.staff_members[1]).exists())
+        self.assertEqual(ShiftAssignment.objects.get(pk=self.assignments[0].pk).shift_id, self.shifts[0].id)
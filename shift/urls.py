@@ -1,10 +1,11 @@
 from django.urls import path
 from rest_framework import routers
-from .views import ShiftViewSet, ShiftAssignmentViewSet, ShiftSwapRequestViewSet
+from .views import ShiftViewSet, ShiftAssignmentViewSet, ShiftSwapRequestViewSet, StaffAvailabilityViewSet
 
 router = routers.DefaultRouter()
 router.register(r'shifts', ShiftViewSet)
 router.register(r'assignments', ShiftAssignmentViewSet)
 router.register(r'swap-requests', ShiftSwapRequestViewSet)
+router.register(r'availability', StaffAvailabilityViewSet)
 
 urlpatterns = router.urls
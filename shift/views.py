@@ -1,16 +1,28 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import Shift, ShiftAssignment, ShiftSwapRequest
-from .serializers import ShiftSerializer, ShiftAssignmentSerializer, ShiftSwapRequestSerializer
+from .models import Shift, ShiftAssignment, ShiftSwapRequest, StaffAvailability, ScheduleEntry
+from .serializers import (ShiftSerializer, ShiftAssignmentSerializer, ShiftSwapRequestSerializer,
+                          ShiftAssignmentBulkItemSerializer, StaffAvailabilitySerializer,
+                          RosterRequestSerializer, SwapCycleRequestSerializer)
+from .bulk import bulk_upsert_assignments
+from .roster import generate_roster
+from .swap_candidates import find_swap_candidates
+from .swaps import approve_swap_request, reject_swap_request, resolve_swap_cycles
+from staff.models import StaffMember
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from api.pagination import DateKeysetPagination
+from api.export import EXPORT_FORMATS, stream_export
+from api.sparse import SparseQuerysetMixin
 
-class ShiftViewSet(viewsets.ModelViewSet):
+class ShiftViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing shifts
     
@@ -36,7 +48,7 @@ class ShiftViewSet(viewsets.ModelViewSet):
     serializer_class = ShiftSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-class ShiftAssignmentViewSet(viewsets.ModelViewSet):
+class ShiftAssignmentViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing shift assignments
     
@@ -61,6 +73,8 @@ class ShiftAssignmentViewSet(viewsets.ModelViewSet):
     queryset = ShiftAssignment.objects.all().select_related('staff_member', 'shift')
     serializer_class = ShiftAssignmentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = DateKeysetPagination
+    bulk_max_rows = 10000
     
     def get_queryset(self):
         queryset = ShiftAssignment.objects.all().select_related('staff_member', 'staff_member__role', 
@@ -93,10 +107,181 @@ class ShiftAssignmentViewSet(viewsets.ModelViewSet):
             
         return queryset
     
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Rank the staff members of the same role and department who could take this shift: "
+                              "'swap' candidates work another shift that day, 'cover' candidates are free, "
+                              "available and not on leave.",
+        manual_parameters=[
+            openapi.Parameter('limit', openapi.IN_QUERY, description="Maximum number of candidates (default 20, max 100)", type=openapi.TYPE_INTEGER),
+        ]
+    )
+    @action(detail=True, methods=['get'], url_path='swap-candidates')
+    def swap_candidates(self, request, pk=None):
+        """
+        Find staff members to swap this shift with or to cover it
+        """
+        assignment = self.get_object()
+        
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'assignment': assignment.id,
+            'date': assignment.date,
+            'shift': assignment.shift_id,
+            'candidates': find_swap_candidates(assignment, limit=max(limit, 1)),
+        })
+    
+    export_columns = [
+        ('id', 'id'),
+        ('date', 'date'),
+        ('staff_id', 'staff_member__staff_id'),
+        ('first_name', 'staff_member__user__first_name'),
+        ('last_name', 'staff_member__user__last_name'),
+        ('department', 'staff_member__department__name'),
+        ('role', 'staff_member__role__name'),
+        ('shift', 'shift__name'),
+        ('shift_start_time', 'shift__start_time'),
+        ('shift_end_time', 'shift__end_time'),
+        ('break_duration', 'shift__break_duration'),
+        ('is_active', 'is_active'),
+    ]
+    
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Stream shift assignments as CSV or NDJSON, one flat row per assignment. "
+                              "Accepts the same filters as the list endpoint.",
+        manual_parameters=[
+            openapi.Parameter('file_format', openapi.IN_QUERY, description="csv (default) or ndjson", type=openapi.TYPE_STRING),
+            openapi.Parameter('start_date', openapi.IN_QUERY, description="Start date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+            openapi.Parameter('end_date', openapi.IN_QUERY, description="End date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+            openapi.Parameter('staff_id', openapi.IN_QUERY, description="Staff ID", type=openapi.TYPE_STRING),
+            openapi.Parameter('role_id', openapi.IN_QUERY, description="Role ID", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('is_active', openapi.IN_QUERY, description="true or false", type=openapi.TYPE_STRING),
+        ]
+    )
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Export shift assignments, e.g. a month for payroll
+        """
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response({'error': f"Unsupported format, use one of: {', '.join(EXPORT_FORMATS)}"}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = self.get_queryset().order_by('date', 'id')
+        return stream_export(queryset, self.export_columns, file_format, 'shift-assignments')
+    
+    @swagger_auto_schema(
+        method='post',
+        operation_description="Create many shift assignments at once. Pass a list of rows, or an object with "
+                              "'assignments' and 'upsert' to update existing (staff_member, date) rows instead "
+                              "of reporting them as conflicts.",
+        request_body=ShiftAssignmentBulkItemSerializer(many=True),
+        responses={201: 'Assignments created', 200: 'Assignments updated', 400: 'No valid rows',
+                   409: 'Assignments created concurrently, nothing written'}
+    )
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Creates or upserts many shift assignments, reporting errors per row
+        """
+        rows = request.data
+        upsert = str(request.query_params.get('upsert', '')).lower() == 'true'
+        
+        if isinstance(rows, dict):
+            upsert = upsert or str(rows.get('upsert', '')).lower() == 'true'
+            rows = rows.get('assignments')
+        
+        if not isinstance(rows, list) or not rows:
+            return Response({'error': 'A non-empty list of assignments is required'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(rows) > self.bulk_max_rows:
+            return Response({'error': f'At most {self.bulk_max_rows} assignments can be sent per request'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            result = bulk_upsert_assignments(rows, upsert=upsert)
+        except IntegrityError:
+            return Response({'error': 'Some of these assignments were created by another request, please retry'}, 
+                           status=status.HTTP_409_CONFLICT)
+        created = result['created']
+        updated = result['updated']
+        
+        if created:
+            response_status = status.HTTP_201_CREATED
+        elif updated or not result['errors']:
+            response_status = status.HTTP_200_OK
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        
+        return Response({
+            'created': [assignment.id for assignment in created],
+            'updated': [assignment.id for assignment in updated],
+            'errors': result['errors']
+        }, status=response_status)
+    
+    @swagger_auto_schema(
+        method='post',
+        operation_description="Generate a roster for a date range from per-shift/per-role coverage targets, "
+                              "respecting staff availability, approved leave and the one-shift-per-day rule. "
+                              "Set 'commit' to write the proposed assignments.",
+        request_body=RosterRequestSerializer,
+        responses={200: 'Proposed roster and unmet coverage', 201: 'Roster written'}
+    )
+    @action(detail=False, methods=['post'], url_path='generate-roster')
+    def generate_roster(self, request):
+        """
+        Generates (and optionally writes) a roster, reporting coverage that could not be met
+        """
+        serializer = RosterRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        try:
+            result = generate_roster(
+                data['start_date'],
+                data['end_date'],
+                data['targets'],
+                department_id=data.get('department'),
+                commit=data['commit']
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'start_date': data['start_date'].strftime('%Y-%m-%d'),
+            'end_date': data['end_date'].strftime('%Y-%m-%d'),
+            'committed': data['commit'],
+            'assignments': [
+                {'staff_member': staff_id, 'shift': shift_id, 'date': date.strftime('%Y-%m-%d')}
+                for staff_id, shift_id, date in result['assignments']
+            ],
+            'unmet': [
+                dict(gap, date=gap['date'].strftime('%Y-%m-%d')) for gap in result['unmet']
+            ]
+        }, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
+    
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Returns the active shift schedule for a date range, grouped by date",
+        manual_parameters=[
+            openapi.Parameter('start_date', openapi.IN_QUERY, description="First day (YYYY-MM-DD), defaults to today", type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('days', openapi.IN_QUERY, description="Number of days, defaults to 7", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('department', openapi.IN_QUERY, description="Only include staff of this department", type=openapi.TYPE_INTEGER),
+        ]
+    )
     @action(detail=False, methods=['get'])
     def schedule(self, request):
         """
-        Returns shift schedule for a date range, grouped by date
+        Returns shift schedule for a date range, grouped by date.
+        Rows are read pre-rendered from the ScheduleEntry read model.
         """
         # Get date range, default to current week
         today = timezone.now().date()
@@ -113,12 +298,12 @@ class ShiftAssignmentViewSet(viewsets.ModelViewSet):
                 
         end_date = start_date + timedelta(days=days-1)
         
-        # Query shift assignments in the date range
-        assignments = ShiftAssignment.objects.filter(
-            date__gte=start_date,
-            date__lte=end_date,
-            is_active=True
-        ).select_related('staff_member', 'staff_member__role', 'shift')
+        # Read the pre-rendered rows for the date range
+        entries = ScheduleEntry.objects.filter(date__gte=start_date, date__lte=end_date)
+        
+        department_id = request.query_params.get('department')
+        if department_id:
+            entries = entries.filter(department_id=department_id)
         
         # Organize by date
         schedule = {}
@@ -130,12 +315,9 @@ class ShiftAssignmentViewSet(viewsets.ModelViewSet):
             schedule[current_date.strftime('%Y-%m-%d')] = []
             current_date += timedelta(days=1)
         
-        # Group assignments by date
-        for assignment in assignments:
-            date_str = assignment.date.strftime('%Y-%m-%d')
-            if date_str in schedule:
-                serializer = ShiftAssignmentSerializer(assignment)
-                schedule[date_str].append(serializer.data)
+        # Group rows by date
+        for date, payload in entries.values_list('date', 'payload'):
+            schedule[date.strftime('%Y-%m-%d')].append(payload)
         
         return Response({
             'start_date': start_date.strftime('%Y-%m-%d'),
@@ -144,6 +326,24 @@ class ShiftAssignmentViewSet(viewsets.ModelViewSet):
             'schedule': schedule
         })
 
+class StaffAvailabilityViewSet(viewsets.ModelViewSet):
+    """
+    API endpoint for managing the weekly availability windows of staff members
+    """
+    queryset = StaffAvailability.objects.all().select_related('staff_member')
+    serializer_class = StaffAvailabilitySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        # Filter by staff member
+        staff_id = self.request.query_params.get('staff_id')
+        if staff_id:
+            queryset = queryset.filter(staff_member__staff_id=staff_id)
+            
+        return queryset
+
 class ShiftSwapRequestViewSet(viewsets.ModelViewSet):
     """
     API endpoint for managing shift swap requests
@@ -162,9 +362,10 @@ class ShiftSwapRequestViewSet(viewsets.ModelViewSet):
         # Filter by staff member (either requester or recipient)
         staff_id = self.request.query_params.get('staff_id')
         if staff_id:
+            # Subqueries keep both sides of the OR on indexed columns of the swap request table
             queryset = queryset.filter(
-                Q(requester_assignment__staff_member__staff_id=staff_id) | 
-                Q(recipient__staff_id=staff_id)
+                Q(requester_assignment__in=ShiftAssignment.objects.filter(staff_member__staff_id=staff_id)) | 
+                Q(recipient__in=StaffMember.objects.filter(staff_id=staff_id))
             )
             
         # Filter by status
@@ -189,38 +390,12 @@ class ShiftSwapRequestViewSet(viewsets.ModelViewSet):
         Approve a shift swap request
         """
         swap_request = self.get_object()
-        
-        if swap_request.status != 'pending':
-            return Response({'error': 'This request has already been processed'}, 
-                           status=status.HTTP_400_BAD_REQUEST)
-        
-        # Find recipient's shift assignment for the same date
-        recipient_assignment = ShiftAssignment.objects.filter(
-            staff_member=swap_request.recipient,
-            date=swap_request.requester_assignment.date
-        ).first()
-        
-        if not recipient_assignment:
-            return Response({'error': 'Recipient does not have a shift assignment on this date'}, 
-                           status=status.HTTP_400_BAD_REQUEST)
-        
-        # Store the assignments
-        requester_assignment = swap_request.requester_assignment
-        
-        # Update the shift assignments
-        temp_shift = requester_assignment.shift
-        requester_assignment.shift = recipient_assignment.shift
-        recipient_assignment.shift = temp_shift
-        
-        # Save the changes
-        requester_assignment.save()
-        recipient_assignment.save()
-        
-        # Update the swap request
-        swap_request.recipient_assignment = recipient_assignment
-        swap_request.status = 'approved'
-        swap_request.save()
-        
+
+        try:
+            swap_request = approve_swap_request(swap_request.pk)
+        except ValidationError as e:
+            return Response({'error': e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+
         serializer = self.get_serializer(swap_request)
         return Response(serializer.data)
     
@@ -230,13 +405,35 @@ class ShiftSwapRequestViewSet(viewsets.ModelViewSet):
         Reject a shift swap request
         """
         swap_request = self.get_object()
-        
-        if swap_request.status != 'pending':
-            return Response({'error': 'This request has already been processed'}, 
-                           status=status.HTTP_400_BAD_REQUEST)
-        
-        swap_request.status = 'rejected'
-        swap_request.save()
-        
+
+        try:
+            swap_request = reject_swap_request(swap_request.pk)
+        except ValidationError as e:
+            return Response({'error': e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+
         serializer = self.get_serializer(swap_request)
         return Response(serializer.data)
+    
+    @swagger_auto_schema(
+        method='post',
+        operation_description="Find cycles of pending swap requests (A wants B's shift, B wants C's, C wants A's) "
+                              "for shifts in a date range. Set 'commit' to execute them: every requester in a cycle "
+                              "gets the shift they asked for and the cycle's requests are approved.",
+        request_body=SwapCycleRequestSerializer,
+        responses={200: 'Cycles found (as lists of request ids) and what was executed'}
+    )
+    @action(detail=False, methods=['post'], url_path='resolve-cycles')
+    def resolve_cycles(self, request):
+        """
+        Finds (and optionally executes) cycles of pending swap requests
+        """
+        serializer = SwapCycleRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        try:
+            result = resolve_swap_cycles(data['start_date'], data['end_date'], commit=data['commit'])
+        except ValidationError as e:
+            return Response({'error': e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(result)
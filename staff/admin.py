@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import StaffMember
+from .search import filter_staff
 from unfold.admin import ModelAdmin
 
 # Register your models here.
@@ -20,6 +21,14 @@ class StaffMemberAdmin(ModelAdmin):
         }),
     )
     
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Searches through the staff search index instead of LIKE scans over the user join
+        """
+        if not search_term.strip():
+            return queryset, False
+        return filter_staff(queryset, search_term), False
+    
     def get_full_name(self, obj):
         return obj.user.get_full_name()
     get_full_name.short_description = 'Name'
@@ -0,0 +1,252 @@
+import codecs
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from department.models import Department
+from role.models import Role
+from .models import StaffMember
+from .search import refresh_staff_search
+from .serializers import StaffImportRowSerializer
+
+IMPORT_BATCH_SIZE = 500
+IMPORT_FORMATS = {'csv', 'ndjson'}
+# Below this many passwords, starting worker processes costs more than it saves
+POOL_MIN_PASSWORDS = 16
+
+
+def read_staff_rows(source, file_format):
+    """
+    Yields one dict per row of a binary CSV (with a header line) or NDJSON file.
+    NDJSON lines that are not JSON objects are yielded as the error message to report.
+    """
+    lines = codecs.iterdecode(source, 'utf-8-sig')
+    if file_format == 'csv':
+        yield from csv.DictReader(lines)
+        return
+
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield f"Invalid JSON: {e}"
+            continue
+        yield row if isinstance(row, dict) else 'Each line must be a JSON object.'
+
+
+def _setup_worker():
+    # Workers started with 'spawn' or 'forkserver' do not inherit the configured project
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _hash_password(password):
+    return make_password(password)
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    Hashes the passwords with the configured hasher, spread over a pool of
+    worker processes (STAFF_IMPORT_HASH_WORKERS, one per CPU by default) since
+    each PBKDF2 hash is deliberately slow and holds the GIL. None gives an
+    unusable password, which needs no hashing. Returns the hashes in order and
+    the number of workers used.
+    """
+    hashes = [make_password(None) if password is None else None for password in passwords]
+    pending = [index for index, password in enumerate(passwords) if password is not None]
+
+    workers = workers or getattr(settings, 'STAFF_IMPORT_HASH_WORKERS', None) or os.cpu_count() or 1
+    workers = max(min(workers, len(pending)), 1)
+    if workers == 1 or len(pending) < POOL_MIN_PASSWORDS:
+        for index in pending:
+            hashes[index] = make_password(passwords[index])
+        return hashes, 1
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_setup_worker) as pool:
+        chunksize = max(len(pending) // (workers * 4), 1)
+        for index, hashed in zip(pending, pool.map(_hash_password, [passwords[index] for index in pending], chunksize=chunksize)):
+            hashes[index] = hashed
+    return hashes, workers
+
+
+def _resolve(model, values):
+    """
+    Maps the ids or names given for departments or roles to ids
+    """
+    ids = [int(value) for value in values if value.isdigit()]
+    names = [value for value in values if not value.isdigit()]
+    found = {}
+    if ids:
+        found.update((str(pk), pk) for pk in model.objects.filter(pk__in=ids).values_list('id', flat=True))
+    if names:
+        found.update(model.objects.filter(name__in=names).values_list('name', 'id'))
+    return found
+
+
+def _taken(staff_ids, usernames):
+    """
+    Returns the given staff IDs and usernames that already exist
+    """
+    return (
+        set(StaffMember.objects.filter(staff_id__in=list(staff_ids)).values_list('staff_id', flat=True)),
+        set(User.objects.filter(username__in=list(usernames)).values_list('username', flat=True)),
+    )
+
+
+def _uniqueness_errors(data, taken_staff_ids, taken_usernames):
+    row_errors = {}
+    if data['staff_id'] in taken_staff_ids:
+        row_errors['staff_id'] = ['Staff ID must be unique.']
+    if data['username'] in taken_usernames:
+        row_errors['username'] = ['A user with that username already exists.']
+    return row_errors
+
+
+def import_staff(rows, dry_run=False, workers=None):
+    """
+    Onboards many staff members at once.
+
+    Rows are validated with StaffImportRowSerializer; staff ID and username
+    uniqueness (within the file and against the database) and the departments
+    and roles are then checked with one query each instead of per row.
+    Invalid rows are reported by number (from 1) and skipped. Passwords are hashed in a
+    process pool (rows without one get an unusable password and have to go
+    through the password reset), and the users and staff members are written
+    with chunked bulk_create in one transaction. Nothing is hashed or written
+    with ``dry_run``.
+
+    Hashing can take a while, so staff IDs and usernames are checked again
+    inside the transaction and rows taken meanwhile are reported like the
+    others. Should a concurrent write still collide with the import, nothing
+    is created and the report carries an ``error``.
+
+    Returns a report of the counts, the errors and the throughput.
+    """
+    started = time.perf_counter()
+    errors = {}
+    valid = {}
+    staff_ids = {}
+    usernames = {}
+
+    for index, row in enumerate(rows, start=1):
+        if isinstance(row, str):
+            errors[index] = {'non_field_errors': [row]}
+            continue
+
+        serializer = StaffImportRowSerializer(data=row)
+        if not serializer.is_valid():
+            errors[index] = serializer.errors
+            continue
+
+        data = dict(serializer.validated_data)
+        data['username'] = data.get('username') or data['staff_id'].lower()
+        row_errors = {}
+        if data['staff_id'] in staff_ids:
+            row_errors['staff_id'] = [f"Duplicate of row {staff_ids[data['staff_id']]}."]
+        if data['username'] in usernames:
+            row_errors['username'] = [f"Duplicate of row {usernames[data['username']]}."]
+        if row_errors:
+            errors[index] = row_errors
+            continue
+
+        staff_ids[data['staff_id']] = index
+        usernames[data['username']] = index
+        valid[index] = data
+
+    if valid:
+        taken_staff_ids, taken_usernames = _taken(staff_ids, usernames)
+        departments = _resolve(Department, {data['department'] for data in valid.values() if data['department']})
+        roles = _resolve(Role, {data['role'] for data in valid.values()})
+
+        for index, data in list(valid.items()):
+            row_errors = _uniqueness_errors(data, taken_staff_ids, taken_usernames)
+            if data['department'] and data['department'] not in departments:
+                row_errors['department'] = [f"Department '{data['department']}' does not exist."]
+            if data['role'] not in roles:
+                row_errors['role'] = [f"Role '{data['role']}' does not exist."]
+            if row_errors:
+                errors[index] = row_errors
+                del valid[index]
+
+    validated = time.perf_counter()
+    report = {
+        'rows': len(valid) + len(errors),
+        'created': 0,
+        'errors': [{'row': index, 'errors': row_errors} for index, row_errors in sorted(errors.items())],
+        'dry_run': dry_run,
+        'hash_workers': 0,
+    }
+
+    if valid and not dry_run:
+        hashes, report['hash_workers'] = hash_passwords([data['password'] or None for data in valid.values()], workers)
+        hashed = time.perf_counter()
+        report['hash_seconds'] = round(hashed - validated, 3)
+
+        try:
+            with transaction.atomic():
+                taken_staff_ids, taken_usernames = _taken(
+                    [data['staff_id'] for data in valid.values()], [data['username'] for data in valid.values()]
+                )
+                rows = []
+                for (index, data), password in zip(valid.items(), hashes):
+                    row_errors = _uniqueness_errors(data, taken_staff_ids, taken_usernames)
+                    if row_errors:
+                        errors[index] = row_errors
+                    else:
+                        rows.append((data, password))
+
+                users = User.objects.bulk_create([
+                    User(
+                        username=data['username'],
+                        first_name=data['first_name'],
+                        last_name=data['last_name'],
+                        email=data['email'],
+                        password=password
+                    )
+                    for data, password in rows
+                ], batch_size=IMPORT_BATCH_SIZE)
+
+                # Backends that cannot return the new primary keys need one lookup
+                if any(user.pk is None for user in users):
+                    user_ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id'))
+                    for user in users:
+                        user.pk = user_ids[user.username]
+
+                staff_members = StaffMember.objects.bulk_create([
+                    StaffMember(
+                        user_id=user.pk,
+                        staff_id=data['staff_id'],
+                        phone_number=data['phone_number'],
+                        address=data['address'] or None,
+                        department_id=departments.get(data['department']),
+                        role_id=roles[data['role']]
+                    )
+                    for (data, password), user in zip(rows, users)
+                ], batch_size=IMPORT_BATCH_SIZE)
+
+                if any(staff_member.pk is None for staff_member in staff_members):
+                    created_ids = StaffMember.objects.filter(staff_id__in=[data['staff_id'] for data, password in rows]).values_list('id', flat=True)
+                else:
+                    created_ids = [staff_member.pk for staff_member in staff_members]
+                # Bulk writes send no signals
+                refresh_staff_search(created_ids)
+        except IntegrityError:
+            report['error'] = 'The import collided with a concurrent change and nothing was created, please retry'
+        else:
+            report['created'] = len(rows)
+            report['errors'] = [{'row': index, 'errors': row_errors} for index, row_errors in sorted(errors.items())]
+
+    elapsed = time.perf_counter() - started
+    report['validate_seconds'] = round(validated - started, 3)
+    report['elapsed'] = round(elapsed, 3)
+    report['rows_per_second'] = round(report['rows'] / elapsed) if elapsed else report['rows']
+    return report
@@ -0,0 +1,52 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from staff.bulk import IMPORT_FORMATS, import_staff, read_staff_rows
+
+
+class Command(BaseCommand):
+    help = ("Onboard staff members from a CSV (with a header line) or NDJSON file with the columns staff_id, "
+            "username, first_name, last_name, email, phone_number, address, department, role and password")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or NDJSON file")
+        parser.add_argument('--format', dest='file_format', choices=sorted(IMPORT_FORMATS),
+                            help="File format (default: from the file extension)")
+        parser.add_argument('--workers', type=int, help="Password hashing processes (default: one per CPU)")
+        parser.add_argument('--dry-run', action='store_true', help="Validate the rows without writing anything")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['file_format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if file_format == 'jsonl':
+            file_format = 'ndjson'
+        if file_format not in IMPORT_FORMATS:
+            raise CommandError(f"Cannot tell the format of '{path}', use --format")
+
+        try:
+            with open(path, 'rb') as source:
+                report = import_staff(
+                    read_staff_rows(source, file_format),
+                    dry_run=options['dry_run'],
+                    workers=options['workers']
+                )
+        except OSError as e:
+            raise CommandError(f"Cannot read {e.filename}: {e.strerror}")
+
+        if 'error' in report:
+            raise CommandError(report['error'])
+
+        for error in report['errors']:
+            messages = '; '.join(
+                f"{field}: {' '.join(str(message) for message in field_messages)}"
+                for field, field_messages in error['errors'].items()
+            )
+            self.stdout.write(self.style.WARNING(f"Row {error['row']}: {messages}"))
+
+        verb = "Would import" if report['dry_run'] else "Imported"
+        imported = report['created'] if not report['dry_run'] else report['rows'] - len(report['errors'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {imported} of {report['rows']} staff members in {report['elapsed']:.2f}s "
+            f"({report['rows_per_second']} rows/s; validation {report['validate_seconds']:.2f}s"
+            + (f", password hashing {report['hash_seconds']:.2f}s on {report['hash_workers']} workers" if 'hash_seconds' in report else "")
+            + ")"
+        ))
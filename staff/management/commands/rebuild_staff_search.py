@@ -0,0 +1,15 @@
+import time
+from django.core.management.base import BaseCommand
+from staff.search import fts_available, rebuild_staff_search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the staff directory search entries (and the FTS5 index on SQLite)"
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = rebuild_staff_search()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} staff search entries in {time.perf_counter() - started:.2f}s"
+            + ("" if fts_available() else " (no FTS5 index on this database, using the portable fallback)")
+        ))
@@ -0,0 +1,19 @@
+from django.utils.functional import SimpleLazyObject
+from .profile import get_staff_profile
+
+
+class StaffProfileMiddleware:
+    """
+    Sets ``request.staff_profile`` to the current user's StaffMember (or None).
+
+    It is resolved lazily, at most once per request, on first access. API views
+    authenticate in the view, and DRF then sets the user on the underlying
+    request, so the lazy lookup sees token and JWT users too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.staff_profile = SimpleLazyObject(lambda: get_staff_profile(getattr(request, 'user', None)))
+        return self.get_response(request)
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('department', '0003_delete_departmentassignment'),
+        ('role', '0003_delete_roleassignment'),
+        ('staff', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='staffmember',
+            index=models.Index(fields=['role', 'department'], name='staff_role_department_idx'),
+        ),
+    ]
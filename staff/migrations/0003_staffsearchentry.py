@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:02
+
+import re
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+FTS_TABLE = 'staff_staffsearchentry_fts'
+FTS_COLUMNS = 'name, staff_id, phone, department, role'
+
+
+def create_fts_index(apps, schema_editor):
+    """
+    Creates an FTS5 index over the search entries, kept in sync by triggers (SQLite only)
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    new = ', '.join(f'new.{column}' for column in FTS_COLUMNS.split(', '))
+    old = ', '.join(f'old.{column}' for column in FTS_COLUMNS.split(', '))
+    for statement in (
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({FTS_COLUMNS}, "
+        f"content='staff_staffsearchentry', content_rowid='staff_member_id')",
+        f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON staff_staffsearchentry BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS}) VALUES (new.staff_member_id, {new}); END",
+        f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON staff_staffsearchentry BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {FTS_COLUMNS}) VALUES ('delete', old.staff_member_id, {old}); END",
+        f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON staff_staffsearchentry BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {FTS_COLUMNS}) VALUES ('delete', old.staff_member_id, {old}); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS}) VALUES (new.staff_member_id, {new}); END",
+    ):
+        schema_editor.execute(statement)
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    for trigger in ('ai', 'ad', 'au'):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def populate_search_entries(apps, schema_editor):
+    StaffMember = apps.get_model('staff', 'StaffMember')
+    StaffSearchEntry = apps.get_model('staff', 'StaffSearchEntry')
+
+    entries = []
+    for staff_member_id, first_name, last_name, staff_id, phone_number, department, role in StaffMember.objects.order_by(
+        'id'
+    ).values_list('id', 'user__first_name', 'user__last_name', 'staff_id', 'phone_number', 'department__name', 'role__name'):
+        digits = re.sub(r'\D', '', phone_number or '')
+        entries.append(StaffSearchEntry(
+            staff_member_id=staff_member_id,
+            name=f"{first_name} {last_name}".strip(),
+            staff_id=staff_id,
+            phone=f"{phone_number} {digits}" if digits and digits != phone_number else (phone_number or ''),
+            department=department or '',
+            role=role or ''
+        ))
+    StaffSearchEntry.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('department', '0003_delete_departmentassignment'),
+        ('role', '0003_delete_roleassignment'),
+        ('staff', '0002_staffmember_role_department_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaffSearchEntry',
+            fields=[
+                ('staff_member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_entry', serialize=False, to='staff.staffmember')),
+                ('name', models.CharField(max_length=301)),
+                ('staff_id', models.CharField(max_length=50)),
+                ('phone', models.CharField(max_length=31)),
+                ('department', models.CharField(blank=True, max_length=100)),
+                ('role', models.CharField(blank=True, max_length=100)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Staff Search Entry',
+                'verbose_name_plural': 'Staff Search Entries',
+            },
+        ),
+        migrations.RunPython(create_fts_index, drop_fts_index),
+        migrations.RunPython(populate_search_entries, migrations.RunPython.noop),
+    ]
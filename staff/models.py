@@ -42,4 +42,25 @@ class StaffMember(models.Model):
         verbose_name = "Staff Member"
         verbose_name_plural = "Staff Members"
         ordering = ['user__first_name', 'user__last_name']
+        indexes = [
+            models.Index(fields=['role', 'department'], name='staff_role_department_idx'),
+        ]
 
+
+
+class StaffSearchEntry(models.Model):
+    """
+    Denormalized search document of a staff member, kept in sync by staff.signals.
+    On SQLite it also feeds an FTS5 index (see staff.search).
+    """
+    staff_member = models.OneToOneField(StaffMember, on_delete=models.CASCADE, primary_key=True, related_name='search_entry')
+    name = models.CharField(max_length=301)
+    staff_id = models.CharField(max_length=50)
+    phone = models.CharField(max_length=31)
+    department = models.CharField(max_length=100, blank=True)
+    role = models.CharField(max_length=100, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Staff Search Entry"
+        verbose_name_plural = "Staff Search Entries"
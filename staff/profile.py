@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.core.cache import cache
+from .models import StaffMember
+
+# Versioned with the format of the cached values, so entries of an older format are never read
+CACHE_KEY_PREFIX = 'staff_profile:v2:user:'
+# Cached for users without a staff member, so they are not looked up on every request either
+_NO_PROFILE = 'none'
+# The user fields a cached profile holds; never the password hash, the cache may live on disk
+USER_FIELDS = ('id', 'username', 'first_name', 'last_name', 'email', 'is_active', 'is_staff', 'is_superuser')
+
+
+def _cache_key(user_id):
+    return f'{CACHE_KEY_PREFIX}{user_id}'
+
+
+def _values(instance, fields=None):
+    if instance is None:
+        return None
+    fields = fields or [field.attname for field in instance._meta.concrete_fields]
+    return {field: getattr(instance, field) for field in fields}
+
+
+def _instance(model, values):
+    # Fields left out of ``values`` are deferred: read on access, never written by save()
+    if values is None:
+        return None
+    fields = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(model.objects.db, fields, [values[field] for field in fields])
+
+
+def _profile_values(staff_member):
+    return {
+        'staff_member': _values(staff_member),
+        'user': _values(staff_member.user, USER_FIELDS),
+        'department': _values(staff_member.department),
+        'role': _values(staff_member.role),
+    }
+
+
+def _profile(values):
+    staff_member = _instance(StaffMember, values['staff_member'])
+    staff_member.user = _instance(StaffMember._meta.get_field('user').related_model, values['user'])
+    staff_member.department = _instance(StaffMember._meta.get_field('department').related_model, values['department'])
+    staff_member.role = _instance(StaffMember._meta.get_field('role').related_model, values['role'])
+    return staff_member
+
+
+def get_staff_profile(user):
+    """
+    Returns the StaffMember of ``user`` with its user, department and role
+    loaded, or None for anonymous users and users who are not staff members.
+
+    Profiles are kept in the shared cache for STAFF_PROFILE_CACHE_TTL seconds,
+    as plain field values without the user's password, and dropped by the
+    staff signals when the staff member, its user, role or department changes.
+    Works with database users and token users alike.
+    """
+    if user is None or not user.is_authenticated:
+        return None
+
+    key = _cache_key(user.pk)
+    values = cache.get(key)
+    if values is None:
+        staff_member = StaffMember.objects.select_related('user', 'department', 'role').filter(user_id=user.pk).first()
+        values = _profile_values(staff_member) if staff_member is not None else _NO_PROFILE
+        cache.set(key, values, getattr(settings, 'STAFF_PROFILE_CACHE_TTL', 300))
+    return None if values == _NO_PROFILE else _profile(values)
+
+
+def current_staff_profile(request):
+    """
+    Returns the StaffMember of the request's user or None, resolved once per
+    request: from ``request.staff_profile`` set by StaffProfileMiddleware, or
+    looked up and kept on the request when the middleware did not run
+    """
+    if not hasattr(request, 'staff_profile'):
+        request.staff_profile = get_staff_profile(request.user)
+    # The middleware's lazy object stands in for None too; only a real profile is truthy
+    return request.staff_profile or None
+
+
+def invalidate_staff_profiles(user_ids):
+    """
+    Drops the cached profiles of the given users
+    """
+    keys = [_cache_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        cache.delete_many(keys)
@@ -0,0 +1,151 @@
+import re
+from functools import reduce
+from operator import and_, or_
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from .models import StaffMember, StaffSearchEntry
+
+SEARCH_CHUNK_SIZE = 500
+# FTS5 table over StaffSearchEntry, created by migration 0003 on SQLite only
+FTS_TABLE = 'staff_staffsearchentry_fts'
+# bm25 weights of the name, staff_id, phone, department and role columns
+FTS_WEIGHTS = (10.0, 8.0, 4.0, 2.0, 2.0)
+
+_fts_databases = {}
+
+
+def fts_available():
+    """
+    Returns True if the database has the FTS5 staff index (checked once per database)
+    """
+    name = connection.settings_dict['NAME']
+    if name not in _fts_databases:
+        _fts_databases[name] = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+    return _fts_databases[name]
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def _fts_query(terms):
+    # Every term must match the start of a token; quoting keeps FTS5 operators out of user input
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _phone(phone_number):
+    """
+    Indexes the phone number as typed and as bare digits, so '555-0101' and '5550101' both match
+    """
+    digits = re.sub(r'\D', '', phone_number or '')
+    return f"{phone_number} {digits}" if digits and digits != phone_number else (phone_number or '')
+
+
+def _entries(staff_ids):
+    return [
+        StaffSearchEntry(
+            staff_member_id=staff_member_id,
+            name=f"{first_name} {last_name}".strip(),
+            staff_id=staff_id,
+            phone=_phone(phone_number),
+            department=department or '',
+            role=role or ''
+        )
+        for staff_member_id, first_name, last_name, staff_id, phone_number, department, role in StaffMember.objects.filter(
+            id__in=staff_ids
+        ).order_by().values_list(
+            'id', 'user__first_name', 'user__last_name', 'staff_id', 'phone_number', 'department__name', 'role__name'
+        )
+    ]
+
+
+def refresh_staff_search(staff_ids):
+    """
+    Re-renders the search entries of the given staff members; the FTS5 index
+    follows through the triggers on the entry table
+    """
+    staff_ids = list(set(staff_ids))
+
+    with transaction.atomic():
+        for offset in range(0, len(staff_ids), SEARCH_CHUNK_SIZE):
+            chunk = staff_ids[offset:offset + SEARCH_CHUNK_SIZE]
+            StaffSearchEntry.objects.filter(staff_member_id__in=chunk).delete()
+            StaffSearchEntry.objects.bulk_create(_entries(chunk))
+
+
+def refresh_staff_search_for(**filters):
+    """
+    Re-renders the search entries of every staff member matching the given filters
+    """
+    refresh_staff_search(StaffMember.objects.filter(**filters).values_list('id', flat=True))
+
+
+def rebuild_staff_search():
+    """
+    Rebuilds every search entry. Returns the number of entries written.
+    """
+    staff_ids = list(StaffMember.objects.order_by('id').values_list('id', flat=True))
+    with transaction.atomic():
+        StaffSearchEntry.objects.all().delete()
+        for offset in range(0, len(staff_ids), SEARCH_CHUNK_SIZE):
+            StaffSearchEntry.objects.bulk_create(_entries(staff_ids[offset:offset + SEARCH_CHUNK_SIZE]))
+    return len(staff_ids)
+
+
+def search_entries(terms):
+    """
+    Portable prefix match of every term against the search entry columns
+    """
+    return StaffSearchEntry.objects.filter(reduce(and_, [
+        reduce(or_, [
+            Q(**{f'{field}__istartswith': term}) | Q(**{f'{field}__icontains': f' {term}'})
+            for field in ('name', 'staff_id', 'phone', 'department', 'role')
+        ])
+        for term in terms
+    ]))
+
+
+def search_staff_ids(query, limit=20):
+    """
+    Returns the ids of the staff members matching every word of ``query`` as a
+    prefix of their name, staff ID, phone number, department or role, best
+    matches first.
+
+    On SQLite the FTS5 index answers the query and ranks it with bm25 (a name or
+    staff ID hit counts more than a department or role hit). Elsewhere each
+    word is matched against the columns of the search entry table, which
+    avoids the join but not the scan, and results are ordered by name.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    if fts_available():
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s',
+                [_fts_query(terms), limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    return list(search_entries(terms).order_by('name', 'staff_member_id').values_list(
+        'staff_member_id', flat=True
+    )[:limit])
+
+
+def filter_staff(queryset, query):
+    """
+    Narrows a StaffMember queryset to the members matching ``query``, unranked
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+
+    if fts_available():
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [_fts_query(terms)]
+        ))
+    return queryset.filter(id__in=search_entries(terms).values('staff_member_id'))
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from api.sparse import SparseFieldsMixin
 from .models import StaffMember
 
 class UserSerializer(serializers.ModelSerializer):
@@ -8,7 +10,7 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'first_name', 'last_name', 'email']
         read_only_fields = ['username']
 
-class StaffMemberSerializer(serializers.ModelSerializer):
+class StaffMemberSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer()
     department_name = serializers.StringRelatedField(source='department')
     role_name = serializers.StringRelatedField(source='role')
@@ -44,3 +46,28 @@ class StaffMemberSerializer(serializers.ModelSerializer):
             
         instance.save()
         return instance
+
+class StaffImportRowSerializer(serializers.Serializer):
+    """
+    Serializer for a single row of a bulk staff import.
+    Department and role are given by id or name and resolved in bulk by the caller.
+    """
+    staff_id = serializers.CharField(max_length=50)
+    username = serializers.CharField(max_length=150, required=False, allow_blank=True,
+                                     validators=[UnicodeUsernameValidator()])
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+    email = serializers.EmailField(required=False, allow_blank=True, default='')
+    phone_number = serializers.CharField(max_length=15)
+    address = serializers.CharField(required=False, allow_blank=True, allow_null=True, default=None)
+    department = serializers.CharField(required=False, allow_blank=True, default='')
+    role = serializers.CharField()
+    password = serializers.CharField(required=False, allow_blank=True, write_only=True, default='')
+    
+    def validate_staff_id(self, value):
+        # Same rules as StaffMember.clean(); uniqueness is checked for the whole batch at once
+        if not value.isalnum():
+            raise serializers.ValidationError('Staff ID must be alphanumeric.')
+        if len(value) < 5:
+            raise serializers.ValidationError('Staff ID must be at least 5 characters long.')
+        return value
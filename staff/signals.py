@@ -0,0 +1,92 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from department.models import Department
+from role.models import Role
+from .models import StaffMember
+from .profile import USER_FIELDS, invalidate_staff_profiles
+from .search import refresh_staff_search, refresh_staff_search_for
+
+
+# User fields the search entries index; the cached profiles hold USER_FIELDS
+SEARCH_USER_FIELDS = ('first_name', 'last_name')
+
+
+@receiver(pre_save, sender=User)
+def remember_staff_user_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Saves leaving these fields alone (last_login, password upgrades...) are not looked at
+    if raw or instance.pk is None or (update_fields is not None and not set(USER_FIELDS) & set(update_fields)):
+        return
+    instance._staff_user_values = User._default_manager.filter(pk=instance.pk).values(*USER_FIELDS).first()
+
+
+def _changed_user_fields(instance):
+    previous = instance.__dict__.pop('_staff_user_values', None) or {}
+    return {field for field, value in previous.items() if getattr(instance, field) != value}
+
+
+@receiver(post_save, sender=User)
+def refresh_user_staff(sender, instance, raw=False, created=False, **kwargs):
+    # The search entries and the cached profile only follow the user fields they render
+    if raw or created:
+        return
+    changed = _changed_user_fields(instance)
+    if changed & set(SEARCH_USER_FIELDS):
+        refresh_staff_search_for(user=instance)
+    if changed:
+        user_id = instance.pk
+        transaction.on_commit(lambda: invalidate_staff_profiles([user_id]))
+
+
+# Keep the staff search entries in sync with the name, ID, phone, department and role they index
+
+@receiver(post_save, sender=StaffMember)
+def refresh_staff_member_search(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_staff_search([instance.pk])
+
+
+@receiver(post_save, sender=Role)
+def refresh_role_search(sender, instance, raw=False, created=False, **kwargs):
+    if not raw and not created:
+        refresh_staff_search_for(role=instance)
+
+
+@receiver(post_save, sender=Department)
+def refresh_department_search(sender, instance, raw=False, created=False, **kwargs):
+    if not raw and not created:
+        refresh_staff_search_for(department=instance)
+
+
+@receiver(pre_delete, sender=Role)
+@receiver(pre_delete, sender=Department)
+def refresh_unassigned_search(sender, instance, **kwargs):
+    # Deleting a role or department nulls it on its staff with a queryset update, which sends no signals
+    field = 'role' if sender is Role else 'department'
+    staff_ids = list(StaffMember.objects.filter(**{field: instance}).values_list('id', flat=True))
+    if staff_ids:
+        transaction.on_commit(lambda: refresh_staff_search(staff_ids))
+
+
+# Drop the cached staff profiles (see staff.profile) once the change they reflect is committed
+
+@receiver(post_save, sender=StaffMember)
+@receiver(post_delete, sender=StaffMember)
+def invalidate_staff_member_profile(sender, instance, raw=False, **kwargs):
+    if not raw:
+        user_id = instance.user_id
+        transaction.on_commit(lambda: invalidate_staff_profiles([user_id]))
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_save, sender=Department)
+@receiver(pre_delete, sender=Role)
+@receiver(pre_delete, sender=Department)
+def invalidate_assigned_profiles(sender, instance, raw=False, created=False, **kwargs):
+    if raw or created:
+        return
+    field = 'role' if sender is Role else 'department'
+    user_ids = list(StaffMember.objects.filter(**{field: instance}).values_list('user_id', flat=True))
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_staff_profiles(user_ids))
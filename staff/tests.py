@@ -1,3 +1,244 @@
+import pickle
+import shutil
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from department.models import Department
+from role.models import Role
+from . import bulk
+from .bulk import import_staff
+from .models import StaffMember, StaffSearchEntry
+from .profile import _cache_key, get_staff_profile
+from .search import fts_available, search_staff_ids
 
-# Create your tests here.
+
+class SharedCacheTestCase(TestCase):
+    """
+    Runs each test against an empty file-based cache of its own
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.cache_dir)
+
+    def setUp(self):
+        settings = self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': self.cache_dir,
+        }})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+
+
+class StaffProfileTests(SharedCacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('nurse', first_name='Ann', last_name='Lee', password='secret-password')
+        cls.staff_member = StaffMember.objects.create(
+            user=cls.user, staff_id='STAFF0001', department=Department.objects.create(name='Cardiology'),
+            role=Role.objects.create(name='Nurse'), phone_number='5550001'
+        )
+
+    def test_cached_profile(self):
+        get_staff_profile(self.user)
+
+        with self.assertNumQueries(0):
+            profile = get_staff_profile(self.user)
+            self.assertEqual(
+                (profile.staff_id, profile.user.get_full_name(), profile.department.name, profile.role.name),
+                ('STAFF0001', 'Ann Lee', 'Cardiology', 'Nurse')
+            )
+        self.assertNotIn(self.user.password.encode(), pickle.dumps(cache.get(_cache_key(self.user.pk))))
+
+    def test_saving_cached_user_keeps_password(self):
+        get_staff_profile(self.user)
+        profile = get_staff_profile(self.user)
+
+        profile.user.last_name = 'Park'
+        profile.user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_name, 'Park')
+        self.assertTrue(self.user.check_password('secret-password'))
+
+    def test_user_saves_invalidate_rendered_fields_only(self):
+        get_staff_profile(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.last_login = self.user.date_joined
+            self.user.save()
+        self.assertIsNotNone(cache.get(_cache_key(self.user.pk)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.email = 'ann@example.com'
+            self.user.save()
+        self.assertIsNone(cache.get(_cache_key(self.user.pk)))
+        self.assertEqual(get_staff_profile(self.user).user.email, 'ann@example.com')
+
+    def test_user_without_profile(self):
+        user = User.objects.create_user('admin')
+
+        self.assertIsNone(get_staff_profile(user))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_staff_profile(user))
+
+
+class StaffSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cardiology = Department.objects.create(name='Cardiology')
+        neurology = Department.objects.create(name='Neurology')
+        nurse = Role.objects.create(name='Nurse')
+        cls.staff = {}
+        for username, first_name, last_name, staff_id, department, phone_number in (
+            ('alee', 'Ann', 'Lee', 'NUR0001', cls.cardiology, '555-0101'),
+            ('cparker', 'Carla', 'Parker', 'NUR0002', neurology, '555-0102'),
+            ('bkim', 'Ben', 'Kim', 'NUR0003', neurology, '555-0103'),
+        ):
+            user = User.objects.create_user(username, first_name=first_name, last_name=last_name)
+            cls.staff[username] = StaffMember.objects.create(
+                user=user, staff_id=staff_id, department=department, role=nurse, phone_number=phone_number
+            )
+
+    def search(self, query):
+        return [
+            StaffMember.objects.get(pk=staff_member_id).user.username for staff_member_id in search_staff_ids(query)
+        ]
+
+    def test_fts_index_is_used(self):
+        self.assertTrue(fts_available())
+
+    def test_prefix_matches(self):
+        self.assertEqual(self.search('ann'), ['alee'])
+        self.assertEqual(self.search('nur0003'), ['bkim'])
+        self.assertEqual(self.search('5550102'), ['cparker'])
+        self.assertEqual(self.search('555-0102'), ['cparker'])
+        self.assertEqual(sorted(self.search('neuro')), ['bkim', 'cparker'])
+        self.assertEqual(self.search('neuro kim'), ['bkim'])
+        self.assertEqual(self.search('"*'), [])
+
+    def test_name_hits_rank_above_department_hits(self):
+        # Carla's name starts with "car", Ann only works in Cardiology
+        self.assertEqual(self.search('car'), ['cparker', 'alee'])
+
+    def test_portable_search_orders_by_name(self):
+        with mock.patch('staff.search.fts_available', return_value=False):
+            self.assertEqual(self.search('car'), ['alee', 'cparker'])
+            self.assertEqual(self.search('kim'), ['bkim'])
+
+    def test_index_follows_changes(self):
+        user = self.staff['alee'].user
+        user.last_name = 'Moss'
+        user.save()
+        self.cardiology.name = 'Cardiac Care'
+        self.cardiology.save()
+
+        self.assertEqual(self.search('lee'), [])
+        self.assertEqual(self.search('moss'), ['alee'])
+        self.assertEqual(self.search('cardiac'), ['alee'])
+
+        self.staff['bkim'].delete()
+        self.assertEqual(self.search('kim'), [])
+        self.assertFalse(StaffSearchEntry.objects.filter(staff_id='NUR0003').exists())
+
+    def test_user_saves_leaving_names_alone_skip_refresh(self):
+        user = self.staff['alee'].user
+        with mock.patch('staff.signals.refresh_staff_search_for') as refresh:
+            user.last_login = user.date_joined
+            user.save(update_fields=['last_login'])
+            user.is_staff = True
+            user.save()
+            refresh.assert_not_called()
+
+            user.first_name = 'Anna'
+            user.save()
+            refresh.assert_called_once_with(user=user)
+
+
+class ImportStaffTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cardiology = Department.objects.create(name='Cardiology')
+        cls.nurse = Role.objects.create(name='Nurse')
+        cls.doctor = Role.objects.create(name='Doctor')
+        User.objects.create_user('taken')
+
+    def row(self, staff_id, **fields):
+        return dict({'staff_id': staff_id, 'first_name': 'Ann', 'last_name': staff_id, 'phone_number': '5550001',
+                     'role': 'Nurse', 'password': 'secret-password'}, **fields)
+
+    def row_errors(self, report):
+        return {error['row']: sorted(error['errors']) for error in report['errors']}
+
+    def test_validation(self):
+        report = import_staff([
+            self.row('NEW0001'),
+            self.row('bad'),
+            self.row('NEW0001', username='other'),
+            self.row('NEW0002', username='taken'),
+            self.row('NEW0003', department='Oncology', role='Porter'),
+            'Invalid JSON: Expecting value',
+        ])
+
+        self.assertEqual(report['rows'], 6)
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(self.row_errors(report), {
+            2: ['staff_id'], 3: ['staff_id'], 4: ['username'], 5: ['department', 'role'], 6: ['non_field_errors'],
+        })
+        user = User.objects.get(username='new0001')
+        self.assertTrue(user.check_password('secret-password'))
+
+    def test_department_and_role_by_id_and_name(self):
+        report = import_staff([
+            self.row('NEW0001', department='Cardiology', role='Doctor'),
+            self.row('NEW0002', department=str(self.cardiology.id), role=str(self.nurse.id)),
+            self.row('NEW0003', password=''),
+        ])
+
+        self.assertEqual((report['created'], report['errors']), (3, []))
+        staff = {staff_member.staff_id: staff_member for staff_member in StaffMember.objects.filter(staff_id__startswith='NEW')}
+        self.assertEqual((staff['NEW0001'].department, staff['NEW0001'].role), (self.cardiology, self.doctor))
+        self.assertEqual((staff['NEW0002'].department, staff['NEW0002'].role), (self.cardiology, self.nurse))
+        self.assertIsNone(staff['NEW0003'].department)
+        self.assertFalse(staff['NEW0003'].user.has_usable_password())
+
+    def test_dry_run_writes_nothing(self):
+        report = import_staff([self.row('NEW0001'), self.row('bad')], dry_run=True)
+
+        self.assertEqual((report['rows'], report['created'], report['hash_workers']), (2, 0, 0))
+        self.assertEqual(self.row_errors(report), {2: ['staff_id']})
+        self.assertFalse(User.objects.filter(username='new0001').exists())
+
+    def test_imported_staff_are_searchable(self):
+        import_staff([self.row('NEW0001', first_name='Zelda', department='Cardiology')])
+
+        staff_member = StaffMember.objects.get(staff_id='NEW0001')
+        self.assertEqual(search_staff_ids('zelda'), [staff_member.id])
+        self.assertEqual(search_staff_ids('new0001 cardio'), [staff_member.id])
+
+    def test_rows_taken_while_hashing(self):
+        hash_passwords = bulk.hash_passwords
+
+        def concurrent_hash_passwords(passwords, workers=None):
+            User.objects.create_user('new0002')
+            return hash_passwords(passwords, workers)
+
+        with mock.patch.object(bulk, 'hash_passwords', concurrent_hash_passwords):
+            report = import_staff([self.row('NEW0001'), self.row('NEW0002')])
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(self.row_errors(report), {2: ['username']})
+        self.assertTrue(StaffMember.objects.filter(staff_id='NEW0001').exists())
+
+    def test_collision_creates_nothing(self):
+        # The checks miss a username taken between them and the insert
+        with mock.patch.object(bulk, '_taken', return_value=(set(), set())):
+            report = import_staff([self.row('NEW0001'), self.row('NEW0002', username='taken')])
+
+        self.assertIn('error', report)
+        self.assertEqual(report['created'], 0)
+        self.assertFalse(StaffMember.objects.filter(staff_id__startswith='NEW').exists())
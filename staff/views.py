@@ -3,11 +3,15 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import StaffMember
 from .serializers import StaffMemberSerializer
+from .search import search_staff_ids
+from .profile import current_staff_profile
+from .bulk import IMPORT_FORMATS, import_staff, read_staff_rows
 from django.shortcuts import get_object_or_404
-from drf_yasg.utils import swagger_auto_schema
+from drf_yasg.utils import no_body, swagger_auto_schema
 from drf_yasg import openapi
+from api.sparse import SparseQuerysetMixin
 
-class StaffMemberViewSet(viewsets.ModelViewSet):
+class StaffMemberViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing staff members
     
@@ -143,6 +147,75 @@ class StaffMemberViewSet(viewsets.ModelViewSet):
         serializer = LeaveRequestSerializer(leave_requests, many=True)
         return Response(serializer.data)
     
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Search staff members by name, staff ID, phone number, department or role. "
+                              "Every word must match the start of one of them; best matches come first.",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, description="Search words, e.g. 'ann card'", type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('limit', openapi.IN_QUERY, description="Maximum number of results (default 20, max 100)", type=openapi.TYPE_INTEGER),
+        ]
+    )
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Ranked prefix search over the staff directory
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'The q parameter is required'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        staff_ids = search_staff_ids(query, limit=limit)
+        staff_members = StaffMember.objects.select_related('user', 'role', 'department').in_bulk(staff_ids)
+        serializer = self.get_serializer(
+            [staff_members[staff_id] for staff_id in staff_ids if staff_id in staff_members], many=True
+        )
+        return Response(serializer.data)
+    
+    @swagger_auto_schema(
+        method='post',
+        operation_description="Onboard many staff members from a CSV (with a header line) or NDJSON file with the "
+                              "columns staff_id, username, first_name, last_name, email, phone_number, address, "
+                              "department and role (id or name) and password. Invalid rows are reported and skipped; "
+                              "nothing is saved with dry_run. Returns the import report.",
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, description="CSV or NDJSON file", type=openapi.TYPE_FILE, required=True),
+            openapi.Parameter('file_format', openapi.IN_FORM, description="File format (default: from the file name)", type=openapi.TYPE_STRING, enum=sorted(IMPORT_FORMATS)),
+            openapi.Parameter('dry_run', openapi.IN_FORM, description="true to only validate the rows", type=openapi.TYPE_BOOLEAN),
+        ],
+        request_body=no_body,
+        consumes=['multipart/form-data']
+    )
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[permissions.IsAdminUser])
+    def bulk_import(self, request):
+        """
+        Bulk onboarding of staff members and their user accounts
+        """
+        staff_file = request.FILES.get('file')
+        if staff_file is None:
+            return Response({'error': 'A CSV or NDJSON file is required'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        file_format = request.data.get('file_format') or staff_file.name.rsplit('.', 1)[-1].lower()
+        if file_format == 'jsonl':
+            file_format = 'ndjson'
+        if file_format not in IMPORT_FORMATS:
+            return Response({'error': f"file_format must be one of {', '.join(sorted(IMPORT_FORMATS))}"}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        dry_run = str(request.data.get('dry_run', '')).lower() == 'true'
+        report = import_staff(read_staff_rows(staff_file, file_format), dry_run=dry_run)
+        if 'error' in report:
+            return Response(report, status=status.HTTP_409_CONFLICT)
+        return Response(report, status=status.HTTP_200_OK if dry_run or not report['created'] else status.HTTP_201_CREATED)
+    
     @swagger_auto_schema(
         method='get',
         operation_description="Get current user profile if associated with a staff member",
@@ -153,14 +226,13 @@ class StaffMemberViewSet(viewsets.ModelViewSet):
         """
         Returns the staff member profile associated with the current authenticated user
         """
-        try:
-            staff_member = StaffMember.objects.get(user=request.user)
-            serializer = self.get_serializer(staff_member)
-            return Response(serializer.data)
-        except StaffMember.DoesNotExist:
+        staff_member = current_staff_profile(request)
+        if staff_member is None:
             return Response(
                 {'error': 'No staff member profile found for the current user'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+        serializer = self.get_serializer(staff_member)
+        return Response(serializer.data)
     
 
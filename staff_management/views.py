@@ -2,7 +2,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login
 from django.contrib import messages
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Case, Q, Value, When
 from django.utils import timezone
 from django.http import JsonResponse
 from datetime import datetime, timedelta
@@ -436,39 +437,55 @@ def handle_swap_request(request, request_id, action):
     
     if request.method == 'POST':
         if action == 'approve':
-            # Find the recipient's shift on the same date
-            recipient_assignment = ShiftAssignment.objects.filter(
-                staff_member=swap_request.recipient,
-                date=swap_request.requester_assignment.date
-            ).first()
-            
-            if recipient_assignment:
-                # Store the assignments
-                requester_assignment = swap_request.requester_assignment
-                
-                # Update the shift assignments
-                temp_shift = requester_assignment.shift
-                requester_assignment.shift = recipient_assignment.shift
-                recipient_assignment.shift = temp_shift
-                
-                # Save the changes
-                requester_assignment.save()
-                recipient_assignment.save()
-                
-                # Update the swap request
-                swap_request.recipient_assignment = recipient_assignment
-                swap_request.status = 'approved'
-                swap_request.save()
-                
+            now = timezone.now()
+            with transaction.atomic():
+                # Only one of several concurrent approvals can move the request out of 'pending'
+                claimed = ShiftSwapRequest.objects.filter(pk=request_id, status='pending').update(
+                    status='approved', updated_at=now
+                )
+                assignments = []
+                if claimed:
+                    assignments = list(ShiftAssignment.objects.select_for_update().filter(
+                        Q(id=swap_request.requester_assignment_id) |
+                        Q(staff_member_id=swap_request.recipient_id, date=swap_request.requester_assignment.date)
+                    ).order_by('id'))
+
+                requester_assignment = next(
+                    (assignment for assignment in assignments if assignment.id == swap_request.requester_assignment_id), None
+                )
+                recipient_assignment = next(
+                    (assignment for assignment in assignments if assignment.staff_member_id == swap_request.recipient_id), None
+                )
+
+                swapped = bool(requester_assignment and recipient_assignment)
+                if swapped:
+                    # Swap both shifts with one UPDATE
+                    ShiftAssignment.objects.filter(id__in=[requester_assignment.id, recipient_assignment.id]).update(
+                        shift=Case(
+                            When(id=requester_assignment.id, then=Value(recipient_assignment.shift_id)),
+                            When(id=recipient_assignment.id, then=Value(requester_assignment.shift_id)),
+                        ),
+                        updated_at=now
+                    )
+                    ShiftSwapRequest.objects.filter(pk=request_id).update(recipient_assignment=recipient_assignment)
+                elif claimed:
+                    transaction.set_rollback(True)
+
+            if not claimed:
+                messages.error(request, 'This request has already been processed.')
+            elif swapped:
                 messages.success(request, 'Shift swap request approved and shifts swapped!')
             else:
                 messages.error(request, 'You do not have a shift assigned on this date.')
-                
+
         elif action == 'reject':
-            swap_request.status = 'rejected'
-            swap_request.save()
-            messages.info(request, 'Shift swap request rejected.')
-            
+            if ShiftSwapRequest.objects.filter(pk=request_id, status='pending').update(
+                status='rejected', updated_at=timezone.now()
+            ):
+                messages.info(request, 'Shift swap request rejected.')
+            else:
+                messages.error(request, 'This request has already been processed.')
+
         return redirect('swap_requests_list')
     
     context = {